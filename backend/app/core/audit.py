@@ -0,0 +1,273 @@
+"""
+Audit Log Writer
+Queued, batched JSONL writer with fsync interval and size/time rotation
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, TextIO
+
+from .config import Settings
+from .logging import get_logger
+from .metrics import AUDIT_DROPPED, AUDIT_QUEUE_DEPTH, AUDIT_ROTATIONS, AUDIT_WRITTEN
+
+logger = get_logger(__name__)
+settings = Settings()
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Audit log writer off the request path
+
+    write() only enqueues (never blocks, never touches the disk); a daemon
+    thread drains the queue in batches, writes them with one call, and
+    fsyncs at most every `fsync_interval` seconds (0: after every batch).
+    When the queue is full, entries are dropped and counted.
+
+    The file is rotated when it exceeds `max_bytes` or is older than
+    `rotate_seconds` (0 disables either), to `<name>.<UTC timestamp>`,
+    gzip-compressed in the background if `compress`; only the newest
+    `backups` rotated files are kept. External rotation (logrotate without
+    copytruncate) is detected by inode and the file reopened. Workers
+    sharing one file may all decide to rotate it; the first one moves it
+    away and the others reopen the new file instead.
+
+    The thread starts on first write (and is restarted by the next write
+    if it ever dies); close() drains and fsyncs everything.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_queue: int = 10_000,
+        batch_size: int = 512,
+        fsync_interval: float = 1.0,
+        max_bytes: int = 0,
+        rotate_seconds: float = 0.0,
+        backups: int = 10,
+        compress: bool = True,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.compress = compress
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._file: TextIO | None = None
+        self._opened_at = 0.0
+        self._last_fsync = 0.0
+        self._unsynced = False
+        self._compressors: list[threading.Thread] = []
+
+    # Producer side (event loop)
+
+    def write(self, entry: dict[str, Any]) -> bool:
+        """
+        Queue one entry
+
+        Returns:
+            False if the entry was dropped (queue full)
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            AUDIT_DROPPED.inc()
+            return False
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write everything queued so far, fsync and stop (a later write restarts)"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        for t in self._compressors:
+            t.join(timeout)
+        self._compressors.clear()
+
+    # Writer thread
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self._step():
+                    return
+            except Exception as e:
+                # E.g. fsync failing on the idle path; keep the thread alive
+                logger.warning("Audit log writer error", extra={"path": str(self.path), "error": str(e)})
+                self._close_file()
+
+    def _step(self) -> bool:
+        """Write one batch (or fsync when idle); True once stopped"""
+        try:
+            item = self._queue.get(timeout=self.fsync_interval or None)
+        except queue.Empty:
+            self._sync_if_due()
+            return False
+        batch = [] if item is _STOP else [item]
+        stop = item is _STOP
+        while not stop and len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+        if batch:
+            self._write_batch(batch)
+        if stop:
+            self._close_file()
+        return stop
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+        try:
+            f = self._ensure_open()
+            if self._rotation_due(f, len(data)):
+                self._rotate()
+                f = self._ensure_open()
+            f.write(data)
+            f.flush()
+            self._unsynced = True
+            self._sync_if_due()
+        except Exception as e:
+            # Audit failures must never take the API down; count and move on
+            AUDIT_DROPPED.inc(len(batch))
+            logger.warning("Audit log write failed", extra={"path": str(self.path), "error": str(e)})
+            self._close_file()
+            return
+        AUDIT_WRITTEN.inc(len(batch))
+
+    def _sync_if_due(self, force: bool = False) -> None:
+        if self._file is None or not self._unsynced:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self._unsynced = False
+
+    def _ensure_open(self) -> TextIO:
+        if self._file is not None:
+            try:
+                # Reopen if the file was moved away (external logrotate)
+                if os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino:
+                    return self._file
+            except FileNotFoundError:
+                pass
+            self._close_file()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._opened_at = time.time()
+        return self._file
+
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._sync_if_due(force=True)
+            self._file.close()
+        except Exception as e:
+            logger.warning("Audit log close failed", extra={"path": str(self.path), "error": str(e)})
+        self._file = None
+
+    # Rotation
+
+    def _rotation_due(self, f: TextIO, incoming: int) -> bool:
+        size = f.tell()
+        if size == 0:
+            return False
+        if self.max_bytes and size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+    def _rotate(self) -> None:
+        inode = os.fstat(self._file.fileno()).st_ino if self._file is not None else None
+        self._close_file()
+        stamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+        rotated = self.path.with_name(f"{self.path.name}.{stamp}")
+        try:
+            if inode is not None and os.stat(self.path).st_ino != inode:
+                # Another worker rotated first; write to the file it started
+                return
+            os.replace(self.path, rotated)
+        except FileNotFoundError:
+            return
+        AUDIT_ROTATIONS.inc()
+        logger.info("Audit log rotated", extra={"path": str(self.path), "rotated_to": str(rotated)})
+        if self.compress:
+            t = threading.Thread(target=self._compress_and_prune, args=(rotated,), name="audit-gzip", daemon=True)
+            self._compressors = [c for c in self._compressors if c.is_alive()]
+            self._compressors.append(t)
+            t.start()
+        else:
+            self._prune()
+
+    def _compress_and_prune(self, rotated: Path) -> None:
+        try:
+            gz = rotated.with_name(rotated.name + ".gz")
+            with rotated.open("rb") as src, gzip.open(gz, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            rotated.unlink()
+        except Exception as e:
+            logger.warning("Audit log compression failed", extra={"path": str(rotated), "error": str(e)})
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.backups <= 0:
+            return
+        # Timestamps sort chronologically; ".gz" does not change the order
+        rotated = sorted(self.path.parent.glob(f"{self.path.name}.*"))
+        for old in rotated[:-self.backups]:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def writer_from_settings(path: Path | None = None) -> AuditWriter:
+    return AuditWriter(
+        path or settings.audit_log_path,
+        max_queue=settings.audit_log_queue_size,
+        batch_size=settings.audit_log_batch_size,
+        fsync_interval=settings.audit_log_fsync_interval,
+        max_bytes=settings.audit_log_max_bytes,
+        rotate_seconds=settings.audit_log_rotate_seconds,
+        backups=settings.audit_log_backups,
+        compress=settings.audit_log_compress,
+    )
+
+
+# Global writer
+audit_writer = writer_from_settings()
+AUDIT_QUEUE_DEPTH.set_function(audit_writer.depth)
@@ -0,0 +1,106 @@
+"""
+In-memory TTL cache
+Small asyncio-aware cache used to avoid repeated Qdrant round trips
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Inflight:
+    """Per-key load lock, its queued callers and an invalidation counter"""
+
+    __slots__ = ("lock", "users", "generation")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.generation = 0
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Key/value cache with per-entry expiry.
+
+    A TTL of 0 disables caching: every lookup misses and loaders always run.
+    Concurrent misses for the same key share a single loader call. A load
+    that was in flight when its key was invalidated is returned to its
+    callers but not cached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: dict[K, tuple[float, V]] = {}
+        self._inflight: dict[K, _Inflight] = {}
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time.monotonic() >= expires_at:
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.ttl <= 0:
+            return
+        if key not in self._data and len(self._data) >= self.maxsize:
+            # Drop the oldest insertion to stay bounded
+            self._data.pop(next(iter(self._data)), None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight.generation += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        for inflight in self._inflight.values():
+            inflight.generation += 1
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        """
+        Return the cached value for key, calling loader on a miss
+
+        Args:
+            key: Cache key
+            loader: Coroutine factory producing the fresh value
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = self._inflight[key] = _Inflight()
+        inflight.users += 1
+        try:
+            async with inflight.lock:
+                # Another waiter may have filled the entry while we queued
+                value = self.get(key)
+                if value is not None:
+                    return value
+                generation = inflight.generation
+                value = await loader()
+                # Don't resurrect a value invalidated while it was loading
+                if inflight.generation == generation:
+                    self.set(key, value)
+                return value
+        finally:
+            # Keep the lock while anyone is queued on it (locked() is briefly
+            # False between a release and the next waiter acquiring)
+            inflight.users -= 1
+            if inflight.users == 0 and self._inflight.get(key) is inflight:
+                del self._inflight[key]
@@ -3,10 +3,41 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Literal
 
-from pydantic import Field, SecretStr
+from pydantic import BaseModel, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+def parse_endpoint(item: str, default_port: int) -> tuple[str, int]:
+    """host[:port] -> (host, port)"""
+    host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+    return host, int(port) if port else default_port
+
+
+def parse_endpoints(value: str, default_port: int) -> list[tuple[str, int]]:
+    """Comma-separated host[:port] list -> [(host, port), ...]"""
+    return [parse_endpoint(item.strip(), default_port) for item in value.split(",") if item.strip()]
+
+
+class QdrantClusterConfig(BaseModel):
+    """An additional named Qdrant cluster (see Settings.qdrant_clusters)"""
+    nodes: str = Field(..., min_length=1, description="Comma-separated host[:port] list")
+    primary: str = Field(default="", description="host[:port] that receives writes (default first node)")
+    api_key: SecretStr | None = Field(default=None)
+    api_key_file: Path | None = Field(default=None)
+
+    def get_nodes(self, default_port: int) -> list[tuple[str, int]]:
+        return parse_endpoints(self.nodes, default_port)
+
+    def get_primary(self, default_port: int) -> tuple[str, int]:
+        nodes = self.get_nodes(default_port)
+        if not self.primary:
+            return nodes[0]
+        primary = parse_endpoint(self.primary, default_port)
+        if primary not in nodes:
+            raise ValueError(f"primary {self.primary!r} is not in nodes")
+        return primary
+
+
 class Settings(BaseSettings):
     # Environment
     env: Literal["staging", "production", "development"] = Field(
@@ -23,7 +54,85 @@ class Settings(BaseSettings):
     qdrant_port: int = Field(default=6333, ge=1, le=65535)
     qdrant_api_key: SecretStr | None = Field(default=None)
     qdrant_api_key_file: Path | None = Field(default=None, description="Optional file path to read Qdrant API key from")
+    qdrant_api_key_poll_interval: float = Field(
+        default=5.0, ge=0.0, description="Seconds between key file change checks (0 disables hot reload)"
+    )
     qdrant_timeout: float = Field(default=10.0, ge=0.1)
+    # gRPC transport
+    qdrant_prefer_grpc: bool = Field(default=True, description="Use gRPC for data calls (REST otherwise)")
+    qdrant_grpc_port: int = Field(default=6334, ge=1, le=65535)
+    qdrant_grpc_keepalive_time: float = Field(
+        default=30.0, ge=0.0, description="Seconds between keepalive pings on idle channels (0 disables)"
+    )
+    qdrant_grpc_keepalive_timeout: float = Field(default=10.0, gt=0.0, description="Seconds to wait for a ping ack")
+    qdrant_grpc_max_send_message_bytes: int = Field(default=64 * 1024 * 1024, ge=4 * 1024 * 1024)
+    qdrant_grpc_max_receive_message_bytes: int = Field(default=64 * 1024 * 1024, ge=4 * 1024 * 1024)
+    qdrant_grpc_compression: Literal["none", "gzip"] = Field(default="none", description="gRPC message compression")
+    qdrant_grpc_channels: int = Field(default=1, ge=1, le=16, description="gRPC channels (connections) per node")
+
+    # Multi-node: reads go to the fastest healthy node, writes to the primary
+    qdrant_nodes: str = Field(default="", description="Comma-separated host[:port] list (empty uses qdrant_host)")
+    qdrant_primary: str = Field(default="", description="host[:port] that receives writes (default first node)")
+    qdrant_latency_alpha: float = Field(default=0.3, gt=0.0, le=1.0, description="EWMA weight of the newest latency")
+    qdrant_eject_after: int = Field(default=3, ge=1, description="Failed health checks before a node is ejected")
+    qdrant_readmit_after: int = Field(default=2, ge=1, description="Passed health checks before it is readmitted")
+    # Multi-cluster: the settings above describe the default cluster; more can be
+    # added by name as JSON, e.g. {"us": {"nodes": "qdrant-us:6333", "api_key_file": "/etc/qv/us.key"}}
+    qdrant_cluster_name: str = Field(default="default", min_length=1, description="Name of the default cluster")
+    qdrant_clusters: dict[str, QdrantClusterConfig] = Field(default_factory=dict, description="Additional clusters")
+
+    # Resilience: retries for reads, per-node circuit breaker for everything
+    qdrant_retry_attempts: int = Field(default=3, ge=1, le=10, description="Tries per idempotent read")
+    qdrant_retry_base_delay: float = Field(default=0.1, ge=0.0, description="First backoff ceiling in seconds (doubles)")
+    qdrant_retry_max_delay: float = Field(default=2.0, ge=0.0, description="Backoff ceiling in seconds")
+    qdrant_breaker_threshold: int = Field(default=5, ge=1, description="Consecutive failures that open the breaker")
+    qdrant_breaker_reset: float = Field(default=10.0, gt=0.0, description="Seconds the breaker stays open")
+    qdrant_warmup_timeout: float = Field(default=5.0, ge=0.1, description="Max seconds to connect at startup")
+    qdrant_health_interval: float = Field(default=15.0, ge=0.0, description="Seconds between background pings (0 disables)")
+    qdrant_http_max_connections: int = Field(default=20, ge=1, le=1000, description="Pooled REST connections (snapshots)")
+    qdrant_http_keepalive_expiry: float = Field(default=30.0, ge=0.0, description="Idle seconds before a pooled connection closes")
+
+    # Caching
+    collection_cache_ttl: float = Field(
+        default=30.0, ge=0.0, description="Seconds to cache collection metadata (0 disables)"
+    )
+    stats_cache_ttl: float = Field(default=5.0, ge=0.0, description="Seconds to cache /api/stats aggregation")
+    stats_concurrency: int = Field(default=8, ge=1, le=64, description="Parallel get_collection calls for stats")
+
+    # Snapshots
+    snapshot_chunk_size: int = Field(
+        default=1024 * 1024, ge=64 * 1024, le=64 * 1024 * 1024, description="Streaming chunk size for snapshot transfers"
+    )
+    snapshot_upload_dir: Path = Field(
+        default=Path("/var/lib/quietvector/uploads"), description="Partial files for resumable chunked uploads"
+    )
+    snapshot_upload_max_chunk: int = Field(
+        default=64 * 1024 * 1024, ge=64 * 1024, le=1024 * 1024 * 1024, description="Largest accepted upload chunk"
+    )
+    snapshot_upload_max_size: int = Field(
+        default=100 * 1024**3, ge=64 * 1024, description="Largest snapshot accepted by chunked upload (preallocated)"
+    )
+    snapshot_upload_ttl: float = Field(
+        default=86400.0, ge=0.0, description="Remove upload sessions idle for this many seconds (0 keeps them)"
+    )
+    snapshot_shared_dir: Path | None = Field(
+        default=None, description="Volume shared with Qdrant; snapshots under it can be restored by path"
+    )
+    snapshot_shared_qdrant_dir: Path | None = Field(
+        default=None, description="Same volume as mounted inside Qdrant (defaults to snapshot_shared_dir)"
+    )
+    snapshot_concurrency: int = Field(default=4, ge=1, le=32, description="Parallel snapshots in batch jobs")
+    snapshot_scheduler_enabled: bool = Field(
+        default=True, description="Run scheduled snapshots in this process (due runs are claimed by one worker)"
+    )
+    snapshot_schedule_path: Path = Field(
+        default=Path("/var/lib/quietvector/snapshot_schedules.json"), description="Persisted snapshot schedules"
+    )
+
+    # Collection migrations
+    migration_state_dir: Path = Field(
+        default=Path("/var/lib/quietvector/migrations"), description="Checkpoint files for resumable migrations"
+    )
 
     # Auth (JWT)
     jwt_secret: SecretStr = Field(default=SecretStr("change_this_secret"))
@@ -37,10 +146,52 @@ class Settings(BaseSettings):
 
     # Protections
     rate_limit_per_minute: int = Field(default=60, ge=1, le=10000)
+    # Token costs per request; first (most specific) "METHOD /path-glob" match wins, default 1
+    rate_limit_route_costs: dict[str, float] = Field(
+        default={
+            "POST /api/vectors/insert": 2,
+            "POST /api/vectors/delete": 2,
+            "POST /api/collections/*/migrate": 20,
+            "POST /api/snapshots*": 10,
+            "GET /api/stats*": 2,
+        },
+        description="Rate limit tokens charged per route (JSON)",
+    )
+    rate_limit_bytes_per_token: int = Field(
+        default=65536, ge=0, description="Extra token per this many request body bytes (0 disables)"
+    )
+    rate_limit_eviction_interval: float = Field(
+        default=60.0, ge=0.0, description="Seconds between evictions of idle rate limit keys (0 disables)"
+    )
     max_body_size_bytes: int = Field(default=1048576, ge=1024, le=10_485_760)
 
+    # Shared state (rate limits, operation status); "sqlite" lets several workers on one host share it
+    state_backend: Literal["memory", "sqlite"] = Field(default="memory", description="Where cross-request state lives")
+    state_path: Path = Field(
+        default=Path("/var/lib/quietvector/state.db"), description="SQLite database for state_backend=sqlite"
+    )
+    state_busy_timeout: float = Field(
+        default=0.05, gt=0.0, le=5.0,
+        description="Seconds to wait for a locked state database; the rate limiter then lets the request through"
+    )
+    state_ops_busy_timeout: float = Field(
+        default=2.0, gt=0.0, le=60.0,
+        description="Seconds operation status writes wait for a locked state database before failing"
+    )
+    ops_retention_seconds: float = Field(
+        default=7 * 86400, ge=0.0, description="Forget operations not updated for this long (0 keeps all)"
+    )
+
     # Audit Log
     audit_log_path: Path = Field(default=Path("/var/log/quietvector/audit.log"))
+    # Audit entries are queued and written in batches by a background thread
+    audit_log_queue_size: int = Field(default=10_000, ge=1, description="Entries buffered before new ones are dropped")
+    audit_log_batch_size: int = Field(default=512, ge=1, description="Max entries per write")
+    audit_log_fsync_interval: float = Field(default=1.0, ge=0.0, description="Max seconds between fsyncs (0: every batch)")
+    audit_log_max_bytes: int = Field(default=0, ge=0, description="Rotate when the file would exceed this size (0 disables)")
+    audit_log_rotate_seconds: float = Field(default=0.0, ge=0.0, description="Rotate files older than this (0 disables)")
+    audit_log_backups: int = Field(default=10, ge=0, description="Rotated files to keep (0 keeps all)")
+    audit_log_compress: bool = Field(default=True, description="gzip rotated files")
     log_json: bool = Field(default=True)
 
     # Ops Apply (disabled by default)
@@ -62,6 +213,38 @@ class Settings(BaseSettings):
             pass
         return self.qdrant_api_key.get_secret_value() if self.qdrant_api_key else None
 
+    def get_qdrant_nodes(self) -> list[tuple[str, int]]:
+        """(host, port) per configured node; the single qdrant_host when none are listed"""
+        return parse_endpoints(self.qdrant_nodes, self.qdrant_port) or [(self.qdrant_host, self.qdrant_port)]
+
+    def get_qdrant_primary(self) -> tuple[str, int]:
+        """Node that receives writes"""
+        nodes = self.get_qdrant_nodes()
+        if self.qdrant_primary:
+            primary = parse_endpoint(self.qdrant_primary, self.qdrant_port)
+            if primary not in nodes:
+                raise ValueError(f"qdrant_primary {self.qdrant_primary!r} is not in qdrant_nodes")
+            return primary
+        return nodes[0]
+
+    def get_grpc_options(self) -> dict[str, int]:
+        """Channel arguments for the Qdrant gRPC client"""
+        options = {
+            "grpc.max_send_message_length": self.qdrant_grpc_max_send_message_bytes,
+            "grpc.max_receive_message_length": self.qdrant_grpc_max_receive_message_bytes,
+        }
+        if self.qdrant_grpc_keepalive_time > 0:
+            options.update({
+                "grpc.keepalive_time_ms": int(self.qdrant_grpc_keepalive_time * 1000),
+                "grpc.keepalive_timeout_ms": int(self.qdrant_grpc_keepalive_timeout * 1000),
+                "grpc.keepalive_permit_without_calls": 1,
+                "grpc.http2.max_pings_without_data": 0,
+            })
+        if self.qdrant_grpc_channels > 1:
+            # Otherwise channels with identical args share one subchannel (TCP connection)
+            options["grpc.use_local_subchannel_pool"] = 1
+        return options
+
     def get_jwt_secret(self) -> str:
         return self.jwt_secret.get_secret_value()
 
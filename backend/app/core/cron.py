@@ -0,0 +1,103 @@
+"""
+Minimal cron expressions
+Standard 5-field syntax (minute hour day-of-month month day-of-week)
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+# (min, max) per field, in expression order
+_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# Upper bound for next_after(); covers Feb 29 schedules
+_MAX_LOOKAHEAD = timedelta(days=366 * 5)
+
+
+def _parse_field(text: str, lo: int, hi: int) -> set[int]:
+    values: set[int] = set()
+    for part in text.split(","):
+        body, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in {part!r}")
+        if body == "*":
+            start, end = lo, hi
+        elif "-" in body:
+            a, b = body.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(body)
+            end = hi if step_text else start
+        if not lo <= start <= end <= hi:
+            raise ValueError(f"Value out of range in {part!r} ({lo}-{hi})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """
+    Parsed cron expression
+
+    Supports *, lists, ranges and steps plus the @hourly/@daily/@weekly/
+    @monthly aliases. Day-of-month and day-of-week follow cron's rule: when
+    both are restricted, a day matching either one fires.
+    """
+
+    def __init__(self, expr: str) -> None:
+        self.expr = expr.strip()
+        fields = _ALIASES.get(self.expr, self.expr).split()
+        if len(fields) != 5:
+            raise ValueError("Cron expression needs 5 fields: minute hour day month weekday")
+        try:
+            parsed = [_parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, _BOUNDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expr!r}: {e}") from None
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 0 and 7 are both Sunday
+        self.weekdays = {d % 7 for d in weekdays}
+        self._dom_any = fields[2] == "*"
+        self._dow_any = fields[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def matches(self, dt: datetime) -> bool:
+        return (
+            dt.month in self.months
+            and self._day_matches(dt)
+            and dt.hour in self.hours
+            and dt.minute in self.minutes
+        )
+
+    def next_after(self, dt: datetime) -> datetime:
+        """
+        First matching minute strictly after dt (keeps dt's tzinfo)
+
+        Raises:
+            ValueError: If nothing matches within the lookahead (e.g. Feb 30)
+        """
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + _MAX_LOOKAHEAD
+        while t <= limit:
+            if t.month not in self.months:
+                year, month = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+                t = t.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression {self.expr!r} never matches")
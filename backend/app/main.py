@@ -4,6 +4,7 @@ Sade, güvenli Qdrant yönetim arayüzünün FastAPI backend'i.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -19,7 +20,9 @@ from .routes import vectors as vectors_routes
 from .routes import snapshots as snapshots_routes
 from .routes import stats as stats_routes
 from .routes import security as security_routes
+from .routes import clusters as clusters_routes
 
+from .core.audit import audit_writer
 from .core.config import Settings
 from .core.logging import setup_logging, get_logger
 from .core.middleware import (
@@ -29,7 +32,21 @@ from .core.middleware import (
     RateLimitMiddleware,
     RequestIDMiddleware,
 )
-from .qdrant.client import close_qdrant_client
+from .core.state import state_backend
+from .qdrant.client import (
+    close_qdrant_client,
+    qdrant_health,
+    start_health_probe,
+    start_key_watch,
+    stop_health_probe,
+    stop_key_watch,
+    warmup_qdrant_client,
+)
+from .qdrant.clusters import clusters
+from .qdrant.http import close_qdrant_http_client
+from .qdrant.resilience import CircuitOpenError
+from .services.snapshot_scheduler import scheduler as snapshot_scheduler
+from .services.snapshot_uploads import upload_store
 
 settings = Settings()
 
@@ -53,11 +70,29 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             "api_port": settings.api_port
         }
     )
+    audit_writer.start()
+    await warmup_qdrant_client(settings.qdrant_warmup_timeout)
+    start_health_probe(settings.qdrant_health_interval)
+    start_key_watch(settings.qdrant_api_key_poll_interval)
+    # Additional clusters connect lazily; only their background upkeep starts here
+    clusters.start(settings.qdrant_health_interval, settings.qdrant_api_key_poll_interval)
+    if settings.snapshot_scheduler_enabled:
+        snapshot_scheduler.start()
+    upload_store.start_sweep(settings.snapshot_upload_ttl)
     yield
     # Shutdown
     logger.info("QuietVector shutting down")
+    await snapshot_scheduler.stop()
+    await upload_store.stop_sweep()
+    await stop_health_probe()
+    await stop_key_watch()
     await close_qdrant_client()
-    logger.info("Qdrant client closed gracefully")
+    await close_qdrant_http_client()
+    await clusters.close()
+    logger.info("Qdrant clients closed gracefully")
+    # Last, so everything logged during shutdown is on disk
+    state_backend.close()
+    await asyncio.to_thread(audit_writer.close)
 
 
 app = FastAPI(
@@ -80,12 +115,41 @@ if settings.frontend_origin:
     )
 
 # Protections & audit
+# Streaming snapshot uploads; every other route (JSON snapshot routes included) keeps the
+# body limit and is charged by size
+STREAMING_UPLOAD_ROUTES = (
+    "POST /api/snapshots/{collection}/restore",
+    "POST /api/snapshots/{collection}/restore_async",
+    "PUT /api/snapshots/uploads/{upload_id}/chunks/{index}",
+)
 # Order matters: RequestID → BodySize → RateLimit → CSRF → Audit
 app.add_middleware(RequestIDMiddleware)
-app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.max_body_size_bytes)
-app.add_middleware(RateLimitMiddleware, per_minute=settings.rate_limit_per_minute)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.max_body_size_bytes,
+    exempt_routes=STREAMING_UPLOAD_ROUTES,
+)
+app.add_middleware(
+    RateLimitMiddleware,
+    per_minute=settings.rate_limit_per_minute,
+    route_costs=settings.rate_limit_route_costs,
+    bytes_per_token=settings.rate_limit_bytes_per_token,
+    cost_exempt_routes=STREAMING_UPLOAD_ROUTES,
+    eviction_interval=settings.rate_limit_eviction_interval,
+    backend=state_backend,
+)
 app.add_middleware(CSRFMiddleware)
-app.add_middleware(AuditLogMiddleware, path=settings.audit_log_path)
+app.add_middleware(AuditLogMiddleware, writer=audit_writer)
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError) -> JSONResponse:
+    # Qdrant is known to be down: fail fast and tell clients when to come back
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
 
 
 @app.exception_handler(Exception)
@@ -108,7 +172,7 @@ async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONR
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "qdrant": qdrant_health()}
 
 
 
@@ -120,4 +184,5 @@ api.include_router(vectors_routes.router)
 api.include_router(snapshots_routes.router)
 api.include_router(stats_routes.router)
 api.include_router(security_routes.router)
+api.include_router(clusters_routes.router)
 app.include_router(api, prefix="/api")
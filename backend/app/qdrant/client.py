@@ -1,59 +1,301 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator
 
+import grpc
 from qdrant_client import AsyncQdrantClient
 
 from ..core.config import Settings
 from ..core.logging import get_logger
+from .keys import qdrant_key_provider
+from .pool import QdrantPool, build_pool, retire_nodes
+from .resilience import CircuitBreaker, RetryPolicy
 
 logger = get_logger(__name__)
 settings = Settings()
-_qdrant: AsyncQdrantClient | None = None
+_qdrant: QdrantPool | None = None
+# Serializes client creation so concurrent first requests share one client
+_init_lock = asyncio.Lock()
+_probe_task: asyncio.Task[None] | None = None
+_key_watch_task: asyncio.Task[None] | None = None
+# Key version the current pool was built with (see ApiKeyProvider.version)
+_pool_key_version = 0
+# Nodes replaced by a key rotation, closed once their in-flight calls are done
+_retiring: set[asyncio.Task[None]] = set()
+# Fails fast while (re)connecting keeps failing instead of queueing callers on the lock
+_connect_breaker = CircuitBreaker("connect", threshold=1, reset_timeout=settings.qdrant_breaker_reset)
+_health: dict[str, Any] = {"healthy": False, "last_check": None, "latency_ms": None, "error": None}
 
 
-async def get_qdrant_client() -> AsyncQdrantClient:
+async def get_qdrant_client() -> QdrantPool:
     """
     Get or create singleton async Qdrant client with connection pooling
 
+    Normally the client already exists (created by warmup_qdrant_client at
+    startup); otherwise the first caller connects while the others wait.
+    With several qdrant_nodes, reads are spread over healthy nodes and
+    writes go to the primary (see QdrantPool).
+
     Returns:
-        AsyncQdrantClient instance
+        QdrantPool, used exactly like an AsyncQdrantClient
     """
-    global _qdrant
-    if _qdrant is None:
-        logger.info(
-            "Connecting to Qdrant (async)",
-            extra={
-                "host": settings.qdrant_host,
-                "port": settings.qdrant_port,
-                "https": settings.use_https
-            }
+    global _qdrant, _pool_key_version
+    if _qdrant is not None:
+        return _qdrant
+    _connect_breaker.before_call()
+    async with _init_lock:
+        if _qdrant is None:
+            version = qdrant_key_provider.version
+            try:
+                _qdrant = await _connect(qdrant_key_provider.get())
+            except Exception:
+                _connect_breaker.record_failure()
+                raise
+            _pool_key_version = version
+    _connect_breaker.record_success()
+    return _qdrant
+
+
+_GRPC_COMPRESSION = {"none": None, "gzip": grpc.Compression.Gzip}
+
+
+def _make_client(host: str, port: int, api_key: str | None = None) -> AsyncQdrantClient:
+    return AsyncQdrantClient(
+        host=host,
+        port=port,
+        api_key=api_key,
+        https=port == 443,
+        timeout=settings.qdrant_timeout,
+        grpc_port=settings.qdrant_grpc_port,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        # Keepalive and message size limits (see Settings.get_grpc_options)
+        grpc_options=settings.get_grpc_options(),
+        grpc_compression=_GRPC_COMPRESSION[settings.qdrant_grpc_compression],
+    )
+
+
+async def connect_pool(
+    nodes: list[tuple[str, int]],
+    primary: tuple[str, int],
+    api_key: str | None,
+    cluster: str,
+) -> QdrantPool:
+    """
+    Build and ping a node pool with the shared transport/resilience settings
+
+    Raises:
+        Exception: When no node answers (see build_pool)
+    """
+    logger.info(
+        "Connecting to Qdrant (async)",
+        extra={
+            "cluster": cluster,
+            "nodes": [f"{h}:{p}" for h, p in nodes],
+            "primary": f"{primary[0]}:{primary[1]}",
+            "grpc": settings.qdrant_prefer_grpc,
+            "grpc_compression": settings.qdrant_grpc_compression,
+            "grpc_channels": settings.qdrant_grpc_channels,
+        }
+    )
+    # Sanity check every node (also opens the gRPC channels)
+    try:
+        pool = await build_pool(
+            nodes,
+            primary,
+            lambda host, port: _make_client(host, port, api_key),
+            settings.qdrant_timeout,
+            channels=settings.qdrant_grpc_channels,
+            alpha=settings.qdrant_latency_alpha,
+            eject_after=settings.qdrant_eject_after,
+            readmit_after=settings.qdrant_readmit_after,
+            breaker_threshold=settings.qdrant_breaker_threshold,
+            breaker_reset=settings.qdrant_breaker_reset,
+            retry=RetryPolicy(
+                attempts=settings.qdrant_retry_attempts,
+                base_delay=settings.qdrant_retry_base_delay,
+                max_delay=settings.qdrant_retry_max_delay,
+            ),
+            cluster=cluster,
+        )
+    except Exception as e:
+        logger.error(
+            "Failed to connect to Qdrant",
+            exc_info=True,
+            extra={"cluster": cluster, "error": str(e)}
         )
-        _qdrant = AsyncQdrantClient(
-            host=settings.qdrant_host,
-            port=settings.qdrant_port,
-            api_key=settings.get_qdrant_api_key(),
-            https=settings.use_https,
-            timeout=settings.qdrant_timeout,
-            # Connection pooling configuration
-            grpc_port=6334,  # gRPC for better performance
-            prefer_grpc=True,
+        raise
+    logger.info(
+        "Qdrant async connection established",
+        extra={"cluster": cluster, "healthy_nodes": sum(1 for n in pool.nodes if n.healthy)}
+    )
+    return pool
+
+
+async def _connect(api_key: str | None) -> QdrantPool:
+    return await connect_pool(
+        settings.get_qdrant_nodes(),
+        settings.get_qdrant_primary(),
+        api_key,
+        settings.qdrant_cluster_name,
+    )
+
+
+async def warmup_qdrant_client(timeout: float) -> bool:
+    """
+    Connect and ping Qdrant before serving traffic
+    Called from the application lifespan. A failure is logged, not raised:
+    the API still starts and the health probe keeps trying to connect.
+
+    Returns:
+        True if the client is connected
+    """
+    try:
+        await asyncio.wait_for(get_qdrant_client(), timeout)
+        _record_health(True)
+        return True
+    except Exception as e:
+        _record_health(False, error=str(e) or type(e).__name__)
+        logger.warning(
+            "Qdrant warmup failed; continuing without a connection",
+            extra={"timeout": timeout, "error": str(e) or type(e).__name__}
         )
-        # Sanity check connection
+        return False
+
+
+def _record_health(healthy: bool, latency_ms: float | None = None, error: str | None = None) -> None:
+    _health.update(healthy=healthy, last_check=time.time(), latency_ms=latency_ms, error=error)
+
+
+def qdrant_health() -> dict[str, Any]:
+    """Result of the last background health probe, with per-node state"""
+    return {**_health, "nodes": _qdrant.status() if _qdrant is not None else []}
+
+
+async def probe_qdrant() -> bool:
+    """
+    Health-check every node once (connecting first if needed)
+
+    Nodes are ejected / readmitted as a side effect.
+
+    Returns:
+        True if at least one node answered
+    """
+    start = time.perf_counter()
+    try:
+        pool = await asyncio.wait_for(get_qdrant_client(), settings.qdrant_timeout)
+        healthy = await pool.check_health(settings.qdrant_timeout)
+    except Exception as e:
+        _record_health(False, error=str(e) or type(e).__name__)
+        return False
+    if not healthy:
+        _record_health(False, error=pool.primary.last_error)
+        return False
+    _record_health(True, latency_ms=round((time.perf_counter() - start) * 1000, 2))
+    return True
+
+
+async def _probe_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        was_healthy = _health["healthy"]
+        healthy = await probe_qdrant()
+        if healthy != was_healthy:
+            logger.log(
+                logging.INFO if healthy else logging.WARNING,
+                "Qdrant health changed",
+                extra={"healthy": healthy, "error": _health["error"]}
+            )
+
+
+def start_health_probe(interval: float) -> None:
+    """Keep the connection warm with periodic background pings"""
+    global _probe_task
+    if interval > 0 and _probe_task is None:
+        _probe_task = asyncio.create_task(_probe_loop(interval))
+
+
+async def stop_health_probe() -> None:
+    global _probe_task
+    if _probe_task is not None:
+        _probe_task.cancel()
+        await asyncio.gather(_probe_task, return_exceptions=True)
+        _probe_task = None
+
+
+async def rotate_qdrant_client() -> bool:
+    """
+    Swap in nodes using the pending (or newly accepted) API key, without downtime
+
+    The new nodes are connected (and pinged) with the pending key before
+    the pool adopts them, and only then does the key become current (REST
+    calls switch too). The pool object itself stays, so callers holding it
+    (migrations, alias swap grace tasks) carry on over the new nodes. The
+    old nodes are closed after qdrant_timeout seconds, once no call is in
+    flight on them. If Qdrant rejects the new key (it has not been
+    restarted with it yet), everything keeps the old key and the caller
+    tries again later.
+
+    Returns:
+        True if the pool moved to nodes using the new key
+    """
+    global _qdrant, _pool_key_version
+    provider = qdrant_key_provider
+    async with _init_lock:
+        # The REST pool may already have accepted the pending key; then the gRPC pool catches up
+        key = provider.pending if provider.has_pending else provider.get()
         try:
-            await _qdrant.get_collections()
-            logger.info("Qdrant async connection established")
+            pool = await _connect(key)
         except Exception as e:
-            logger.error(
-                "Failed to connect to Qdrant",
-                exc_info=True,
-                extra={"error": str(e)}
+            logger.warning(
+                "Qdrant key rotation pending; keeping current client",
+                extra={"key_version": provider.version, "error": str(e) or type(e).__name__}
             )
-            _qdrant = None
-            raise
-    return _qdrant
+            return False
+        provider.accept(key)
+        version = provider.version
+        if _qdrant is None:
+            _qdrant, old = pool, []
+        else:
+            old = _qdrant.adopt(pool)
+        _pool_key_version = version
+    if old:
+        task = asyncio.create_task(retire_nodes(old, settings.qdrant_timeout))
+        _retiring.add(task)
+        task.add_done_callback(_retiring.discard)
+    logger.info("Qdrant client swapped after key rotation", extra={"key_version": version})
+    return True
+
+
+async def _key_watch_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # stat (and read on change) off the event loop
+            await asyncio.to_thread(qdrant_key_provider.refresh)
+            stale = qdrant_key_provider.has_pending or qdrant_key_provider.version != _pool_key_version
+            if _qdrant is not None and stale:
+                await rotate_qdrant_client()
+        except Exception as e:
+            logger.warning("Qdrant key watch failed", extra={"error": str(e)})
+
+
+def start_key_watch(interval: float) -> None:
+    """Poll the API key file and rotate the client when the key changes"""
+    global _key_watch_task
+    if interval > 0 and settings.qdrant_api_key_file and _key_watch_task is None:
+        _key_watch_task = asyncio.create_task(_key_watch_loop(interval))
+
+
+async def stop_key_watch() -> None:
+    global _key_watch_task
+    if _key_watch_task is not None:
+        _key_watch_task.cancel()
+        await asyncio.gather(_key_watch_task, return_exceptions=True)
+        _key_watch_task = None
 
 
 @asynccontextmanager
@@ -80,7 +322,7 @@ async def qdrant_client() -> AsyncGenerator[AsyncQdrantClient, None]:
 def reset_qdrant_client() -> None:
     """
     Reset Qdrant client (forces reconnection on next call)
-    Used after key rotation.
+    Prefer rotate_qdrant_client, which keeps serving until the new key works.
     """
     global _qdrant
     if _qdrant is not None:
@@ -94,6 +336,9 @@ async def close_qdrant_client() -> None:
     Called during application shutdown.
     """
     global _qdrant
+    for task in list(_retiring):
+        task.cancel()
+    await asyncio.gather(*_retiring, return_exceptions=True)
     if _qdrant is not None:
         try:
             await _qdrant.close()
@@ -0,0 +1,248 @@
+"""
+Qdrant Clusters
+Named clusters, each with its own lazily created node pool and REST pool
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import httpx
+
+from ..core.config import QdrantClusterConfig, Settings
+from ..core.logging import get_logger
+from .client import connect_pool, get_qdrant_client, qdrant_health
+from .http import ApiKeyAuth, get_qdrant_http_client, make_qdrant_http_client, qdrant_base_url
+from .keys import ApiKeyProvider
+from .pool import QdrantPool, retire_nodes
+from .resilience import CircuitBreaker
+
+logger = get_logger(__name__)
+settings = Settings()
+
+
+class UnknownClusterError(LookupError):
+    """Cluster name not in the configuration"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Unknown Qdrant cluster: {name}")
+        self.name = name
+
+
+class QdrantCluster:
+    """
+    An additional cluster from settings.qdrant_clusters
+
+    Mirrors the default cluster's lifecycle (app.qdrant.client): the pool is
+    created on first use behind a lock and a connect breaker, health checks
+    eject/readmit nodes, and a key change moves the pool to new nodes without
+    dropping in-flight calls.
+    """
+
+    def __init__(self, name: str, config: QdrantClusterConfig) -> None:
+        self.name = name
+        self.nodes = config.get_nodes(settings.qdrant_port)
+        self.primary = config.get_primary(settings.qdrant_port)
+        self.key_provider = ApiKeyProvider(config.api_key_file, config.api_key)
+        self._pool: QdrantPool | None = None
+        self._key_version = 0
+        self._lock = asyncio.Lock()
+        self._breaker = CircuitBreaker(f"connect:{name}", threshold=1, reset_timeout=settings.qdrant_breaker_reset)
+        self._http: httpx.AsyncClient | None = None
+        self._retiring: set[asyncio.Task[None]] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._pool is not None
+
+    async def _connect(self, api_key: str | None) -> QdrantPool:
+        return await connect_pool(self.nodes, self.primary, api_key, self.name)
+
+    async def client(self) -> QdrantPool:
+        """
+        Get or create this cluster's pool
+
+        Raises:
+            CircuitOpenError: While connecting keeps failing
+        """
+        if self._pool is not None:
+            return self._pool
+        self._breaker.before_call()
+        async with self._lock:
+            if self._pool is None:
+                version = self.key_provider.version
+                try:
+                    self._pool = await self._connect(self.key_provider.get())
+                except Exception:
+                    self._breaker.record_failure()
+                    raise
+                self._key_version = version
+        self._breaker.record_success()
+        return self._pool
+
+    def http(self) -> httpx.AsyncClient:
+        """This cluster's REST pool (snapshots), bound to its primary"""
+        if self._http is None:
+            self._http = make_qdrant_http_client(qdrant_base_url(self.primary), ApiKeyAuth(self.key_provider))
+        return self._http
+
+    async def probe(self) -> bool:
+        """Health-check a connected pool (never connects)"""
+        if self._pool is None:
+            return False
+        return await self._pool.check_health(settings.qdrant_timeout)
+
+    async def refresh_key(self) -> bool:
+        """
+        Re-check the key file; move the pool to new nodes once Qdrant takes the new key
+
+        The new key only becomes current (for REST calls too) after nodes
+        connected with it answer; until then everything keeps the old key.
+
+        Returns:
+            True if the pool adopted nodes connected with the new key
+        """
+        provider = self.key_provider
+        await asyncio.to_thread(provider.refresh)
+        if self._pool is None or not (provider.has_pending or provider.version != self._key_version):
+            return False
+        async with self._lock:
+            key = provider.pending if provider.has_pending else provider.get()
+            try:
+                pool = await self._connect(key)
+            except Exception as e:
+                logger.warning(
+                    "Qdrant key rotation pending; keeping current client",
+                    extra={"cluster": self.name, "key_version": provider.version, "error": str(e) or type(e).__name__}
+                )
+                return False
+            provider.accept(key)
+            version = provider.version
+            old = self._pool.adopt(pool)
+            self._key_version = version
+        task = asyncio.create_task(retire_nodes(old, settings.qdrant_timeout))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+        logger.info("Qdrant client swapped after key rotation", extra={"cluster": self.name, "key_version": version})
+        return True
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "nodes": self._pool.status() if self._pool is not None else [],
+        }
+
+    async def close(self) -> None:
+        for task in list(self._retiring):
+            task.cancel()
+        await asyncio.gather(*self._retiring, return_exceptions=True)
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class ClusterRegistry:
+    """
+    All configured clusters by name
+
+    The default cluster is the one described by the top-level qdrant_*
+    settings and is served by app.qdrant.client / app.qdrant.http as
+    before; the others come from settings.qdrant_clusters.
+    """
+
+    def __init__(self, configs: dict[str, QdrantClusterConfig], default: str) -> None:
+        if default in configs:
+            raise ValueError(f"qdrant_clusters must not redefine the default cluster {default!r}")
+        self.default = default
+        self._clusters = {name: QdrantCluster(name, cfg) for name, cfg in configs.items()}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def names(self) -> list[str]:
+        return [self.default, *self._clusters]
+
+    def resolve(self, name: str | None) -> str:
+        """
+        Raises:
+            UnknownClusterError: If the name is not configured
+        """
+        if name is None or name == self.default:
+            return self.default
+        if name not in self._clusters:
+            raise UnknownClusterError(name)
+        return name
+
+    def get(self, name: str) -> QdrantCluster:
+        """
+        Raises:
+            UnknownClusterError: For unknown names and for the default cluster
+        """
+        if name not in self._clusters:
+            raise UnknownClusterError(name)
+        return self._clusters[name]
+
+    async def client(self, name: str | None = None) -> QdrantPool:
+        name = self.resolve(name)
+        if name == self.default:
+            return await get_qdrant_client()
+        return await self._clusters[name].client()
+
+    def http(self, name: str | None = None) -> httpx.AsyncClient:
+        name = self.resolve(name)
+        if name == self.default:
+            return get_qdrant_http_client()
+        return self._clusters[name].http()
+
+    def status(self) -> list[dict[str, Any]]:
+        default = qdrant_health()
+        return [
+            {"name": self.default, "default": True, "connected": bool(default["nodes"]), "nodes": default["nodes"]},
+            *({"name": name, "default": False, **c.status()} for name, c in self._clusters.items()),
+        ]
+
+    # Background maintenance of the additional clusters
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            results = await asyncio.gather(*(c.probe() for c in self._clusters.values()), return_exceptions=True)
+            for name, res in zip(self._clusters, results):
+                if isinstance(res, Exception):
+                    logger.warning("Qdrant cluster probe failed", extra={"cluster": name, "error": str(res)})
+
+    async def _key_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            results = await asyncio.gather(
+                *(c.refresh_key() for c in self._clusters.values()), return_exceptions=True
+            )
+            for name, res in zip(self._clusters, results):
+                if isinstance(res, Exception):
+                    logger.warning("Qdrant key watch failed", extra={"cluster": name, "error": str(res)})
+
+    def start(self, health_interval: float, key_interval: float) -> None:
+        """Start health probes and key watches for the additional clusters"""
+        if self._tasks or not self._clusters:
+            return
+        if health_interval > 0:
+            self._tasks.append(asyncio.create_task(self._health_loop(health_interval)))
+        if key_interval > 0 and any(c.key_provider.key_file for c in self._clusters.values()):
+            self._tasks.append(asyncio.create_task(self._key_loop(key_interval)))
+
+    async def close(self) -> None:
+        """Stop background tasks and close every additional cluster's pools"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for name, cluster in self._clusters.items():
+            try:
+                await cluster.close()
+            except Exception as e:
+                logger.warning("Error closing Qdrant cluster", extra={"cluster": name, "error": str(e)})
+
+
+# Global registry
+clusters = ClusterRegistry(settings.qdrant_clusters, settings.qdrant_cluster_name)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import Generator
+
+import httpx
+
+from ..core.config import Settings
+from ..core.logging import get_logger
+from .keys import ApiKeyProvider, qdrant_key_provider
+
+logger = get_logger(__name__)
+settings = Settings()
+_http: httpx.AsyncClient | None = None
+
+
+def qdrant_base_url(primary: tuple[str, int] | None = None) -> str:
+    # Snapshots live on the node that took them, so REST calls stick to the primary
+    host, port = primary or settings.get_qdrant_primary()
+    scheme = "https" if port == 443 else "http"
+    return f"{scheme}://{host}:{port}"
+
+
+class ApiKeyAuth(httpx.Auth):
+    """
+    Sets the api-key header from a key provider on every request (no I/O)
+
+    While a new key is pending (written but Qdrant not yet restarted), a
+    401/403 with the current key is retried once with the pending one, and
+    the pending key becomes current if Qdrant accepts it. Streamed bodies
+    (snapshot uploads) cannot be replayed and are not retried.
+    """
+
+    def __init__(self, key_provider: ApiKeyProvider) -> None:
+        self.key_provider = key_provider
+
+    @staticmethod
+    def _set_key(request: httpx.Request, key: str | None) -> None:
+        if key:
+            request.headers["api-key"] = key
+        else:
+            request.headers.pop("api-key", None)
+
+    def auth_flow(self, request: httpx.Request) -> Generator[httpx.Request, httpx.Response, None]:
+        key = self.key_provider.get()
+        self._set_key(request, key)
+        response = yield request
+        provider = self.key_provider
+        if (
+            response.status_code in (401, 403)
+            and provider.has_pending
+            and provider.pending != key
+            and isinstance(request.stream, httpx.ByteStream)
+        ):
+            pending = provider.pending
+            self._set_key(request, pending)
+            response = yield request
+            if response.status_code not in (401, 403):
+                provider.accept(pending)
+
+
+def make_qdrant_http_client(base_url: str, auth: httpx.Auth | None = None) -> httpx.AsyncClient:
+    """Pooled httpx client for one Qdrant cluster's REST API"""
+    logger.info(
+        "Creating Qdrant HTTP pool",
+        extra={"base_url": base_url, "max_connections": settings.qdrant_http_max_connections}
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        auth=auth,
+        http2=True,
+        timeout=httpx.Timeout(settings.qdrant_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.qdrant_http_max_connections,
+            max_keepalive_connections=settings.qdrant_http_max_connections,
+            keepalive_expiry=settings.qdrant_http_keepalive_expiry,
+        ),
+    )
+
+
+def get_qdrant_http_client() -> httpx.AsyncClient:
+    """
+    Get or create the shared httpx client for Qdrant REST calls (snapshots)
+    on the default cluster
+
+    Connections are kept alive and reused across requests; HTTP/2 is
+    negotiated via ALPN when Qdrant is served over TLS.
+
+    Returns:
+        httpx.AsyncClient bound to the Qdrant base URL
+    """
+    global _http
+    if _http is None:
+        _http = make_qdrant_http_client(qdrant_base_url(), ApiKeyAuth(qdrant_key_provider))
+    return _http
+
+
+async def close_qdrant_http_client() -> None:
+    """
+    Close the shared HTTP pool
+    Called during application shutdown.
+    """
+    global _http
+    if _http is not None:
+        try:
+            await _http.aclose()
+            logger.info("Qdrant HTTP pool closed")
+        except Exception as e:
+            logger.warning(
+                "Error closing Qdrant HTTP pool",
+                extra={"error": str(e)}
+            )
+        finally:
+            _http = None
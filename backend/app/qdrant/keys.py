@@ -0,0 +1,123 @@
+"""
+Qdrant API key provider
+In-memory key cache refreshed from qdrant_api_key_file by stat polling
+"""
+from __future__ import annotations
+
+import os
+import stat
+from pathlib import Path
+
+from pydantic import SecretStr
+
+from ..core.config import Settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = Settings()
+
+
+class ApiKeyProvider:
+    """
+    Cached Qdrant API key
+
+    get() never touches the disk after the first load. refresh() stats the
+    key file (falling back to a fixed key) and only re-reads it when mtime/size/inode changed (atomic
+    replace and in-place writes are both caught).
+
+    A changed key is only staged as `pending`: Qdrant keeps accepting the
+    old one until it is restarted, so get() returns the old key until a
+    caller sees Qdrant accept the new one and calls accept(). `version`
+    increases on every accepted change so holders of a client can tell
+    theirs is stale.
+    """
+
+    def __init__(self, key_file: Path | None = None, fallback: SecretStr | None = None) -> None:
+        self.key_file = key_file
+        self._fallback = fallback
+        self._key: str | None = None
+        self._pending: str | None = None
+        self._staged = False
+        self._stamp: tuple[int, int, int] | None = None
+        self._loaded = False
+        self.version = 0
+
+    def get(self) -> str | None:
+        if not self._loaded:
+            self.refresh()
+        return self._key
+
+    @property
+    def has_pending(self) -> bool:
+        """A new key is waiting for Qdrant to accept it"""
+        return self._staged
+
+    @property
+    def pending(self) -> str | None:
+        return self._pending
+
+    def _read_file(self) -> tuple[tuple[int, int, int] | None, str | None, bool]:
+        """(stamp, key, unchanged) for the key file"""
+        path = self.key_file
+        if not path:
+            return None, None, False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None, False
+        if not stat.S_ISREG(st.st_mode):
+            return None, None, False
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if self._loaded and stamp == self._stamp:
+            return stamp, self._key, True
+        try:
+            return stamp, path.read_text(encoding="utf-8").strip() or None, False
+        except OSError as e:
+            logger.warning("Could not read Qdrant API key file", extra={"path": str(path), "error": str(e)})
+            return None, None, False
+
+    def refresh(self) -> bool:
+        """
+        Re-check the key source
+
+        Returns:
+            True if a new key was staged
+        """
+        stamp, key, unchanged = self._read_file()
+        if unchanged:
+            return False
+        if key is None and self._fallback:
+            key = self._fallback.get_secret_value() or None
+        self._stamp = stamp
+        if not self._loaded:
+            self._loaded = True
+            self._key = key
+            self.version += 1
+            return False
+        if key == self._key:
+            # Reverted before Qdrant ever took the staged key
+            self._pending, self._staged = None, False
+            return False
+        if self._staged and key == self._pending:
+            return False
+        self._pending, self._staged = key, True
+        logger.info("Qdrant API key staged", extra={"version": self.version})
+        return True
+
+    def accept(self, key: str | None) -> bool:
+        """
+        Make the pending key current once Qdrant has accepted it
+
+        Returns:
+            True if `key` was the pending key
+        """
+        if not self._staged or key != self._pending:
+            return False
+        self._key, self._pending, self._staged = key, None, False
+        self.version += 1
+        logger.info("Qdrant API key changed", extra={"version": self.version})
+        return True
+
+
+# Global provider (default cluster)
+qdrant_key_provider = ApiKeyProvider(settings.qdrant_api_key_file, settings.qdrant_api_key)
@@ -0,0 +1,309 @@
+"""
+Qdrant Node Pool
+One AsyncQdrantClient per cluster node with latency-aware read routing
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from typing import Any, Callable
+
+from qdrant_client import AsyncQdrantClient
+
+from ..core.logging import get_logger
+from ..core.metrics import QDRANT_OP_ERRORS, QDRANT_OP_INFLIGHT, QDRANT_OP_LATENCY, QDRANT_RETRIES
+from .resilience import CircuitBreaker, RetryPolicy, retry_async
+from .telemetry import collection_label, learn_collections, record_received, record_sent
+
+logger = get_logger(__name__)
+
+# Client methods that never modify data; any node can serve them
+READ_METHODS = frozenset({
+    "collection_exists",
+    "count",
+    "discover",
+    "discover_batch",
+    "get_aliases",
+    "get_collection",
+    "get_collection_aliases",
+    "get_collections",
+    "list_full_snapshots",
+    "list_snapshots",
+    "query",
+    "query_batch",
+    "recommend",
+    "recommend_batch",
+    "recommend_groups",
+    "retrieve",
+    "scroll",
+    "search",
+    "search_batch",
+    "search_groups",
+})
+
+
+class QdrantNode:
+    """A cluster node, its clients (one per gRPC channel) and routing statistics"""
+
+    def __init__(self, host: str, port: int, client: AsyncQdrantClient, *channels: AsyncQdrantClient) -> None:
+        self.host = host
+        self.port = port
+        # `client` also serves health checks; calls rotate over all channels
+        self.client = client
+        self.clients = [client, *channels]
+        self._next = 0
+        self.healthy = True
+        # Smoothed latency of successful calls and health checks
+        self.ewma_ms: float | None = None
+        self.inflight = 0
+        self.failures = 0
+        self.successes = 0
+        self.last_error: str | None = None
+        self.breaker = CircuitBreaker(self.name)
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def next_client(self) -> AsyncQdrantClient:
+        client = self.clients[self._next % len(self.clients)]
+        self._next += 1
+        return client
+
+    def score(self) -> float:
+        """Lower is better: expected latency scaled by queued work"""
+        return (self.ewma_ms or 0.0) * (self.inflight + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "node": self.name,
+            "healthy": self.healthy,
+            "ewma_ms": round(self.ewma_ms, 2) if self.ewma_ms is not None else None,
+            "inflight": self.inflight,
+            "breaker": self.breaker.state,
+            "last_error": self.last_error,
+        }
+
+
+class QdrantPool:
+    """
+    Drop-in stand-in for AsyncQdrantClient over several nodes
+
+    Read methods (READ_METHODS) go to the healthy node with the lowest
+    latency EWMA, weighted by in-flight calls; everything else goes to the
+    primary. Health checks eject a node after `eject_after` consecutive
+    failures and readmit it after `readmit_after` consecutive passes. With
+    every node ejected, reads fall back to trying all of them.
+
+    Every call passes through the node's circuit breaker, so a node that is
+    down fails fast instead of costing each caller the full timeout. Reads
+    are idempotent and retried (on another node when there is one) with
+    jittered backoff; writes are never retried.
+    """
+
+    def __init__(
+        self,
+        nodes: list[QdrantNode],
+        primary: int = 0,
+        alpha: float = 0.3,
+        eject_after: int = 3,
+        readmit_after: int = 2,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 10.0,
+        retry: RetryPolicy | None = None,
+        cluster: str = "default",
+    ) -> None:
+        if not nodes:
+            raise ValueError("QdrantPool needs at least one node")
+        self.nodes = nodes
+        self.cluster = cluster
+        self.primary = nodes[primary]
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.readmit_after = readmit_after
+        self.retry = retry or RetryPolicy()
+        for node in nodes:
+            node.breaker.threshold = breaker_threshold
+            node.breaker.reset_timeout = breaker_reset
+
+    def pick_read_node(self) -> QdrantNode:
+        candidates = (
+            [n for n in self.nodes if n.healthy and not n.breaker.is_open()]
+            or [n for n in self.nodes if n.healthy]
+            or self.nodes
+        )
+        return min(candidates, key=QdrantNode.score)
+
+    def _observe(self, node: QdrantNode, elapsed_ms: float) -> None:
+        if node.ewma_ms is None:
+            node.ewma_ms = elapsed_ms
+        else:
+            node.ewma_ms = self.alpha * elapsed_ms + (1 - self.alpha) * node.ewma_ms
+
+    async def call(self, node: QdrantNode, method: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Invoke a client method on a node, tracking in-flight calls and latency
+
+        Also feeds the per-operation Prometheus metrics (latency histogram,
+        in-flight gauge, point/vector/payload volume) labelled by cluster
+        and collection.
+        """
+        labels = (self.cluster, method, collection_label(self.cluster, args, kwargs))
+        inflight = QDRANT_OP_INFLIGHT.labels(*labels)
+
+        async def attempt() -> Any:
+            record_sent(labels, kwargs)
+            t0 = time.perf_counter()
+            try:
+                return await getattr(node.next_client(), method)(*args, **kwargs)
+            except Exception:
+                QDRANT_OP_ERRORS.labels(*labels).inc()
+                raise
+            finally:
+                QDRANT_OP_LATENCY.labels(*labels).observe(time.perf_counter() - t0)
+
+        node.inflight += 1
+        inflight.inc()
+        start = time.perf_counter()
+        try:
+            result = await node.breaker.call(attempt)
+        finally:
+            node.inflight -= 1
+            inflight.dec()
+        self._observe(node, (time.perf_counter() - start) * 1000)
+        learn_collections(self.cluster, method, result)
+        record_received(labels, result)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.primary.client, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+        if name in READ_METHODS:
+            return functools.partial(self._call_read, name)
+        return functools.partial(self.call, self.primary, name)
+
+    async def _call_read(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        def on_retry(attempt: int, exc: BaseException) -> None:
+            QDRANT_RETRIES.labels(method).inc()
+            logger.info("Retrying Qdrant read", extra={"method": method, "attempt": attempt + 1, "error": str(exc)})
+
+        return await retry_async(
+            lambda: self.call(self.pick_read_node(), method, *args, **kwargs), self.retry, on_retry
+        )
+
+    # Health
+
+    async def _check_node(self, node: QdrantNode, timeout: float) -> bool:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(node.client.get_collections(), timeout)
+        except Exception as e:
+            node.last_error = str(e) or type(e).__name__
+            node.successes = 0
+            node.failures += 1
+            if node.healthy and node.failures >= self.eject_after:
+                node.healthy = False
+                logger.warning("Qdrant node ejected", extra={"node": node.name, "error": node.last_error})
+            return False
+        self._observe(node, (time.perf_counter() - start) * 1000)
+        learn_collections(self.cluster, "get_collections", result)
+        node.last_error = None
+        node.failures = 0
+        node.successes += 1
+        if not node.healthy and node.successes >= self.readmit_after:
+            node.healthy = True
+            logger.info("Qdrant node readmitted", extra={"node": node.name, "ewma_ms": node.ewma_ms})
+        return True
+
+    async def check_health(self, timeout: float) -> bool:
+        """
+        Ping every node once and update ejection state
+
+        Returns:
+            True if at least one node is healthy
+        """
+        await asyncio.gather(*(self._check_node(n, timeout) for n in self.nodes))
+        return any(n.healthy for n in self.nodes)
+
+    def status(self) -> list[dict[str, Any]]:
+        return [{**n.to_dict(), "primary": n is self.primary} for n in self.nodes]
+
+    def adopt(self, other: QdrantPool) -> list[QdrantNode]:
+        """
+        Take over another pool's nodes (e.g. connected with a rotated API key)
+
+        The pool object stays the same, so services and long-running jobs
+        holding it pick up the new nodes on their next call instead of
+        being left with closed channels.
+
+        Returns:
+            The replaced nodes, still open; hand them to retire_nodes
+        """
+        old = self.nodes
+        self.nodes, self.primary = other.nodes, other.primary
+        return old
+
+    async def close(self) -> None:
+        await close_nodes(self.nodes)
+
+
+async def close_nodes(nodes: list[QdrantNode]) -> None:
+    for node in nodes:
+        for client in node.clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning("Error closing Qdrant client", extra={"node": node.name, "error": str(e)})
+
+
+async def retire_nodes(nodes: list[QdrantNode], grace: float, poll: float = 0.1) -> None:
+    """
+    Close replaced nodes once the calls still running on them are done
+
+    Waits at least `grace` seconds, then until no call is in flight on any
+    of the nodes. The nodes are closed even if the wait is cancelled.
+    """
+    try:
+        await asyncio.sleep(grace)
+        while any(node.inflight for node in nodes):
+            await asyncio.sleep(poll)
+    finally:
+        await close_nodes(nodes)
+
+
+async def build_pool(
+    endpoints: list[tuple[str, int]],
+    primary: tuple[str, int],
+    client_factory: Callable[[str, int], AsyncQdrantClient],
+    timeout: float,
+    channels: int = 1,
+    **options: Any,
+) -> QdrantPool:
+    """
+    Create clients (`channels` per endpoint) and ping them
+
+    Unreachable nodes start ejected; they are readmitted by later health checks.
+
+    Raises:
+        Exception: The primary's connection error when no node answers
+    """
+    nodes = [
+        QdrantNode(host, port, *(client_factory(host, port) for _ in range(channels)))
+        for host, port in endpoints
+    ]
+    pool = QdrantPool(nodes, primary=endpoints.index(primary), **options)
+    results = await asyncio.gather(
+        *(asyncio.wait_for(n.client.get_collections(), timeout) for n in nodes), return_exceptions=True
+    )
+    for node, res in zip(nodes, results):
+        if isinstance(res, BaseException):
+            node.healthy = False
+            node.failures = pool.eject_after
+            node.last_error = str(res) or type(res).__name__
+    if not any(n.healthy for n in nodes):
+        await pool.close()
+        err = results[endpoints.index(primary)]
+        raise err if isinstance(err, Exception) else ConnectionError("No Qdrant node reachable")
+    return pool
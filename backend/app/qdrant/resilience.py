@@ -0,0 +1,192 @@
+"""
+Qdrant Resilience
+Circuit breaker and jittered retry for calls into Qdrant
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+
+import grpc
+import httpx
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from ..core.logging import get_logger
+from ..core.metrics import QDRANT_BREAKER_REJECTIONS, QDRANT_BREAKER_STATE, QDRANT_BREAKER_TRANSITIONS
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# gRPC codes that mean "Qdrant (or the path to it) is unavailable", not "bad request"
+_TRANSIENT_GRPC_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+})
+# REST statuses from a proxy or an overloaded/restarting node, not from a rejected request
+_TRANSIENT_HTTP_STATUSES = frozenset({502, 503, 504})
+_BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+# What a failed or rejected Qdrant call raises (client-side validation included).
+# CircuitOpenError is deliberately not here so routes let it reach the 503 handler.
+QDRANT_ERRORS: tuple[type[Exception], ...] = (
+    UnexpectedResponse,
+    ResponseHandlingException,
+    grpc.RpcError,
+    httpx.HTTPError,
+    ConnectionError,
+    TimeoutError,
+    ValueError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Call rejected without trying because Qdrant is considered down"""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"Qdrant unavailable ({name}); retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Connection-level failure (worth retrying / counting against the breaker)"""
+    if isinstance(exc, grpc.aio.AioRpcError):
+        return exc.code() in _TRANSIENT_GRPC_CODES
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code in _TRANSIENT_HTTP_STATUSES
+    return isinstance(
+        exc,
+        (ConnectionError, TimeoutError, asyncio.TimeoutError, httpx.TransportError, ResponseHandlingException),
+    )
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed: calls pass; `threshold` transient failures in a row open it.
+    open: calls fail fast with CircuitOpenError for `reset_timeout` seconds.
+    half_open: one trial call passes; success closes, failure re-opens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        QDRANT_BREAKER_STATE.labels(name).set(0)
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        QDRANT_BREAKER_STATE.labels(self.name).set(_BREAKER_STATE_VALUES[state])
+        QDRANT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+        logger.log(
+            logging.WARNING if state == "open" else logging.INFO,
+            "Qdrant circuit breaker state changed",
+            extra={"breaker": self.name, "state": state, "failures": self.failures}
+        )
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (no trial slot available)"""
+        if self.state == "open":
+            return self._clock() - self._opened_at < self.reset_timeout
+        return self.state == "half_open" and self._trial_running
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the call must not be attempted
+        """
+        if self.state == "open":
+            remaining = self.reset_timeout - (self._clock() - self._opened_at)
+            if remaining > 0:
+                QDRANT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, remaining)
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._trial_running:
+                QDRANT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self._trial_running = False
+        self.failures = 0
+        self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._trial_running = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self._opened_at = self._clock()
+            self._set_state("open")
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.before_call()
+        try:
+            result = await fn()
+        except BaseException as e:
+            if is_transient(e):
+                self.record_failure()
+            elif isinstance(e, Exception):
+                # Qdrant answered (e.g. 404 / invalid request), so it is up
+                self.record_success()
+            else:
+                # Cancelled: no verdict about Qdrant, just free the trial slot
+                self._trial_running = False
+            raise
+        self.record_success()
+        return result
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for idempotent calls"""
+    attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+async def retry_async(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    on_retry: Callable[[int, BaseException], Any] | None = None,
+) -> T:
+    """
+    Run fn, retrying transient failures per policy
+
+    CircuitOpenError is never retried; failing fast is the point.
+    """
+    for attempt in range(policy.attempts):
+        try:
+            return await fn()
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt + 1 >= policy.attempts or not is_transient(e):
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
+            await asyncio.sleep(policy.delay(attempt))
+    raise AssertionError("unreachable")
@@ -0,0 +1,162 @@
+"""
+Qdrant Call Telemetry
+Point, vector and payload volume of Qdrant calls, for the counters in core.metrics
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable
+
+from ..core.metrics import QDRANT_PAYLOAD_BYTES, QDRANT_POINTS, QDRANT_VECTOR_BYTES
+
+# Dense components are float32 on the wire; sparse entries are (u32 index, f32 value)
+_FLOAT_BYTES = 4
+_SPARSE_ENTRY_BYTES = 8
+
+
+# Collection names and aliases per cluster, from its latest get_collections /
+# get_aliases results; other names are labelled "other" so that requests for
+# arbitrary collections cannot grow the label set
+_known: dict[str, dict[str, frozenset[str]]] = {}
+
+
+def _field(obj: Any, name: str) -> Any:
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def learn_collections(cluster: str, method: str, result: Any) -> None:
+    """Remember the collections (or aliases) a cluster listed, as label values"""
+    if method == "get_collections":
+        items, attr = _field(result, "collections"), "name"
+    elif method == "get_aliases":
+        items, attr = _field(result, "aliases"), "alias_name"
+    else:
+        return
+    if isinstance(items, list):
+        names = (_field(item, attr) for item in items)
+        _known.setdefault(cluster, {})[method] = frozenset(n for n in names if isinstance(n, str))
+
+
+def collection_label(cluster: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+    """
+    Collection a client call targets, as a metric label
+
+    Returns:
+        The name if the cluster listed it, "other" if not, "-" for
+        cluster-wide calls
+    """
+    name = kwargs.get("collection_name")
+    if name is None and args and isinstance(args[0], str):
+        name = args[0]
+    if not name:
+        return "-"
+    known = _known.get(cluster, {})
+    return name if any(name in names for names in known.values()) else "other"
+
+
+def vector_bytes(vector: Any) -> int:
+    """Wire size of a dense, sparse or named vector (0 if unknown)"""
+    if vector is None:
+        return 0
+    if isinstance(vector, list):
+        if vector and isinstance(vector[0], list):
+            # Multivector
+            return sum(len(v) for v in vector) * _FLOAT_BYTES
+        return len(vector) * _FLOAT_BYTES
+    if isinstance(vector, tuple) and len(vector) == 2:
+        # (name, vector) search form
+        return vector_bytes(vector[1])
+    if isinstance(vector, dict):
+        return sum(vector_bytes(v) for v in vector.values())
+    indices = _field(vector, "indices")
+    if indices is not None:
+        return len(indices) * _SPARSE_ENTRY_BYTES
+    return vector_bytes(_field(vector, "vector"))
+
+
+def payload_bytes(payloads: list[Any]) -> int:
+    """JSON size of several payloads, encoded in one pass"""
+    payloads = [p for p in payloads if p]
+    if not payloads:
+        return 0
+    try:
+        # One C-level dumps for the batch is much cheaper than walking each payload
+        return len(json.dumps(payloads, separators=(",", ":"), default=str)) - len(payloads) - 1
+    except (TypeError, ValueError):
+        return 0
+
+
+def _batch_points(batch: Any) -> tuple[int, int, list[Any]]:
+    """(points, vector bytes, payloads) of a column-oriented Batch"""
+    ids = _field(batch, "ids") or []
+    vectors = _field(batch, "vectors")
+    return len(ids), vector_bytes(vectors), list(_field(batch, "payloads") or [])
+
+
+def _row_points(points: Iterable[Any]) -> tuple[int, int, list[Any]]:
+    count = vbytes = 0
+    payloads = []
+    for p in points:
+        count += 1
+        vbytes += vector_bytes(_field(p, "vector"))
+        payloads.append(_field(p, "payload"))
+    return count, vbytes, payloads
+
+
+def _record(labels: tuple[str, ...], direction: str, count: int, vbytes: int, payloads: list[Any]) -> None:
+    labels = (*labels, direction)
+    if count:
+        QDRANT_POINTS.labels(*labels).inc(count)
+    if vbytes:
+        QDRANT_VECTOR_BYTES.labels(*labels).inc(vbytes)
+    pbytes = payload_bytes(payloads)
+    if pbytes:
+        QDRANT_PAYLOAD_BYTES.labels(*labels).inc(pbytes)
+
+
+def record_sent(labels: tuple[str, str, str], kwargs: dict[str, Any]) -> None:
+    """Count points/vectors/payload in a call's arguments (upserts, queries); labels = (cluster, operation, collection)"""
+    count = vbytes = 0
+    payloads: list[Any] = []
+    points = kwargs.get("points")
+    if isinstance(points, list):
+        count, vbytes, payloads = _row_points(points)
+    elif points is not None and _field(points, "ids") is not None:
+        count, vbytes, payloads = _batch_points(points)
+    for key in ("query_vector", "query"):
+        # Point-id / text queries contribute nothing
+        vbytes += vector_bytes(kwargs.get(key))
+    for request in kwargs.get("requests") or ():
+        vbytes += vector_bytes(_field(request, "vector") or _field(request, "query"))
+    if kwargs.get("payload"):
+        payloads.append(kwargs["payload"])
+    if count or vbytes or payloads:
+        _record(labels, "sent", count, vbytes, payloads)
+
+
+def _result_points(result: Any) -> list[Any]:
+    if isinstance(result, tuple) and result:
+        # scroll: (records, next_offset)
+        result = result[0]
+    points = _field(result, "points")
+    if points is not None:
+        # query_points: QueryResponse
+        result = points
+    groups = _field(result, "groups")
+    if groups is not None:
+        return [hit for g in groups for hit in (_field(g, "hits") or [])]
+    if not isinstance(result, list):
+        return []
+    if result and isinstance(result[0], list):
+        # *_batch: one list per request
+        result = [p for sub in result for p in sub]
+    elif result and _field(result[0], "points") is not None:
+        result = [p for sub in result for p in _field(sub, "points")]
+    return [p for p in result if hasattr(p, "payload")]
+
+
+def record_received(labels: tuple[str, str, str], result: Any) -> None:
+    """Count points/vectors/payload returned by a call (searches, scroll, retrieve)"""
+    points = _result_points(result)
+    if points:
+        _record(labels, "received", *_row_points(points))
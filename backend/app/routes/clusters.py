@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from ..qdrant.clusters import clusters
+from .deps import require_auth
+
+router = APIRouter(prefix="/clusters", tags=["Clusters"])
+
+
+@router.get("")
+async def list_clusters(_: str = Depends(require_auth)) -> dict[str, Any]:
+    """Configured Qdrant clusters (selectable with ?cluster=) and their node state"""
+    return {"default": clusters.default, "clusters": clusters.status()}
@@ -1,21 +1,66 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 
-from ..qdrant.client import get_qdrant_client
-from ..schemas.collections import CollectionInfo, CreateCollectionRequest
+from ..core.ops import tracker
+from ..qdrant.clusters import UnknownClusterError, clusters
+from ..qdrant.resilience import QDRANT_ERRORS
+from ..schemas.collections import (
+    CollectionInfo,
+    CreateAliasRequest,
+    CreateCollectionRequest,
+    CreatePayloadIndexRequest,
+    MigrateCollectionRequest,
+    PayloadIndexSuggestion,
+    SwapAliasRequest,
+    SwitchAliasRequest,
+)
 from ..services.collection_service import CollectionService
-from .deps import require_auth
+from ..services.metadata import cluster_metadata_cache
+from ..services.migration_service import MigrationRunningError, MigrationService
+from .deps import cluster_name, require_auth
 
 router = APIRouter(prefix="/collections", tags=["Collections"])
 
 
-async def get_collection_service(_: str = Depends(require_auth)) -> CollectionService:
+async def get_collection_service(
+    cluster: str = Depends(cluster_name), _: str = Depends(require_auth)
+) -> CollectionService:
     """Dependency injection for CollectionService"""
-    client = await get_qdrant_client()
-    return CollectionService(client)
+    client = await clusters.client(cluster)
+    return CollectionService(client, cluster_metadata_cache(cluster))
+
+
+async def get_migration_service(
+    cluster: str = Depends(cluster_name), _: str = Depends(require_auth)
+) -> MigrationService:
+    """Dependency injection for MigrationService"""
+    client = await clusters.client(cluster)
+    return MigrationService(client, cluster_metadata_cache(cluster), cluster)
+
+
+async def get_job_migration_service(
+    job_id: str,
+    _: str = Depends(require_auth),
+    cluster: str | None = Query(default=None, description="Qdrant cluster (the job's own if omitted)"),
+) -> MigrationService:
+    """MigrationService bound to the cluster the job was started on"""
+    try:
+        state = await asyncio.to_thread(MigrationService.load_state, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Migration not found")
+    job_cluster = state.get("cluster") or clusters.default
+    try:
+        requested = clusters.resolve(cluster) if cluster is not None else job_cluster
+    except UnknownClusterError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if requested != job_cluster:
+        raise HTTPException(status_code=409, detail=f"Migration was started on cluster {job_cluster!r}")
+    client = await clusters.client(job_cluster)
+    return MigrationService(client, cluster_metadata_cache(job_cluster), job_cluster)
 
 
 @router.get("")
@@ -27,6 +72,95 @@ async def list_collections(
     return {"collections": collections}
 
 
+@router.get("/aliases")
+async def list_aliases(
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, list[dict[str, str]]]:
+    """List all aliases"""
+    return {"aliases": await service.list_aliases()}
+
+
+@router.post("/aliases", status_code=201)
+async def create_alias(
+    body: CreateAliasRequest,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, Any]:
+    """Create an alias"""
+    try:
+        return await service.create_alias(body.alias, body.collection)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to create alias: {str(e)}")
+
+
+@router.put("/aliases/{alias}")
+async def switch_alias(
+    alias: str,
+    body: SwitchAliasRequest,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, Any]:
+    """Atomically repoint an alias to another collection"""
+    try:
+        return await service.switch_alias(alias, body.collection)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to switch alias: {str(e)}")
+
+
+@router.delete("/aliases/{alias}")
+async def delete_alias(
+    alias: str,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, Any]:
+    """Delete an alias"""
+    try:
+        return await service.delete_alias(alias)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to delete alias: {str(e)}")
+
+
+@router.post("/aliases/{alias}/swap", status_code=202)
+async def swap_alias(
+    alias: str,
+    body: SwapAliasRequest,
+    background: BackgroundTasks,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, str]:
+    """Blue/green swap: repoint alias once the new collection is green (background job)"""
+    op = tracker.create("alias_swap", meta={"alias": alias, "collection": body.collection})
+    background.add_task(service.swap_alias, op.id, alias, body)
+    return {"op_id": op.id}
+
+
+@router.get("/migrations/{job_id}")
+async def migration_status(
+    job_id: str,
+    service: MigrationService = Depends(get_job_migration_service)
+) -> dict[str, Any]:
+    """Migration checkpoint and live progress"""
+    try:
+        return await service.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Migration not found")
+
+
+@router.post("/migrations/{job_id}/resume", status_code=202)
+async def resume_migration(
+    job_id: str,
+    background: BackgroundTasks,
+    service: MigrationService = Depends(get_job_migration_service)
+) -> dict[str, str]:
+    """Resume an interrupted migration from its last checkpoint"""
+    try:
+        res = await service.resume(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Migration not found")
+    except MigrationRunningError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to resume migration: {str(e)}")
+    background.add_task(service.run, job_id)
+    return res
+
+
 @router.get("/{name}", response_model=CollectionInfo)
 async def get_collection(
     name: str,
@@ -35,7 +169,7 @@ async def get_collection(
     """Get detailed collection information"""
     try:
         return await service.get_collection_info(name)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=404, detail=f"Collection not found: {str(e)}")
 
 
@@ -47,10 +181,26 @@ async def create_collection(
     """Create a new collection"""
     try:
         return await service.create_collection(body)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Failed to create collection: {str(e)}")
 
 
+@router.post("/{name}/migrate", status_code=202)
+async def migrate_collection(
+    name: str,
+    body: MigrateCollectionRequest,
+    background: BackgroundTasks,
+    service: MigrationService = Depends(get_migration_service)
+) -> dict[str, str]:
+    """Copy a collection into a new one with different params (background job)"""
+    try:
+        res = await service.start(name, body)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to start migration: {str(e)}")
+    background.add_task(service.run, res["job_id"])
+    return res
+
+
 @router.delete("/{name}")
 async def delete_collection(
     name: str,
@@ -59,6 +209,56 @@ async def delete_collection(
     """Delete a collection"""
     try:
         return await service.delete_collection(name)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=404, detail=f"Collection not found: {str(e)}")
 
+
+@router.get("/{name}/indexes")
+async def list_payload_indexes(
+    name: str,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, list[dict[str, Any]]]:
+    """List payload indexes"""
+    try:
+        return {"indexes": await service.list_payload_indexes(name)}
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {str(e)}")
+
+
+@router.get("/{name}/indexes/suggestions")
+async def suggest_payload_indexes(
+    name: str,
+    sample_size: int = Query(1000, ge=10, le=10000),
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, list[PayloadIndexSuggestion]]:
+    """Suggest payload fields worth indexing from a scroll sample"""
+    try:
+        return {"suggestions": await service.suggest_payload_indexes(name, sample_size=sample_size)}
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to sample payloads: {str(e)}")
+
+
+@router.post("/{name}/indexes", status_code=201)
+async def create_payload_index(
+    name: str,
+    body: CreatePayloadIndexRequest,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, Any]:
+    """Create a payload index"""
+    try:
+        return await service.create_payload_index(name, body)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to create payload index: {str(e)}")
+
+
+@router.delete("/{name}/indexes/{field_name}")
+async def delete_payload_index(
+    name: str,
+    field_name: str,
+    service: CollectionService = Depends(get_collection_service)
+) -> dict[str, Any]:
+    """Delete a payload index"""
+    try:
+        return await service.delete_payload_index(name, field_name)
+    except QDRANT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Failed to delete payload index: {str(e)}")
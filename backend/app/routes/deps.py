@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from fastapi import Depends, HTTPException, Request, status
+from fastapi import Depends, HTTPException, Query, Request, status
 
 from ..core.config import Settings
 from ..core.security import decode_access_token
+from ..qdrant.clusters import UnknownClusterError, clusters
 
 settings = Settings()
 
@@ -25,3 +26,18 @@ def require_auth(request: Request) -> str:
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+
+def cluster_name(
+    cluster: str | None = Query(default=None, description="Qdrant cluster (default cluster if omitted)"),
+    _: str = Depends(require_auth),
+) -> str:
+    """
+    Validated cluster selector shared by every Qdrant-backed route
+
+    Authenticates first, so unauthenticated callers get 401 and cannot
+    probe which cluster names exist.
+    """
+    try:
+        return clusters.resolve(cluster)
+    except UnknownClusterError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
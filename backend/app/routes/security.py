@@ -11,7 +11,6 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from ..core.config import Settings
 from ..core.ops import tracker
 from ..core.security import verify_password_hash
-from ..qdrant.client import reset_qdrant_client
 from ..schemas.security import (
     PrepareKeyRequest,
     PrepareKeyResponse,
@@ -49,8 +48,9 @@ def prepare_qdrant_key(body: PrepareKeyRequest, _: str = Depends(require_auth))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to write key file: {e}")
 
-    # Reset qdrant client so next call uses new key after restart
-    reset_qdrant_client()
+    # Only the file changes here: the key watcher stages the new key and
+    # switches the gRPC and REST pools once Qdrant, restarted with it,
+    # accepts it (until then every call keeps using the current key)
 
     # Prepare ops info and suggested commands (no direct docker control by default)
     op = tracker.create("qdrant_key_prepare", meta={"file": str(key_file)})
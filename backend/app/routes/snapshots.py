@@ -1,123 +1,410 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import json
+from typing import Any, AsyncIterator
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, UploadFile, File, BackgroundTasks
 from fastapi.responses import StreamingResponse
 
 from ..core.config import Settings
-from ..core.ops import tracker
-import os
+from ..core.ops import TransferProgress, tracker
 import tempfile
 from pathlib import Path
-from .deps import require_auth
+from ..qdrant.clusters import clusters
+from ..schemas.snapshots import (
+    InitiateUploadRequest,
+    RecoverSnapshotRequest,
+    SnapshotBatchRequest,
+    SnapshotScheduleRequest,
+)
+from ..services.metadata import cluster_metadata_cache
+from ..services.snapshot_service import (
+    MultipartFileStream,
+    SnapshotError,
+    SnapshotService,
+    shared_snapshot_location,
+)
+from ..services.snapshot_scheduler import scheduler
+from ..services.snapshot_uploads import UploadError, upload_store
+from .deps import cluster_name, require_auth
 
 router = APIRouter(prefix="/snapshots", tags=["Snapshots"])
 settings = Settings()
 
 
-def _base_url() -> str:
-    scheme = "https" if settings.use_https else "http"
-    return f"{scheme}://{settings.qdrant_host}:{settings.qdrant_port}"
+async def get_snapshot_service(
+    cluster: str = Depends(cluster_name), _: str = Depends(require_auth)
+) -> SnapshotService:
+    """Dependency injection for SnapshotService"""
+    return SnapshotService(clusters.http(cluster), cluster)
 
 
-def _headers() -> dict[str, str]:
-    h: dict[str, str] = {}
-    if settings.get_qdrant_api_key():
-        h["api-key"] = settings.get_qdrant_api_key() or ""
-    return h
+@router.post("", status_code=202)
+async def snapshot_batch(
+    payload: SnapshotBatchRequest,
+    background: BackgroundTasks,
+    service: SnapshotService = Depends(get_snapshot_service),
+) -> dict:
+    """
+    Snapshot all (or selected) collections concurrently, or the full storage.
+
+    Runs in the background; sizes, durations and total elapsed time are
+    reported via /restore_status/{op_id} (and its SSE variant).
+    """
+    op = tracker.create(
+        "snapshot_batch",
+        meta={"collections": payload.collections, "full_storage": payload.full_storage},
+    )
+    background.add_task(
+        service.snapshot_batch,
+        op.id,
+        collections=payload.collections,
+        full_storage=payload.full_storage,
+        concurrency=payload.concurrency,
+    )
+    return {"op_id": op.id, "stage": tracker.get(op.id).stage}
+
+
+@router.get("/storage")
+async def snapshot_storage(service: SnapshotService = Depends(get_snapshot_service)) -> dict:
+    """Snapshot count and disk usage per collection"""
+    try:
+        return await service.storage_summary()
+    except SnapshotError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_cluster(cluster: str | None) -> None:
+    try:
+        clusters.resolve(cluster)
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/schedules")
+async def list_schedules(_: str = Depends(require_auth)) -> dict:
+    return {"schedules": scheduler.list_schedules()}
+
+
+@router.post("/schedules")
+async def create_schedule(payload: SnapshotScheduleRequest, _: str = Depends(require_auth)) -> dict:
+    _check_cluster(payload.cluster)
+    try:
+        return await scheduler.add(payload)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/schedules/{schedule_id}")
+async def update_schedule(
+    schedule_id: str, payload: SnapshotScheduleRequest, _: str = Depends(require_auth)
+) -> dict:
+    _check_cluster(payload.cluster)
+    try:
+        return await scheduler.update(schedule_id, payload)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/schedules/{schedule_id}")
+async def delete_schedule(schedule_id: str, _: str = Depends(require_auth)) -> dict:
+    try:
+        await scheduler.remove(schedule_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return {"id": schedule_id, "deleted": True}
+
+
+@router.post("/schedules/{schedule_id}/run")
+async def run_schedule(schedule_id: str, _: str = Depends(require_auth)) -> dict:
+    """Run a schedule now (snapshot + retention), outside its cron timing"""
+    try:
+        return await scheduler.run_schedule(schedule_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Schedule not found")
 
 
 @router.get("/{collection}")
-def list_snapshots(collection: str, _: str = Depends(require_auth)) -> dict:
-    url = f"{_base_url()}/collections/{collection}/snapshots"
-    try:
-        with httpx.Client(timeout=settings.qdrant_timeout) as client:
-            r = client.get(url, headers=_headers())
-            if r.status_code != 200:
-                raise HTTPException(status_code=r.status_code, detail=r.text)
-            return r.json()
-    except HTTPException:
-        raise
+async def list_snapshots(collection: str, service: SnapshotService = Depends(get_snapshot_service)) -> dict:
+    try:
+        return await service.list_snapshots(collection)
+    except SnapshotError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/{collection}")
-def create_snapshot(collection: str, _: str = Depends(require_auth)) -> dict:
-    url = f"{_base_url()}/collections/{collection}/snapshots"
-    try:
-        with httpx.Client(timeout=settings.qdrant_timeout) as client:
-            r = client.post(url, headers=_headers())
-            if r.status_code not in (200, 202):
-                raise HTTPException(status_code=r.status_code, detail=r.text)
-            return r.json()
-    except HTTPException:
-        raise
+async def create_snapshot(collection: str, service: SnapshotService = Depends(get_snapshot_service)) -> dict:
+    try:
+        return await service.create_snapshot(collection)
+    except SnapshotError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/restore_status/{op_id}")
+async def restore_status(op_id: str, _: str = Depends(require_auth)) -> dict:
+    try:
+        return tracker.to_dict(op_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Operation not found")
+
+
+# SSE: how often the op is checked, and idle seconds between keepalive comments
+_SSE_POLL_INTERVAL = 0.5
+_SSE_KEEPALIVE = 15.0
+
+
+async def op_events(op_id: str, request: Request) -> AsyncIterator[str]:
+    """Server-sent events for an op: one `data:` frame per change, until it finishes"""
+    last = None
+    idle = 0.0
+    while not await request.is_disconnected():
+        data = tracker.to_dict(op_id)
+        if data["updated_at"] != last:
+            last = data["updated_at"]
+            idle = 0.0
+            yield f"data: {json.dumps(data)}\n\n"
+            if data["stage"] in ("completed", "failed"):
+                return
+        elif idle >= _SSE_KEEPALIVE:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(_SSE_POLL_INTERVAL)
+        idle += _SSE_POLL_INTERVAL
+
+
+@router.get("/restore_status/{op_id}/events")
+async def restore_status_events(op_id: str, request: Request, _: str = Depends(require_auth)):
+    """Stream restore progress as text/event-stream (the polling-free variant of restore_status)"""
+    if tracker.get(op_id) is None:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return StreamingResponse(
+        op_events(op_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{collection}/uploads")
+async def initiate_upload(
+    collection: str,
+    payload: InitiateUploadRequest,
+    cluster: str = Depends(cluster_name),
+    _: str = Depends(require_auth),
+) -> dict:
+    """Start a resumable chunked upload; the file is preallocated server-side"""
+    try:
+        return await upload_store.initiate(collection, payload, cluster)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str, _: str = Depends(require_auth)) -> dict:
+    """Which chunks the server already has (clients resume from `received`)"""
+    try:
+        return await upload_store.status(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256", pattern=r"^[0-9a-fA-F]{64}$"),
+    _: str = Depends(require_auth),
+) -> dict:
+    """Store one chunk (raw body) at its offset after verifying its SHA-256"""
+    limit = settings.snapshot_upload_max_chunk
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+    try:
+        return await upload_store.put_chunk(upload_id, index, offset, bytes(body), chunk_sha256)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    background: BackgroundTasks,
+    _: str = Depends(require_auth),
+) -> dict:
+    """Verify the assembled file and restore it to Qdrant in the background"""
+    try:
+        summary, path = await upload_store.finalize(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    collection = summary["collection"]
+    # Restore to the cluster chosen at initiate time
+    cluster = summary["cluster"] or clusters.default
+    service = SnapshotService(clusters.http(cluster), cluster)
+    op = tracker.create(
+        "snapshot_restore",
+        meta={"collection": collection, "filename": summary["filename"], "upload_id": upload_id, "mode": "chunked"},
+    )
+    background.add_task(_do_chunked_upload, service, op.id, collection, upload_id, path)
+    return {"op_id": op.id, "stage": tracker.get(op.id).stage}
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str, _: str = Depends(require_auth)) -> dict:
+    try:
+        await upload_store.abort(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"upload_id": upload_id, "aborted": True}
+
+
+# Upstream headers relayed to the client so ranges, resumes and progress bars work
+_DOWNLOAD_PASSTHROUGH_HEADERS = (
+    "content-length",
+    "content-range",
+    "content-encoding",
+    "accept-ranges",
+    "etag",
+    "last-modified",
+)
+
+
 @router.get("/{collection}/{name}")
-def download_snapshot(collection: str, name: str, _: str = Depends(require_auth)):
-    # Stream download through API
-    url = f"{_base_url()}/collections/{collection}/snapshots/{name}"
-    try:
-        client = httpx.Client(timeout=None)
-        r = client.get(url, headers=_headers(), stream=True)
-        if r.status_code != 200:
-            client.close()
-            raise HTTPException(status_code=r.status_code, detail=r.text)
-
-        def _iter():
-            with client:
-                for chunk in r.iter_bytes():
-                    yield chunk
-
-        return StreamingResponse(
-            _iter(),
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={name}"},
+async def download_snapshot(
+    collection: str,
+    name: str,
+    request: Request,
+    service: SnapshotService = Depends(get_snapshot_service),
+):
+    """Stream a snapshot through the API (supports Range / If-Range resume)"""
+    try:
+        r = await service.open_download(
+            collection,
+            name,
+            range_header=request.headers.get("range"),
+            if_range=request.headers.get("if-range"),
         )
-    except HTTPException:
-        raise
+    except SnapshotError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    async def _iter():
+        try:
+            # Raw bytes: the relayed Content-Length must match what we send
+            async for chunk in r.aiter_raw(settings.snapshot_chunk_size):
+                yield chunk
+        finally:
+            await r.aclose()
+
+    headers = {k: r.headers[k] for k in _DOWNLOAD_PASSTHROUGH_HEADERS if k in r.headers}
+    headers["Content-Disposition"] = f"attachment; filename={name}"
+    return StreamingResponse(
+        _iter(),
+        status_code=r.status_code,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
 
 @router.post("/{collection}/restore")
-async def restore_snapshot(collection: str, file: UploadFile = File(...), _: str = Depends(require_auth)) -> dict:
-    """Restore a collection from a snapshot file (streamed upload)."""
-    url = f"{_base_url()}/collections/{collection}/snapshots/upload"
-    try:
-        # Stream file to Qdrant using multipart form-data
-        async with httpx.AsyncClient(timeout=None) as client:
-            files = {"snapshot": (file.filename or "snapshot.tar", file.file, "application/octet-stream")}
-            r = await client.post(url, headers=_headers(), files=files)
-        if r.status_code not in (200, 202):
-            raise HTTPException(status_code=r.status_code, detail=r.text)
-        return r.json()
-    except HTTPException:
-        raise
+async def restore_snapshot(
+    collection: str,
+    request: Request,
+    checksum: str | None = Query(None, pattern=r"^[0-9a-fA-F]{64}$", description="Expected SHA-256 of the snapshot"),
+    service: SnapshotService = Depends(get_snapshot_service),
+) -> dict:
+    """
+    Restore a collection by streaming the multipart upload straight to Qdrant.
+
+    No temp file is written; the SHA-256 is computed on the fly and checked
+    against `checksum` when given. /restore_async is the spooling fallback.
+    """
+    try:
+        parser = MultipartFileStream(request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    op = tracker.create("snapshot_restore", meta={"collection": collection, "mode": "stream"})
+    tracker.update(op.id, stage="uploading")
+    # Content-Length includes the multipart envelope; close enough for an ETA
+    length = request.headers.get("content-length")
+    progress = TransferProgress(op.id, int(length) if length and length.isdigit() else None)
+
+    async def file_chunks():
+        async for chunk in request.stream():
+            for piece in parser.feed(chunk):
+                yield piece
+            if parser.done:
+                return
+        if not parser.done:
+            raise ValueError("Upload ended before the snapshot file part was complete")
+
+    try:
+        res, digest = await service.upload_snapshot_stream(
+            collection, file_chunks(), checksum=checksum, on_progress=progress
+        )
+    except SnapshotError as e:
+        tracker.update(op.id, stage="failed", error=e.detail[:400])
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
+        tracker.update(op.id, stage="failed", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # The restored collection may have a new schema and point count
+        cluster_metadata_cache(service.cluster).invalidate(collection)
+
+    tracker.update(op.id, stage="completed", filename=parser.filename, sha256=digest)
+    return {**res, "op_id": op.id, "sha256": digest}
 
 
-def _do_upload(op_id: str, collection: str, tmp_path: Path) -> None:
+async def _do_upload(service: SnapshotService, op_id: str, collection: str, path: Path) -> bool:
+    """Restore a local snapshot file; returns whether it succeeded"""
     tracker.update(op_id, stage="uploading")
-    url = f"{_base_url()}/collections/{collection}/snapshots/upload"
-    try:
-        with httpx.Client(timeout=None) as client:
-            with tmp_path.open("rb") as f:
-                files = {"snapshot": (tmp_path.name, f, "application/octet-stream")}
-                r = client.post(url, headers=_headers(), files=files)
-        if r.status_code not in (200, 202):
-            tracker.update(op_id, stage="failed", error=f"{r.status_code}: {r.text[:400]}")
-        else:
-            tracker.update(op_id, stage="completed")
+    try:
+        total = path.stat().st_size
+        progress = TransferProgress(op_id, total)
+        await service.upload_snapshot(collection, path, on_progress=progress)
+        progress(total, force=True)
+        tracker.update(op_id, stage="completed")
+        return True
+    except SnapshotError as e:
+        tracker.update(op_id, stage="failed", error=f"{e.status_code}: {e.detail[:400]}")
     except Exception as e:
         tracker.update(op_id, stage="failed", error=str(e))
+    finally:
+        cluster_metadata_cache(service.cluster).invalidate(collection)
+    return False
+
+
+async def _do_temp_upload(service: SnapshotService, op_id: str, collection: str, tmp_path: Path) -> None:
+    try:
+        await _do_upload(service, op_id, collection, tmp_path)
     finally:
         try:
             tmp_path.unlink(missing_ok=True)
@@ -125,14 +412,24 @@ def _do_upload(op_id: str, collection: str, tmp_path: Path) -> None:
             pass
 
 
+async def _do_chunked_upload(
+    service: SnapshotService, op_id: str, collection: str, upload_id: str, path: Path
+) -> None:
+    # The session is only dropped once Qdrant has the snapshot; a failed restore can be finalized again
+    if await _do_upload(service, op_id, collection, path):
+        await upload_store.complete(upload_id)
+    else:
+        await upload_store.release(upload_id)
+
+
 @router.post("/{collection}/restore_async")
 async def restore_snapshot_async(
     collection: str,
     background: BackgroundTasks,
     file: UploadFile = File(...),
-    _: str = Depends(require_auth),
+    service: SnapshotService = Depends(get_snapshot_service),
 ) -> dict:
-    """Async restore: save upload to temp, return op_id and perform upload in background."""
+    """Async restore (fallback): save upload to temp, return op_id and perform upload in background."""
     op = tracker.create("snapshot_restore", meta={"collection": collection, "filename": file.filename or "snapshot.tar"})
     tracker.update(op.id, stage="saving")
     try:
@@ -147,19 +444,58 @@ async def restore_snapshot_async(
                     break
                 total += len(chunk)
                 out.write(chunk)
-        tracker.update(op.id, meta={"bytes_total": total})
+        tracker.update(op.id, bytes_total=total)
     except Exception as e:
         tracker.update(op.id, stage="failed", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
     # Kick background upload
-    background.add_task(_do_upload, op.id, collection, tmp_path)
+    background.add_task(_do_temp_upload, service, op.id, collection, tmp_path)
     return {"op_id": op.id, "stage": tracker.get(op.id).stage}
 
 
-@router.get("/restore_status/{op_id}")
-def restore_status(op_id: str, _: str = Depends(require_auth)) -> dict:
+async def _do_recover(
+    service: SnapshotService, op_id: str, collection: str, location: str, payload: RecoverSnapshotRequest
+) -> None:
+    tracker.update(op_id, stage="recovering")
+
+    def on_status(status: dict[str, Any]) -> None:
+        tracker.update(
+            op_id,
+            collection_status=status.get("status"),
+            points_count=status.get("points_count"),
+        )
+
     try:
-        return tracker.to_dict(op_id)
-    except KeyError:
-        raise HTTPException(status_code=404, detail="Operation not found")
+        await service.recover_from_location(
+            collection, location, priority=payload.priority, checksum=payload.checksum, on_status=on_status
+        )
+        tracker.update(op_id, stage="completed")
+    except SnapshotError as e:
+        tracker.update(op_id, stage="failed", error=f"{e.status_code}: {e.detail[:400]}")
+    except Exception as e:
+        tracker.update(op_id, stage="failed", error=str(e))
+    finally:
+        cluster_metadata_cache(service.cluster).invalidate(collection)
+
+
+@router.post("/{collection}/recover")
+async def recover_from_path(
+    collection: str,
+    payload: RecoverSnapshotRequest,
+    background: BackgroundTasks,
+    service: SnapshotService = Depends(get_snapshot_service),
+) -> dict:
+    """
+    Restore from a snapshot already on the volume shared with Qdrant.
+
+    Qdrant reads the file itself (file:// recover), so no bytes pass through
+    the API. Progress is followed via /restore_status/{op_id}.
+    """
+    try:
+        location = shared_snapshot_location(payload.path)
+    except SnapshotError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    op = tracker.create("snapshot_restore", meta={"collection": collection, "location": location, "mode": "recover"})
+    background.add_task(_do_recover, service, op.id, collection, location, payload)
+    return {"op_id": op.id, "stage": tracker.get(op.id).stage, "location": location}
@@ -1,24 +1,30 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter, Depends
 
-from ..qdrant.client import get_qdrant_client
-from .deps import require_auth
+from ..qdrant.clusters import clusters
+from ..services.metadata import cluster_metadata_cache
+from ..services.stats_service import StatsService, cross_cluster_stats
+from .deps import cluster_name, require_auth
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
 
+async def get_stats_service(cluster: str = Depends(cluster_name), _: str = Depends(require_auth)) -> StatsService:
+    """Dependency injection for StatsService"""
+    client = await clusters.client(cluster)
+    return StatsService(client, cluster_metadata_cache(cluster), cluster)
+
+
 @router.get("")
-def stats(_: str = Depends(require_auth)) -> dict:
-    c = get_qdrant_client()
-    cols = c.get_collections().collections
-    total_points = 0
-    items: list[dict] = []
-    for col in cols:
-        info = c.get_collection(col.name)
-        points = getattr(info, "points_count", 0) or 0
-        vectors = getattr(info, "vectors_count", 0) or 0
-        items.append({"name": col.name, "points_count": points, "vectors_count": vectors})
-        total_points += points
-    return {"collections": len(cols), "total_points": total_points, "items": items}
+async def stats(service: StatsService = Depends(get_stats_service)) -> dict[str, Any]:
+    """Aggregated collection statistics (short-TTL cached)"""
+    return await service.get_stats()
+
 
+@router.get("/clusters")
+async def stats_all_clusters(_: str = Depends(require_auth)) -> dict[str, Any]:
+    """Stats of every configured cluster, queried concurrently (per-collection items omitted)"""
+    return await cross_cluster_stats(clusters)
@@ -4,18 +4,22 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from ..qdrant.client import get_qdrant_client
+from ..qdrant.clusters import clusters
+from ..qdrant.resilience import QDRANT_ERRORS
 from ..schemas.vectors import DeleteRequest, InsertVectorsRequest, SearchRequest
+from ..services.metadata import cluster_metadata_cache
 from ..services.vector_service import VectorService
-from .deps import require_auth
+from .deps import cluster_name, require_auth
 
 router = APIRouter(prefix="/vectors", tags=["Vectors"])
 
 
-async def get_vector_service(_: str = Depends(require_auth)) -> VectorService:
+async def get_vector_service(
+    cluster: str = Depends(cluster_name), _: str = Depends(require_auth)
+) -> VectorService:
     """Dependency injection for VectorService"""
-    client = await get_qdrant_client()
-    return VectorService(client)
+    client = await clusters.client(cluster)
+    return VectorService(client, cluster_metadata_cache(cluster))
 
 
 @router.post("/insert")
@@ -26,7 +30,7 @@ async def insert_vectors(
     """Insert or update vectors in a collection"""
     try:
         return await service.insert_vectors(body)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Failed to insert vectors: {str(e)}")
 
 
@@ -38,7 +42,7 @@ async def search(
     """Search for similar vectors"""
     try:
         return await service.search_vectors(body)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Search failed: {str(e)}")
 
 
@@ -50,6 +54,6 @@ async def delete_points(
     """Delete vectors from collection"""
     try:
         return await service.delete_vectors(body)
-    except Exception as e:
+    except QDRANT_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Failed to delete vectors: {str(e)}")
 
@@ -19,7 +19,64 @@ class CreateCollectionRequest(BaseModel):
 
 class CollectionInfo(BaseModel):
     name: str
-    points_count: int
+    points_count: int = 0
     vectors_count: int
-    status: str
+    vector_size: int = 0
+    distance: str = "Unknown"
+    status: str = "unknown"
 
+
+PayloadIndexType = Literal["keyword", "integer", "float", "geo", "text", "bool", "datetime"]
+Tokenizer = Literal["word", "whitespace", "prefix", "multilingual"]
+
+
+class CreatePayloadIndexRequest(BaseModel):
+    field_name: str = Field(..., min_length=1)
+    field_type: PayloadIndexType
+    # Text index options (only used when field_type == "text")
+    tokenizer: Optional[Tokenizer] = None
+    min_token_len: Optional[int] = Field(None, ge=1, le=64)
+    max_token_len: Optional[int] = Field(None, ge=1, le=256)
+    lowercase: Optional[bool] = None
+
+
+class PayloadIndexSuggestion(BaseModel):
+    field_name: str
+    field_type: PayloadIndexType
+    coverage: float  # share of sampled points that carry the field
+    distinct_values: int
+    reason: str
+
+
+Quantization = Literal["none", "scalar", "binary"]
+
+
+class MigrateCollectionRequest(BaseModel):
+    target: str = Field(..., min_length=1)
+    # Overrides for the target collection; None keeps the source value
+    distance: Optional[Distance] = None
+    ef_construct: Optional[int] = Field(None, ge=4, le=4096)
+    m: Optional[int] = Field(None, ge=4, le=128)
+    on_disk: Optional[bool] = None
+    quantization: Optional[Quantization] = None
+    # Copy pipeline tuning
+    readers: int = Field(4, ge=1, le=32)
+    workers: int = Field(4, ge=1, le=32)
+    batch_size: int = Field(256, ge=1, le=4096)
+
+
+class CreateAliasRequest(BaseModel):
+    alias: str = Field(..., min_length=1)
+    collection: str = Field(..., min_length=1)
+
+
+class SwitchAliasRequest(BaseModel):
+    collection: str = Field(..., min_length=1)
+
+
+class SwapAliasRequest(BaseModel):
+    collection: str = Field(..., min_length=1)
+    # Max seconds to wait for the new collection to become green
+    wait_timeout: float = Field(600.0, ge=0, le=24 * 3600)
+    # Delete the previously aliased collection after this many seconds (None keeps it)
+    delete_old_after: Optional[float] = Field(None, ge=0, le=7 * 24 * 3600)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from ..core.config import Settings
+from ..core.cron import CronExpression
+
+settings = Settings()
+
+
+Sha256Hex = Field(None, pattern=r"^[0-9a-fA-F]{64}$")
+
+
+class InitiateUploadRequest(BaseModel):
+    filename: str = Field("snapshot.snapshot", min_length=1, max_length=255)
+    total_size: int = Field(..., ge=1, le=settings.snapshot_upload_max_size)
+    chunk_size: int = Field(..., ge=64 * 1024)
+    # Optional SHA-256 of the whole file, checked on finalize
+    sha256: Optional[str] = Sha256Hex
+
+
+class RecoverSnapshotRequest(BaseModel):
+    # Relative to the shared snapshot directory (absolute paths must lie inside it)
+    path: str = Field(..., min_length=1)
+    priority: Optional[Literal["replica", "snapshot", "no_sync"]] = None
+    checksum: Optional[str] = Sha256Hex
+
+
+class SnapshotBatchRequest(BaseModel):
+    # None snapshots every collection
+    collections: Optional[list[str]] = Field(None, min_length=1)
+    # Snapshot the whole storage (all collections, aliases) instead
+    full_storage: bool = False
+    concurrency: Optional[int] = Field(None, ge=1, le=32)
+
+
+class SnapshotScheduleRequest(BaseModel):
+    collection: str = Field(..., min_length=1)
+    # Qdrant cluster name; the default cluster when omitted
+    cluster: Optional[str] = None
+    # 5-field cron expression (UTC) or @hourly/@daily/@weekly/@monthly
+    cron: str = Field(..., min_length=1)
+    # Retention: newest N snapshots, plus the newest snapshot of each of the last N days
+    keep_last: Optional[int] = Field(None, ge=1, le=10_000)
+    keep_daily: Optional[int] = Field(None, ge=1, le=3650)
+    enabled: bool = True
+
+    @field_validator('cron')
+    @classmethod
+    def validate_cron(cls, v: str) -> str:
+        CronExpression(v)
+        return v.strip()
@@ -6,29 +6,47 @@ from typing import Any, Optional
 from pydantic import BaseModel, Field, field_validator, ValidationInfo
 
 
+def _check_vector(v: list[float], name: str | None = None) -> None:
+    label = f"Vector '{name}'" if name else "Vector"
+    if not v:
+        raise ValueError(f"{label} cannot be empty")
+
+    if len(v) > 4096:
+        raise ValueError(f"{label} dimension too large: {len(v)} (max: 4096)")
+
+    # Check for NaN or Inf values
+    for i, val in enumerate(v):
+        if not isinstance(val, (int, float)):
+            raise ValueError(f"{label} element at index {i} must be a number, got {type(val).__name__}")
+        if math.isnan(val):
+            raise ValueError(f"{label} contains NaN at index {i}")
+        if math.isinf(val):
+            raise ValueError(f"{label} contains Inf at index {i}")
+
+
+def vector_dims(vector: list[float] | dict[str, list[float]]) -> dict[str, int]:
+    """Vector name -> dimension; the unnamed vector is keyed by an empty string"""
+    if isinstance(vector, dict):
+        return {k: len(v) for k, v in vector.items()}
+    return {"": len(vector)}
+
+
 class Point(BaseModel):
     id: str | int
-    vector: list[float]
+    # Plain list for single-vector collections, name -> vector for named vectors
+    vector: list[float] | dict[str, list[float]]
     payload: dict[str, Any] | None = None
 
     @field_validator('vector')
     @classmethod
-    def validate_vector(cls, v: list[float]) -> list[float]:
-        if not v:
-            raise ValueError("Vector cannot be empty")
-
-        if len(v) > 4096:
-            raise ValueError(f"Vector dimension too large: {len(v)} (max: 4096)")
-
-        # Check for NaN or Inf values
-        for i, val in enumerate(v):
-            if not isinstance(val, (int, float)):
-                raise ValueError(f"Vector element at index {i} must be a number, got {type(val).__name__}")
-            if math.isnan(val):
-                raise ValueError(f"Vector contains NaN at index {i}")
-            if math.isinf(val):
-                raise ValueError(f"Vector contains Inf at index {i}")
-
+    def validate_vector(cls, v: list[float] | dict[str, list[float]]) -> list[float] | dict[str, list[float]]:
+        if isinstance(v, dict):
+            if not v:
+                raise ValueError("Vector cannot be empty")
+            for name, vec in v.items():
+                _check_vector(vec, name)
+        else:
+            _check_vector(v)
         return v
 
     @field_validator('payload')
@@ -49,14 +67,17 @@ class InsertVectorsRequest(BaseModel):
         if not v:
             return v
 
-        # Check all vectors have the same dimension
-        first_dim = len(v[0].vector)
-        for i, point in enumerate(v[1:], start=1):
-            if len(point.vector) != first_dim:
-                raise ValueError(
-                    f"Dimension mismatch: point 0 has dimension {first_dim}, "
-                    f"but point {i} has dimension {len(point.vector)}"
-                )
+        # Check all vectors have the same dimension (per vector name)
+        first_dims: dict[str, tuple[int, int]] = {}
+        for i, point in enumerate(v):
+            for name, dim in vector_dims(point.vector).items():
+                seen = first_dims.setdefault(name, (i, dim))
+                if seen[1] != dim:
+                    label = f" for vector '{name}'" if name else ""
+                    raise ValueError(
+                        f"Dimension mismatch{label}: point {seen[0]} has dimension {seen[1]}, "
+                        f"but point {i} has dimension {dim}"
+                    )
 
         return v
 
@@ -3,6 +3,7 @@ Service layer for business logic
 Separates business logic from route handlers
 """
 from .collection_service import CollectionService
+from .stats_service import StatsService
 from .vector_service import VectorService
 
-__all__ = ["CollectionService", "VectorService"]
+__all__ = ["CollectionService", "StatsService", "VectorService"]
@@ -4,21 +4,103 @@ Handles business logic for Qdrant collection operations
 """
 from __future__ import annotations
 
+import asyncio
+import time
 from typing import Any
 
 from qdrant_client import AsyncQdrantClient, models as qm
 
 from ..core.logging import get_logger
-from ..schemas.collections import CollectionInfo, CreateCollectionRequest
+from ..core.ops import tracker
+from ..schemas.collections import (
+    CollectionInfo,
+    CreateCollectionRequest,
+    CreatePayloadIndexRequest,
+    PayloadIndexSuggestion,
+    SwapAliasRequest,
+)
+from .metadata import CollectionMetadataCache, metadata_cache
 
 logger = get_logger(__name__)
 
+_PAYLOAD_SCHEMA_TYPES = {
+    "keyword": qm.PayloadSchemaType.KEYWORD,
+    "integer": qm.PayloadSchemaType.INTEGER,
+    "float": qm.PayloadSchemaType.FLOAT,
+    "geo": qm.PayloadSchemaType.GEO,
+    "text": qm.PayloadSchemaType.TEXT,
+    "bool": qm.PayloadSchemaType.BOOL,
+    "datetime": qm.PayloadSchemaType.DATETIME,
+}
+
+_TOKENIZERS = {
+    "word": qm.TokenizerType.WORD,
+    "whitespace": qm.TokenizerType.WHITESPACE,
+    "prefix": qm.TokenizerType.PREFIX,
+    "multilingual": qm.TokenizerType.MULTILINGUAL,
+}
+
+# Seconds between status polls while waiting for a collection to turn green
+_GREEN_POLL_INTERVAL = 2.0
+
+# Suggestion heuristics
+_SUGGEST_MIN_COVERAGE = 0.05
+_SUGGEST_MAX_DISTINCT_TRACKED = 10_000
+_TEXT_MIN_AVG_LEN = 40
+
+
+def _flatten_payload(payload: dict[str, Any], prefix: str = "") -> dict[str, list[Any]]:
+    """Flatten nested payload into Qdrant keys (`a.b`, `a[].b` under arrays); lists are expanded"""
+    out: dict[str, list[Any]] = {}
+    for key, value in payload.items():
+        path = f"{prefix}{key}"
+        is_list = isinstance(value, list)
+        values = value if is_list else [value]
+        for v in values:
+            if isinstance(v, dict) and not {"lat", "lon"} <= v.keys():
+                for k, vs in _flatten_payload(v, f"{path}[]." if is_list else f"{path}.").items():
+                    out.setdefault(k, []).extend(vs)
+            else:
+                out.setdefault(path, []).append(v)
+    return out
+
+
+def _infer_index_type(values: list[Any]) -> str | None:
+    """Best payload index type for sampled values, None if mixed/unsupported"""
+    kinds: set[str] = set()
+    str_len = 0
+    str_count = 0
+    for v in values:
+        if isinstance(v, bool):
+            kinds.add("bool")
+        elif isinstance(v, int):
+            kinds.add("integer")
+        elif isinstance(v, float):
+            kinds.add("float")
+        elif isinstance(v, str):
+            kinds.add("str")
+            str_len += len(v)
+            str_count += 1
+        elif isinstance(v, dict):
+            kinds.add("geo")
+        else:
+            return None
+    if kinds == {"integer", "float"}:
+        return "float"
+    if len(kinds) != 1:
+        return None
+    kind = kinds.pop()
+    if kind == "str":
+        return "text" if str_count and str_len / str_count >= _TEXT_MIN_AVG_LEN else "keyword"
+    return kind
+
 
 class CollectionService:
     """Service for managing Qdrant collections"""
 
-    def __init__(self, client: AsyncQdrantClient):
+    def __init__(self, client: AsyncQdrantClient, cache: CollectionMetadataCache | None = None):
         self.client = client
+        self.cache = cache or metadata_cache
 
     async def list_collections(self) -> list[dict[str, Any]]:
         """
@@ -27,8 +109,8 @@ class CollectionService:
         Returns:
             List of collection information dictionaries
         """
-        collections = await self.client.get_collections()
-        return [{"name": c.name} for c in collections.collections]
+        names = await self.cache.list_names(self.client)
+        return [{"name": n} for n in names]
 
     async def get_collection_info(self, collection_name: str) -> CollectionInfo:
         """
@@ -43,31 +125,25 @@ class CollectionService:
         Raises:
             Exception: If collection doesn't exist
         """
-        # Get collection config
-        collection = await self.client.get_collection(collection_name)
-
-        # Get vector count
-        count_result = await self.client.count(collection_name)
-
-        # Extract vector size and distance
-        vector_config = collection.config.params.vectors
-        vector_size = vector_config.size if hasattr(vector_config, 'size') else 0
-        distance = str(vector_config.distance) if hasattr(vector_config, 'distance') else "Unknown"
+        # Config and count come from the metadata cache (fetched concurrently on miss)
+        meta, count = await self.cache.info(self.client, collection_name)
 
         logger.info(
             "Retrieved collection info",
             extra={
                 "collection": collection_name,
-                "vectors_count": count_result.count,
-                "vector_size": vector_size
+                "vectors_count": count,
+                "vector_size": meta.vector_size
             }
         )
 
         return CollectionInfo(
             name=collection_name,
-            vectors_count=count_result.count,
-            vector_size=vector_size,
-            distance=distance
+            points_count=count,
+            vectors_count=count,
+            vector_size=meta.vector_size,
+            distance=meta.distance,
+            status=meta.status
         )
 
     async def create_collection(self, request: CreateCollectionRequest) -> dict[str, Any]:
@@ -96,6 +172,7 @@ class CollectionService:
                 distance=distance
             )
         )
+        self.cache.invalidate(request.name)
 
         logger.info(
             "Collection created",
@@ -122,6 +199,7 @@ class CollectionService:
             Dictionary with deletion status
         """
         result = await self.client.delete_collection(collection_name)
+        self.cache.invalidate(collection_name)
 
         logger.info(
             "Collection deleted",
@@ -129,3 +207,293 @@ class CollectionService:
         )
 
         return {"deleted": result}
+
+    async def list_payload_indexes(self, collection_name: str) -> list[dict[str, Any]]:
+        """
+        List payload indexes of a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            List of {field_name, field_type, points, params}
+        """
+        collection = await self.client.get_collection(collection_name)
+        schema = getattr(collection, "payload_schema", None) or {}
+        return [
+            {
+                "field_name": field_name,
+                "field_type": str(getattr(info.data_type, "value", info.data_type)),
+                "points": getattr(info, "points", None),
+                "params": info.params.model_dump(exclude_none=True) if getattr(info, "params", None) else None,
+            }
+            for field_name, info in schema.items()
+        ]
+
+    async def create_payload_index(self, collection_name: str, request: CreatePayloadIndexRequest) -> dict[str, Any]:
+        """
+        Create a payload index on a field
+
+        Args:
+            collection_name: Name of the collection
+            request: Field name, index type and text tokenizer options
+
+        Returns:
+            Dictionary with creation status
+        """
+        field_schema: qm.PayloadSchemaType | qm.TextIndexParams = _PAYLOAD_SCHEMA_TYPES[request.field_type]
+        if request.field_type == "text":
+            field_schema = qm.TextIndexParams(
+                type=qm.TextIndexType.TEXT,
+                tokenizer=_TOKENIZERS[request.tokenizer or "word"],
+                min_token_len=request.min_token_len,
+                max_token_len=request.max_token_len,
+                lowercase=request.lowercase,
+            )
+
+        result = await self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=request.field_name,
+            field_schema=field_schema,
+            wait=True,
+        )
+
+        logger.info(
+            "Payload index created",
+            extra={
+                "collection": collection_name,
+                "field": request.field_name,
+                "field_type": request.field_type
+            }
+        )
+
+        return {"field_name": request.field_name, "created": str(getattr(result.status, "value", result.status))}
+
+    async def delete_payload_index(self, collection_name: str, field_name: str) -> dict[str, Any]:
+        """
+        Delete a payload index
+
+        Args:
+            collection_name: Name of the collection
+            field_name: Indexed payload field
+
+        Returns:
+            Dictionary with deletion status
+        """
+        result = await self.client.delete_payload_index(collection_name, field_name, wait=True)
+
+        logger.info(
+            "Payload index deleted",
+            extra={"collection": collection_name, "field": field_name}
+        )
+
+        return {"field_name": field_name, "deleted": str(getattr(result.status, "value", result.status))}
+
+    async def suggest_payload_indexes(self, collection_name: str, sample_size: int = 1000) -> list[PayloadIndexSuggestion]:
+        """
+        Sample payloads via scroll and suggest fields worth indexing
+
+        A field is suggested when it appears in enough sampled points and has
+        more than one distinct value (a constant field filters nothing).
+        Already indexed fields are skipped.
+
+        Args:
+            collection_name: Name of the collection
+            sample_size: Maximum number of points to sample
+
+        Returns:
+            Suggestions ordered by coverage, then distinct values
+        """
+        indexed = {i["field_name"] for i in await self.list_payload_indexes(collection_name)}
+
+        presence: dict[str, int] = {}
+        values: dict[str, list[Any]] = {}
+        distinct: dict[str, set[str]] = {}
+        sampled = 0
+        offset = None
+        while sampled < sample_size:
+            records, offset = await self.client.scroll(
+                collection_name=collection_name,
+                limit=min(256, sample_size - sampled),
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for rec in records:
+                for key, vs in _flatten_payload(rec.payload or {}).items():
+                    presence[key] = presence.get(key, 0) + 1
+                    values.setdefault(key, []).extend(vs[:4])
+                    seen = distinct.setdefault(key, set())
+                    if len(seen) < _SUGGEST_MAX_DISTINCT_TRACKED:
+                        seen.update(repr(v) for v in vs)
+            sampled += len(records)
+            if offset is None or not records:
+                break
+
+        suggestions: list[PayloadIndexSuggestion] = []
+        for key, hits in presence.items():
+            if key in indexed or not sampled:
+                continue
+            coverage = hits / sampled
+            n_distinct = len(distinct[key])
+            field_type = _infer_index_type(values[key])
+            if field_type is None or coverage < _SUGGEST_MIN_COVERAGE or n_distinct < 2:
+                continue
+            suggestions.append(PayloadIndexSuggestion(
+                field_name=key,
+                field_type=field_type,
+                coverage=round(coverage, 4),
+                distinct_values=n_distinct,
+                reason=f"present in {coverage:.0%} of {sampled} sampled points with {n_distinct} distinct values",
+            ))
+
+        suggestions.sort(key=lambda x: (x.coverage, x.distinct_values), reverse=True)
+        logger.info(
+            "Payload index suggestions computed",
+            extra={"collection": collection_name, "sampled": sampled, "suggestions": len(suggestions)}
+        )
+        return suggestions
+
+    async def list_aliases(self) -> list[dict[str, str]]:
+        """
+        List all aliases
+
+        Returns:
+            List of {alias, collection}
+        """
+        res = await self.client.get_aliases()
+        return [{"alias": a.alias_name, "collection": a.collection_name} for a in res.aliases]
+
+    async def create_alias(self, alias: str, collection_name: str) -> dict[str, Any]:
+        """
+        Create an alias pointing to a collection
+
+        Args:
+            alias: Alias name
+            collection_name: Target collection
+
+        Returns:
+            Dictionary with creation status
+        """
+        result = await self.client.update_collection_aliases(
+            change_aliases_operations=[
+                qm.CreateAliasOperation(create_alias=qm.CreateAlias(collection_name=collection_name, alias_name=alias))
+            ]
+        )
+        self.cache.invalidate_aliases()
+
+        logger.info("Alias created", extra={"alias": alias, "collection": collection_name})
+
+        return {"alias": alias, "collection": collection_name, "created": result}
+
+    async def delete_alias(self, alias: str) -> dict[str, Any]:
+        """
+        Delete an alias (the collection is kept)
+
+        Args:
+            alias: Alias name
+
+        Returns:
+            Dictionary with deletion status
+        """
+        result = await self.client.update_collection_aliases(
+            change_aliases_operations=[qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=alias))]
+        )
+        self.cache.invalidate_aliases()
+
+        logger.info("Alias deleted", extra={"alias": alias})
+
+        return {"alias": alias, "deleted": result}
+
+    async def switch_alias(self, alias: str, collection_name: str) -> dict[str, Any]:
+        """
+        Atomically repoint an alias (create it if missing)
+
+        Delete and create are sent in one update_collection_aliases call,
+        which Qdrant applies atomically, so readers never see a gap.
+
+        Args:
+            alias: Alias name
+            collection_name: New target collection
+
+        Returns:
+            Dictionary with previous and current collection
+        """
+        current = {a["alias"]: a["collection"] for a in await self.list_aliases()}
+        previous = current.get(alias)
+        ops: list[Any] = []
+        if previous is not None:
+            ops.append(qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=alias)))
+        ops.append(
+            qm.CreateAliasOperation(create_alias=qm.CreateAlias(collection_name=collection_name, alias_name=alias))
+        )
+        await self.client.update_collection_aliases(change_aliases_operations=ops)
+        self.cache.invalidate_aliases()
+
+        logger.info(
+            "Alias switched",
+            extra={"alias": alias, "from": previous, "to": collection_name}
+        )
+
+        return {"alias": alias, "previous": previous, "collection": collection_name}
+
+    async def wait_until_green(self, collection_name: str, timeout: float) -> None:
+        """
+        Poll collection status until green
+
+        Raises:
+            TimeoutError: If the collection is not green within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            info = await self.client.get_collection(collection_name)
+            status = str(getattr(info.status, "value", info.status))
+            if status == "green":
+                return
+            if status == "red":
+                raise RuntimeError(f"Collection {collection_name} is red")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Collection {collection_name} still {status} after {timeout:.0f}s")
+            await asyncio.sleep(_GREEN_POLL_INTERVAL)
+
+    async def swap_alias(self, op_id: str, alias: str, request: SwapAliasRequest) -> None:
+        """
+        Blue/green swap: repoint alias once the new collection is green
+
+        Progress and errors are recorded on the OpTracker entry. When
+        delete_old_after is set, the previous collection is dropped after
+        the grace period unless another alias still points to it.
+
+        Args:
+            op_id: OpTracker entry to report on
+            alias: Alias to repoint
+            request: Target collection, green timeout and grace period
+        """
+        try:
+            tracker.update(op_id, stage="waiting_green")
+            await self.wait_until_green(request.collection, request.wait_timeout)
+
+            tracker.update(op_id, stage="switching")
+            res = await self.switch_alias(alias, request.collection)
+            previous = res["previous"]
+            tracker.update(op_id, previous=previous, switched_at=time.time())
+
+            if request.delete_old_after is not None and previous and previous != request.collection:
+                tracker.update(op_id, stage="grace_period")
+                await asyncio.sleep(request.delete_old_after)
+                still_used = [a for a in await self.list_aliases() if a["collection"] == previous]
+                if still_used:
+                    tracker.update(op_id, old_kept_reason=f"still aliased by {still_used[0]['alias']}")
+                else:
+                    tracker.update(op_id, stage="deleting_old")
+                    await self.delete_collection(previous)
+                    tracker.update(op_id, old_deleted=True)
+
+            tracker.update(op_id, stage="completed")
+        except Exception as e:
+            tracker.update(op_id, stage="failed", error=str(e))
+            logger.error(
+                "Alias swap failed",
+                exc_info=True,
+                extra={"alias": alias, "collection": request.collection, "error": str(e)}
+            )
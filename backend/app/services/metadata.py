@@ -0,0 +1,147 @@
+"""
+Collection Metadata Cache
+Shared TTL cache for collection schema, counts and names
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any
+
+from qdrant_client import AsyncQdrantClient
+
+from ..core.cache import TTLCache
+from ..core.config import Settings
+
+settings = Settings()
+
+# Key used for the default (unnamed) vector in CollectionMeta.vectors
+DEFAULT_VECTOR = ""
+
+
+@dataclass
+class CollectionMeta:
+    """Cached subset of a collection's configuration"""
+    name: str
+    vector_size: int
+    distance: str
+    status: str = "unknown"
+    # Vector name -> dimension; DEFAULT_VECTOR for unnamed collections
+    vectors: dict[str, int] = field(default_factory=dict)
+
+
+def _enum_value(v: Any) -> str:
+    return str(getattr(v, "value", v))
+
+
+def meta_from_collection(name: str, collection: Any) -> CollectionMeta:
+    """Build CollectionMeta from a Qdrant CollectionInfo response"""
+    vector_config = collection.config.params.vectors
+    if isinstance(vector_config, dict):
+        vectors = {k: int(p.size) for k, p in vector_config.items()}
+        first = next(iter(vector_config.values()), None)
+        vector_size = int(first.size) if first is not None else 0
+        distance = _enum_value(first.distance) if first is not None else "Unknown"
+    else:
+        vector_size = vector_config.size if hasattr(vector_config, "size") else 0
+        distance = _enum_value(vector_config.distance) if hasattr(vector_config, "distance") else "Unknown"
+        vectors = {DEFAULT_VECTOR: vector_size}
+    return CollectionMeta(
+        name=name,
+        vector_size=vector_size,
+        distance=distance,
+        status=_enum_value(getattr(collection, "status", "unknown")),
+        vectors=vectors,
+    )
+
+
+class CollectionMetadataCache:
+    """
+    TTL cache in front of get_collections / get_collection / count
+
+    Writes going through the API invalidate the affected entries, so the
+    TTL only bounds staleness for changes made outside QuietVector.
+
+    Entries are keyed by the name the caller used, which may be an alias;
+    alias changes therefore drop all schemas and counts.
+    """
+
+    _NAMES_KEY = "__names__"
+    _ALIASES_KEY = "__aliases__"
+
+    def __init__(self, ttl: float) -> None:
+        self._schemas: TTLCache[str, CollectionMeta] = TTLCache(ttl)
+        self._counts: TTLCache[str, int] = TTLCache(ttl)
+        self._names: TTLCache[str, list[str]] = TTLCache(ttl)
+        self._aliases: TTLCache[str, dict[str, str]] = TTLCache(ttl)
+
+    async def list_names(self, client: AsyncQdrantClient) -> list[str]:
+        async def load() -> list[str]:
+            res = await client.get_collections()
+            return [c.name for c in res.collections]
+
+        return await self._names.get_or_load(self._NAMES_KEY, load)
+
+    async def aliases(self, client: AsyncQdrantClient) -> dict[str, str]:
+        """Alias name -> collection name"""
+        async def load() -> dict[str, str]:
+            res = await client.get_aliases()
+            return {a.alias_name: a.collection_name for a in res.aliases}
+
+        return await self._aliases.get_or_load(self._ALIASES_KEY, load)
+
+    async def schema(self, client: AsyncQdrantClient, name: str) -> CollectionMeta:
+        async def load() -> CollectionMeta:
+            return meta_from_collection(name, await client.get_collection(name))
+
+        return await self._schemas.get_or_load(name, load)
+
+    async def count(self, client: AsyncQdrantClient, name: str) -> int:
+        async def load() -> int:
+            res = await client.count(name, exact=False)
+            return int(res.count)
+
+        return await self._counts.get_or_load(name, load)
+
+    async def info(self, client: AsyncQdrantClient, name: str) -> tuple[CollectionMeta, int]:
+        """Schema and approximate count; misses are fetched concurrently"""
+        meta, count = await asyncio.gather(self.schema(client, name), self.count(client, name))
+        return meta, count
+
+    def invalidate(self, name: str | None = None) -> None:
+        """Drop cached data for one collection (or everything), the name list and aliases"""
+        # Entries cached under aliases of this collection (as far as we know them)
+        aliases = self._aliases.get(self._ALIASES_KEY) or {}
+        self._names.clear()
+        self._aliases.clear()
+        if name is None:
+            self._schemas.clear()
+            self._counts.clear()
+            return
+        for key in [name, *(a for a, target in aliases.items() if target == name)]:
+            self._schemas.pop(key)
+            self._counts.pop(key)
+
+    def invalidate_aliases(self) -> None:
+        """Alias changes can repoint any cached name"""
+        self._aliases.clear()
+        self._schemas.clear()
+        self._counts.clear()
+
+    def invalidate_counts(self, name: str) -> None:
+        """Drop only the cached count; the schema stays valid across writes"""
+        self._counts.pop(name)
+
+
+# Global cache (in-memory), for the default cluster
+metadata_cache = CollectionMetadataCache(ttl=settings.collection_cache_ttl)
+_cluster_caches: dict[str, CollectionMetadataCache] = {}
+
+
+def cluster_metadata_cache(cluster: str | None = None) -> CollectionMetadataCache:
+    """Cache for one cluster; collection names are only unique within a cluster"""
+    if cluster is None or cluster == settings.qdrant_cluster_name:
+        return metadata_cache
+    if cluster not in _cluster_caches:
+        _cluster_caches[cluster] = CollectionMetadataCache(ttl=settings.collection_cache_ttl)
+    return _cluster_caches[cluster]
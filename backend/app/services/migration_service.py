@@ -0,0 +1,480 @@
+"""
+Migration Service
+Copies a collection into a new one with different params (HNSW, quantization, distance)
+"""
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from qdrant_client import AsyncQdrantClient, models as qm
+
+from ..core.config import Settings
+from ..core.logging import get_logger
+from ..core.ops import tracker
+from ..schemas.collections import MigrateCollectionRequest
+from .metadata import CollectionMetadataCache, metadata_cache
+
+logger = get_logger(__name__)
+settings = Settings()
+
+PointId = int | str
+
+# Ids fetched per page while planning reader ranges
+_PLAN_PAGE = 10_000
+# Minimum seconds between checkpoint writes / tracker updates
+_CHECKPOINT_INTERVAL = 2.0
+# Indexing threshold restored when the source doesn't report one
+_DEFAULT_INDEXING_THRESHOLD = 20_000
+
+_DISTANCES = {
+    "Cosine": qm.Distance.COSINE,
+    "Dot": qm.Distance.DOT,
+    "Euclid": qm.Distance.EUCLID,
+}
+
+
+class MigrationRunningError(RuntimeError):
+    """The job is already being run (by this or another worker)"""
+
+    def __init__(self, job_id: str) -> None:
+        super().__init__(f"Migration already running: {job_id}")
+        self.job_id = job_id
+
+
+# Run claims held by this process: job_id -> fd holding the job's flock
+_claims: dict[str, int] = {}
+
+
+def id_key(pid: PointId) -> tuple[int, Any]:
+    """Sort key matching Qdrant's scroll order: integer ids first, then UUIDs"""
+    if isinstance(pid, int):
+        return (0, pid)
+    return (1, str(pid).lower())
+
+
+@dataclass
+class _Batch:
+    range_idx: int
+    seq: int
+    records: list[Any]
+    next_offset: PointId | None
+    last: bool
+
+
+@dataclass
+class _RangeProgress:
+    next_seq: int = 0
+    completed: dict[int, _Batch] = field(default_factory=dict)
+
+
+class MigrationService:
+    """
+    Online collection rebuild
+
+    The source id space is split into disjoint ranges. One scroll reader per
+    range feeds a bounded queue drained by concurrent upsert workers. Each
+    range's checkpoint only advances past batches that were fully upserted,
+    so a crashed job can resume from its state file without losing points
+    (re-copied points are idempotent upserts).
+
+    A job records the cluster it was started on; only a service bound to
+    that cluster resumes it.
+    """
+
+    def __init__(
+        self, client: AsyncQdrantClient, cache: CollectionMetadataCache | None = None, cluster: str | None = None
+    ):
+        self.client = client
+        self.cache = cache or metadata_cache
+        self.cluster = cluster or settings.qdrant_cluster_name
+        self._save_lock = asyncio.Lock()
+
+    # State persistence
+
+    @staticmethod
+    def _state_path(job_id: str) -> Path:
+        try:
+            # Job ids are UUIDs; this also keeps user input out of path traversal
+            job_id = str(uuid.UUID(job_id))
+        except ValueError:
+            raise KeyError(job_id)
+        return settings.migration_state_dir / f"{job_id}.json"
+
+    @staticmethod
+    def _write_state(job_id: str, data: str) -> None:
+        path = MigrationService._state_path(job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+
+    async def _save(self, state: dict[str, Any]) -> None:
+        # Snapshot on the loop (workers keep mutating state), write off-loop, one writer at a time
+        data = json.dumps(state)
+        async with self._save_lock:
+            await asyncio.to_thread(self._write_state, state["job_id"], data)
+
+    def _claim(self, job_id: str) -> None:
+        """
+        Take the job's run lock (an flock, so it also excludes other workers)
+
+        Raises:
+            MigrationRunningError: If the job is already claimed
+        """
+        if job_id in _claims:
+            raise MigrationRunningError(job_id)
+        path = self._state_path(job_id).with_suffix(".lock")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise MigrationRunningError(job_id)
+        _claims[job_id] = fd
+
+    @staticmethod
+    def _release(job_id: str) -> None:
+        fd = _claims.pop(job_id, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    def load_state(job_id: str) -> dict[str, Any]:
+        """
+        Load a migration checkpoint
+
+        Raises:
+            KeyError: If no state file exists for job_id
+        """
+        path = MigrationService._state_path(job_id)
+        if not path.exists():
+            raise KeyError(job_id)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    # Public API
+
+    async def start(self, source: str, request: MigrateCollectionRequest) -> dict[str, str]:
+        """
+        Validate and register a migration job (run it with run())
+
+        Args:
+            source: Source collection name
+            request: Target name, param overrides and pipeline tuning
+
+        Returns:
+            Dictionary with job_id and op_id
+        """
+        await self.client.get_collection(source)
+        if await self.client.collection_exists(request.target):
+            raise ValueError(f"Target collection already exists: {request.target}")
+
+        job_id = str(uuid.uuid4())
+        # Held until run() finishes, so a resume in between is refused
+        self._claim(job_id)
+        op = tracker.create("collection_migration", meta={"job_id": job_id, "source": source, "target": request.target})
+        state = {
+            "job_id": job_id,
+            "op_id": op.id,
+            "cluster": self.cluster,
+            "source": source,
+            "target": request.target,
+            "request": request.model_dump(),
+            "target_created": False,
+            "indexing_threshold": None,
+            "total": None,
+            "copied": 0,
+            "ranges": [],
+            "completed": False,
+        }
+        try:
+            await self._save(state)
+        except Exception:
+            self._release(job_id)
+            raise
+        return {"job_id": job_id, "op_id": op.id}
+
+    async def resume(self, job_id: str) -> dict[str, str]:
+        """
+        Register a new run for an interrupted job
+
+        Raises:
+            KeyError: Unknown job
+            ValueError: Job already completed, or started on another cluster
+            MigrationRunningError: Job is still running
+        """
+        state = await asyncio.to_thread(self.load_state, job_id)
+        if state.get("completed"):
+            raise ValueError("Migration already completed")
+        job_cluster = state.get("cluster") or settings.qdrant_cluster_name
+        if job_cluster != self.cluster:
+            raise ValueError(f"Migration was started on cluster {job_cluster!r}, not {self.cluster!r}")
+        self._claim(job_id)
+        try:
+            op = tracker.create(
+                "collection_migration",
+                meta={"job_id": job_id, "source": state["source"], "target": state["target"], "resumed": True},
+            )
+            state["op_id"] = op.id
+            await self._save(state)
+        except Exception:
+            self._release(job_id)
+            raise
+        return {"job_id": job_id, "op_id": op.id}
+
+    async def status(self, job_id: str) -> dict[str, Any]:
+        """Persisted checkpoint plus the op entry"""
+        state = await asyncio.to_thread(self.load_state, job_id)
+        op = tracker.get(state.get("op_id", ""))
+        return {**state, "op": tracker.to_dict(op.id) if op else None}
+
+    async def run(self, job_id: str) -> None:
+        """Execute (or continue) a migration; failures are recorded in the OpTracker"""
+        if job_id not in _claims:
+            try:
+                self._claim(job_id)
+            except MigrationRunningError:
+                logger.warning("Migration already running; not started again", extra={"job_id": job_id})
+                return
+        try:
+            await self._run(job_id)
+        finally:
+            self._release(job_id)
+
+    async def _run(self, job_id: str) -> None:
+        state = await asyncio.to_thread(self.load_state, job_id)
+        op_id = state["op_id"]
+        request = MigrateCollectionRequest(**state["request"])
+        try:
+            if not state["target_created"]:
+                tracker.update(op_id, stage="creating")
+                await self._create_target(state, request)
+                state["target_created"] = True
+                await self._save(state)
+
+            if not state["ranges"]:
+                tracker.update(op_id, stage="planning")
+                await self._plan(state, request.readers)
+                await self._save(state)
+
+            tracker.update(op_id, stage="copying", total=state["total"], copied=state["copied"])
+            await self._copy(state, request)
+
+            tracker.update(op_id, stage="finalizing")
+            await self.client.update_collection(
+                collection_name=state["target"],
+                optimizers_config=qm.OptimizersConfigDiff(
+                    indexing_threshold=state["indexing_threshold"] or _DEFAULT_INDEXING_THRESHOLD
+                ),
+            )
+            state["completed"] = True
+            await self._save(state)
+            self.cache.invalidate(state["target"])
+            tracker.update(op_id, stage="completed")
+            logger.info(
+                "Collection migration completed",
+                extra={"job_id": job_id, "source": state["source"], "target": state["target"], "copied": state["copied"]}
+            )
+        except Exception as e:
+            await self._save(state)
+            tracker.update(op_id, stage="failed", error=str(e))
+            logger.error(
+                "Collection migration failed",
+                exc_info=True,
+                extra={"job_id": job_id, "error": str(e)}
+            )
+
+    # Steps
+
+    async def _create_target(self, state: dict[str, Any], request: MigrateCollectionRequest) -> None:
+        src = await self.client.get_collection(state["source"])
+        distance = _DISTANCES[request.distance] if request.distance else None
+
+        def params(p: qm.VectorParams) -> qm.VectorParams:
+            return qm.VectorParams(
+                size=p.size,
+                distance=distance or p.distance,
+                on_disk=request.on_disk if request.on_disk is not None else p.on_disk,
+                hnsw_config=p.hnsw_config,
+                datatype=p.datatype,
+            )
+
+        vectors = src.config.params.vectors
+        vectors_config = {k: params(v) for k, v in vectors.items()} if isinstance(vectors, dict) else params(vectors)
+
+        quantization: Any = src.config.quantization_config
+        if request.quantization == "none":
+            quantization = None
+        elif request.quantization == "scalar":
+            quantization = qm.ScalarQuantization(
+                scalar=qm.ScalarQuantizationConfig(type=qm.ScalarType.INT8, always_ram=True)
+            )
+        elif request.quantization == "binary":
+            quantization = qm.BinaryQuantization(binary=qm.BinaryQuantizationConfig(always_ram=True))
+
+        optimizer = getattr(src.config, "optimizer_config", None)
+        state["indexing_threshold"] = getattr(optimizer, "indexing_threshold", None)
+
+        await self.client.create_collection(
+            collection_name=state["target"],
+            vectors_config=vectors_config,
+            sparse_vectors_config=src.config.params.sparse_vectors,
+            shard_number=src.config.params.shard_number,
+            replication_factor=src.config.params.replication_factor,
+            on_disk_payload=src.config.params.on_disk_payload,
+            hnsw_config=qm.HnswConfigDiff(
+                m=request.m or src.config.hnsw_config.m,
+                ef_construct=request.ef_construct or src.config.hnsw_config.ef_construct,
+            ),
+            quantization_config=quantization,
+            # Bulk load without building HNSW; the threshold is restored when copying is done
+            optimizers_config=qm.OptimizersConfigDiff(indexing_threshold=0),
+        )
+        self.cache.invalidate(state["target"])
+
+    async def _plan(self, state: dict[str, Any], readers: int) -> None:
+        """Split the source id space into up to `readers` contiguous ranges of similar size"""
+        total = (await self.client.count(state["source"], exact=True)).count
+        state["total"] = total
+        step = max(1, math.ceil(total / readers))
+        boundaries: list[PointId | None] = [None]
+        seen = 0
+        offset: PointId | None = None
+        while len(boundaries) < readers:
+            records, offset = await self.client.scroll(
+                collection_name=state["source"],
+                limit=_PLAN_PAGE,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            for rec in records:
+                if seen and seen % step == 0 and len(boundaries) < readers:
+                    boundaries.append(rec.id)
+                seen += 1
+            if offset is None:
+                break
+        ends = boundaries[1:] + [None]
+        state["ranges"] = [
+            {"start": start, "end": end, "offset": start, "done": False, "copied": 0}
+            for start, end in zip(boundaries, ends)
+        ]
+
+    async def _copy(self, state: dict[str, Any], request: MigrateCollectionRequest) -> None:
+        source, target = state["source"], state["target"]
+        op_id = state["op_id"]
+        ranges = state["ranges"]
+        progress = [_RangeProgress() for _ in ranges]
+        queue: asyncio.Queue[_Batch | None] = asyncio.Queue(maxsize=request.workers * 2)
+        started = time.monotonic()
+        state["copied"] = sum(r.get("copied", 0) for r in ranges)
+        copied_at_start = state["copied"]
+        last_flush = started
+
+        async def reader(idx: int) -> None:
+            r = ranges[idx]
+            end_key = id_key(r["end"]) if r["end"] is not None else None
+            offset = r["offset"]
+            seq = 0
+            while True:
+                records, nxt = await self.client.scroll(
+                    collection_name=source,
+                    limit=request.batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                last = nxt is None
+                if end_key is not None:
+                    kept = [rec for rec in records if id_key(rec.id) < end_key]
+                    if len(kept) < len(records) or (nxt is not None and id_key(nxt) >= end_key):
+                        last = True
+                    records = kept
+                await queue.put(_Batch(idx, seq, records, None if last else nxt, last))
+                if last:
+                    return
+                seq += 1
+                offset = nxt
+
+        def complete(batch: _Batch) -> None:
+            prog = progress[batch.range_idx]
+            prog.completed[batch.seq] = batch
+            r = ranges[batch.range_idx]
+            while prog.next_seq in prog.completed:
+                done = prog.completed.pop(prog.next_seq)
+                prog.next_seq += 1
+                # Counted with the checkpoint, so batches re-copied after a resume count once
+                r["copied"] = r.get("copied", 0) + len(done.records)
+                if done.last:
+                    r["done"] = True
+                    r["offset"] = None
+                else:
+                    r["offset"] = done.next_offset
+
+        async def worker() -> None:
+            nonlocal last_flush
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                if batch.records:
+                    await self.client.upsert(
+                        collection_name=target,
+                        points=[
+                            qm.PointStruct(id=rec.id, vector=rec.vector, payload=rec.payload or {})
+                            for rec in batch.records
+                        ],
+                        wait=True,
+                    )
+                complete(batch)
+                state["copied"] = sum(r.get("copied", 0) for r in ranges)
+                now = time.monotonic()
+                if now - last_flush >= _CHECKPOINT_INTERVAL:
+                    last_flush = now
+                    self._report(op_id, state, copied_at_start, started)
+                    await self._save(state)
+
+        readers = [asyncio.create_task(reader(i)) for i, r in enumerate(ranges) if not r["done"]]
+        workers = [asyncio.create_task(worker()) for _ in range(request.workers)]
+
+        async def feed() -> None:
+            await asyncio.gather(*readers)
+            for _ in workers:
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(feed()), *workers]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        failed = next((t for t in done if t.exception() is not None), None)
+        if failed is not None:
+            for t in [*readers, *tasks]:
+                t.cancel()
+            await asyncio.gather(*readers, *tasks, return_exceptions=True)
+            raise failed.exception()  # type: ignore[misc]
+
+        self._report(op_id, state, copied_at_start, started)
+
+    @staticmethod
+    def _report(op_id: str, state: dict[str, Any], copied_at_start: int, started: float) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = (state["copied"] - copied_at_start) / elapsed
+        total = state["total"] or 0
+        tracker.update(
+            op_id,
+            copied=state["copied"],
+            total=total,
+            points_per_sec=round(rate, 1),
+            elapsed_sec=round(elapsed, 1),
+            eta_sec=round((total - state["copied"]) / rate, 1) if rate > 0 and total > state["copied"] else None,
+            ranges_done=sum(1 for r in state["ranges"] if r["done"]),
+            ranges_total=len(state["ranges"]),
+        )
@@ -0,0 +1,351 @@
+"""
+Snapshot Scheduler
+In-process cron for collection snapshots with keep-last / keep-daily retention
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from ..core.config import Settings
+from ..core.cron import CronExpression
+from ..core.logging import get_logger
+from ..qdrant.clusters import clusters
+from ..schemas.snapshots import SnapshotScheduleRequest
+from .snapshot_service import SnapshotError, SnapshotService
+
+logger = get_logger(__name__)
+settings = Settings()
+
+# Seconds between due-checks; cron resolution is one minute
+_TICK_SECONDS = 20.0
+
+T = TypeVar("T")
+
+
+@dataclass
+class SnapshotSchedule:
+    id: str
+    collection: str
+    cron: str
+    keep_last: int | None = None
+    keep_daily: int | None = None
+    enabled: bool = True
+    cluster: str | None = None
+    next_run: float | None = None
+    last_run: float | None = None
+    last_snapshot: str | None = None
+    last_deleted: int = 0
+    last_error: str | None = None
+
+
+Schedules = dict[str, SnapshotSchedule]
+
+
+def _next_run(cron: str, after: float) -> float:
+    now = datetime.fromtimestamp(after, tz=timezone.utc)
+    return CronExpression(cron).next_after(now).timestamp()
+
+
+def _created(snap: dict[str, Any]) -> datetime:
+    t = snap.get("creation_time")
+    if t:
+        try:
+            dt = datetime.fromisoformat(t)
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def select_for_deletion(
+    snapshots: list[dict[str, Any]], keep_last: int | None, keep_daily: int | None
+) -> list[str]:
+    """
+    Names of snapshots that fall outside the retention policy
+
+    Kept: the newest keep_last snapshots, and the newest snapshot of each of
+    the keep_daily most recent days that have one. With neither set,
+    nothing is deleted.
+    """
+    if not keep_last and not keep_daily:
+        return []
+    ordered = sorted(snapshots, key=lambda s: (_created(s), s.get("name", "")), reverse=True)
+    keep: set[str] = set()
+    if keep_last:
+        keep.update(s["name"] for s in ordered[:keep_last])
+    if keep_daily:
+        days: set[Any] = set()
+        for s in ordered:
+            day = _created(s).date()
+            if day not in days:
+                if len(days) == keep_daily:
+                    break
+                days.add(day)
+                keep.add(s["name"])
+    return [s["name"] for s in ordered if s["name"] not in keep]
+
+
+def _default_service(cluster: str | None) -> SnapshotService:
+    return SnapshotService(clusters.http(cluster), cluster)
+
+
+class SnapshotScheduler:
+    """
+    Runs create_snapshot per collection on cron schedules (UTC)
+
+    Schedules and their last results are persisted to a JSON file, so they
+    survive restarts; a run missed while the API was down fires once on the
+    next tick. Retention applies to every snapshot of the collection, not
+    only scheduled ones.
+
+    The file is the source of truth for every worker: reads re-load it when
+    it changed, and each change is a read-modify-write under an flock on
+    `<path>.lock`. CRUD therefore works on any worker, and a due run is
+    claimed (next_run advanced) by exactly one scheduler even if several
+    are enabled.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        service_factory: Callable[[str | None], SnapshotService] = _default_service,
+    ) -> None:
+        self.path = path or settings.snapshot_schedule_path
+        self._service = service_factory
+        self._schedules: Schedules = {}
+        self._stamp: tuple[int, int, int] | None = None
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    # Persistence
+
+    def _file_stamp(self) -> tuple[int, int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read(self) -> Schedules:
+        if not self.path.exists():
+            return {}
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        return {s["id"]: SnapshotSchedule(**s) for s in data.get("schedules", [])}
+
+    def load(self) -> None:
+        """(Re-)read the schedule file"""
+        stamp = self._file_stamp()
+        self._schedules = self._read()
+        self._stamp = stamp
+
+    def _refresh(self) -> None:
+        """Re-read the file if it changed (e.g. written by another worker)"""
+        if self._file_stamp() != self._stamp:
+            self.load()
+
+    def _write(self, data: str) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path.with_suffix(".lock"), os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _mutate_sync(self, change: Callable[[Schedules], T]) -> T:
+        with self._locked():
+            schedules = self._read()
+            result = change(schedules)
+            self._write(json.dumps({"schedules": [asdict(s) for s in schedules.values()]}))
+            self._schedules = schedules
+            self._stamp = self._file_stamp()
+        return result
+
+    async def _mutate(self, change: Callable[[Schedules], T]) -> T:
+        """
+        Apply `change` to the current file contents and persist them
+
+        Raises:
+            Whatever `change` raises (nothing is written then)
+        """
+        return await asyncio.to_thread(self._mutate_sync, change)
+
+    # CRUD
+
+    def list_schedules(self) -> list[dict[str, Any]]:
+        self._refresh()
+        return [asdict(s) for s in self._schedules.values()]
+
+    def get(self, schedule_id: str) -> SnapshotSchedule:
+        """
+        Raises:
+            KeyError: Unknown schedule
+        """
+        self._refresh()
+        return self._schedules[schedule_id]
+
+    async def add(self, request: SnapshotScheduleRequest) -> dict[str, Any]:
+        s = SnapshotSchedule(id=str(uuid.uuid4()), **request.model_dump())
+        s.next_run = _next_run(s.cron, time.time())
+
+        def insert(schedules: Schedules) -> None:
+            schedules[s.id] = s
+
+        await self._mutate(insert)
+        logger.info("Snapshot schedule added", extra={"schedule_id": s.id, "collection": s.collection, "cron": s.cron})
+        return asdict(s)
+
+    async def update(self, schedule_id: str, request: SnapshotScheduleRequest) -> dict[str, Any]:
+        """
+        Raises:
+            KeyError: Unknown schedule
+        """
+        def change(schedules: Schedules) -> SnapshotSchedule:
+            s = schedules[schedule_id]
+            for k, v in request.model_dump().items():
+                setattr(s, k, v)
+            s.next_run = _next_run(s.cron, time.time())
+            return s
+
+        return asdict(await self._mutate(change))
+
+    async def remove(self, schedule_id: str) -> None:
+        """
+        Raises:
+            KeyError: Unknown schedule
+        """
+        def delete(schedules: Schedules) -> None:
+            del schedules[schedule_id]
+
+        await self._mutate(delete)
+
+    # Execution
+
+    async def run_schedule(self, schedule_id: str) -> dict[str, Any]:
+        """
+        Take a snapshot for a schedule now and apply its retention
+
+        Failures are recorded on the schedule (last_error), not raised.
+
+        Raises:
+            KeyError: Unknown schedule
+        """
+        s = replace(self.get(schedule_id))
+        service = self._service(s.cluster)
+        s.last_run = time.time()
+        s.last_error = None
+        s.last_deleted = 0
+        try:
+            res = await service.create_snapshot(s.collection)
+            s.last_snapshot = (res.get("result") or {}).get("name")
+            if s.keep_last or s.keep_daily:
+                snaps = (await service.list_snapshots(s.collection)).get("result") or []
+                for name in select_for_deletion(snaps, s.keep_last, s.keep_daily):
+                    await service.delete_snapshot(s.collection, name)
+                    s.last_deleted += 1
+        except SnapshotError as e:
+            s.last_error = f"{e.status_code}: {e.detail[:200]}"
+        except Exception as e:
+            s.last_error = str(e)
+        if s.last_error:
+            logger.warning(
+                "Scheduled snapshot failed",
+                extra={"schedule_id": s.id, "collection": s.collection, "error": s.last_error}
+            )
+
+        def record(schedules: Schedules) -> SnapshotSchedule:
+            # Only the run's results; the schedule may have been edited (or removed) meanwhile
+            current = schedules.get(schedule_id)
+            if current is None:
+                return s
+            for k in ("last_run", "last_snapshot", "last_deleted", "last_error"):
+                setattr(current, k, getattr(s, k))
+            return current
+
+        return asdict(await self._mutate(record))
+
+    async def tick(self, now: float | None = None) -> list[asyncio.Task[None]]:
+        """Start every due schedule that isn't already running (claimed under the file lock)"""
+        now = time.time() if now is None else now
+
+        def due(schedules: Schedules) -> list[SnapshotSchedule]:
+            return [
+                s for s in schedules.values()
+                if s.enabled and s.next_run is not None and s.next_run <= now and s.id not in self._running
+            ]
+
+        self._refresh()
+        if not due(self._schedules):
+            return []
+
+        def claim(schedules: Schedules) -> list[str]:
+            ids = []
+            for s in due(schedules):
+                s.next_run = _next_run(s.cron, now)
+                ids.append(s.id)
+            return ids
+
+        started: list[asyncio.Task[None]] = []
+        for schedule_id in await self._mutate(claim):
+            task = asyncio.create_task(self._run_guarded(schedule_id))
+            self._running[schedule_id] = task
+            started.append(task)
+        return started
+
+    async def _run_guarded(self, schedule_id: str) -> None:
+        try:
+            await self.run_schedule(schedule_id)
+        except KeyError:
+            pass  # removed while queued
+        except Exception as e:
+            logger.error("Snapshot schedule crashed", extra={"schedule_id": schedule_id, "error": str(e)})
+        finally:
+            self._running.pop(schedule_id, None)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error("Snapshot scheduler tick failed", extra={"error": str(e)})
+            await asyncio.sleep(_TICK_SECONDS)
+
+    def start(self) -> None:
+        """Load persisted schedules and start the background loop"""
+        if self._task is not None:
+            return
+        try:
+            self.load()
+        except Exception as e:
+            logger.error("Could not load snapshot schedules", extra={"path": str(self.path), "error": str(e)})
+        self._task = asyncio.create_task(self._loop())
+        logger.info("Snapshot scheduler started", extra={"schedules": len(self._schedules)})
+
+    async def stop(self) -> None:
+        """Stop the loop and cancel in-flight runs"""
+        tasks = [t for t in (self._task, *self._running.values()) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._running.clear()
+
+
+# Global scheduler (started in the app lifespan)
+scheduler = SnapshotScheduler()
@@ -0,0 +1,528 @@
+"""
+Snapshot Service
+Handles Qdrant snapshot REST calls over the shared HTTP pool
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import secrets
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+import httpx
+import multipart
+from multipart.multipart import parse_options_header
+
+from ..core.config import Settings
+from ..core.logging import get_logger
+from ..core.ops import tracker
+
+logger = get_logger(__name__)
+settings = Settings()
+
+
+class SnapshotError(Exception):
+    """Non-success response from Qdrant's snapshot API"""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ChecksumMismatch(SnapshotError):
+    """Streamed snapshot bytes don't match the client-supplied SHA-256"""
+
+    def __init__(self, expected: str, actual: str) -> None:
+        super().__init__(422, f"Checksum mismatch: expected {expected}, got {actual}")
+        self.actual = actual
+
+
+class MultipartFileStream:
+    """
+    Incrementally extract the first file part of a multipart/form-data body
+
+    Feed raw request chunks in; file bytes come out as soon as they are
+    parsed, so nothing is buffered beyond the current chunk.
+    """
+
+    def __init__(self, content_type: str) -> None:
+        ctype, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if ctype != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected multipart/form-data with a boundary")
+        self.filename: str | None = None
+        self.started = False
+        self.done = False
+        self._in_file = False
+        self._headers: dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+        self._out: list[bytes] = []
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Parse a chunk and return the file bytes it contained"""
+        self._parser.write(chunk)
+        out, self._out = self._out, []
+        return out
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" in options and not self.started:
+            self.started = True
+            self._in_file = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._out.append(bytes(data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.done = True
+
+
+async def read_file_chunks(path: Path, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """Read a file in chunks, each read in a worker thread so the event loop never blocks on disk"""
+    f = await asyncio.to_thread(path.open, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _multipart_envelope(field: str, filename: str) -> tuple[str, bytes, bytes]:
+    """Content-Type, part header and closing boundary for a single-file upload"""
+    boundary = secrets.token_hex(16)
+    safe_name = filename.replace('"', "").replace("\r", "").replace("\n", "")
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{safe_name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return f"multipart/form-data; boundary={boundary}", head, tail
+
+
+# Seconds between collection status polls while a recover runs
+_RECOVER_POLL_INTERVAL = 2.0
+
+
+def shared_snapshot_location(path: str) -> str:
+    """
+    Map a path inside the shared snapshot volume to the file:// URI Qdrant sees
+
+    Args:
+        path: Relative to snapshot_shared_dir, or absolute inside it
+
+    Raises:
+        SnapshotError: 403 when restore-by-path is disabled or the path
+            escapes the shared directory, 404 when the file doesn't exist
+    """
+    if settings.snapshot_shared_dir is None:
+        raise SnapshotError(403, "Restore from shared path is not configured")
+    root = settings.snapshot_shared_dir.resolve()
+    # Resolving follows symlinks, so links pointing outside the root are rejected too
+    target = (root / path).resolve()
+    if not target.is_relative_to(root):
+        raise SnapshotError(403, "Path is outside the shared snapshot directory")
+    if not target.is_file():
+        raise SnapshotError(404, f"Snapshot not found: {path}")
+    qdrant_root = settings.snapshot_shared_qdrant_dir or root
+    return (qdrant_root / target.relative_to(root)).as_uri()
+
+
+def _check(r: httpx.Response, ok: tuple[int, ...] = (200,)) -> dict[str, Any]:
+    if r.status_code not in ok:
+        raise SnapshotError(r.status_code, r.text)
+    return r.json()
+
+
+def _summarize(snaps: list[dict[str, Any]]) -> dict[str, Any]:
+    times = sorted(t for t in (s.get("creation_time") for s in snaps) if t)
+    return {
+        "count": len(snaps),
+        "bytes": sum(s.get("size") or 0 for s in snaps),
+        "oldest": times[0] if times else None,
+        "newest": times[-1] if times else None,
+    }
+
+
+class SnapshotService:
+    """Service for collection snapshots"""
+
+    def __init__(self, http: httpx.AsyncClient, cluster: str | None = None):
+        self.http = http
+        self.cluster = cluster or settings.qdrant_cluster_name
+
+    async def list_snapshots(self, collection: str) -> dict[str, Any]:
+        """
+        List snapshots of a collection
+
+        Raises:
+            SnapshotError: If Qdrant rejects the request
+        """
+        r = await self.http.get(f"/collections/{collection}/snapshots")
+        return _check(r)
+
+    async def create_snapshot(self, collection: str) -> dict[str, Any]:
+        """
+        Create a snapshot (waits for Qdrant to finish writing it)
+
+        Raises:
+            SnapshotError: If Qdrant rejects the request
+        """
+        r = await self.http.post(f"/collections/{collection}/snapshots", timeout=None)
+        res = _check(r, (200, 202))
+        logger.info("Snapshot created", extra={"collection": collection})
+        return res
+
+    async def list_collections(self) -> list[str]:
+        r = await self.http.get("/collections")
+        return [c["name"] for c in _check(r)["result"]["collections"]]
+
+    async def list_full_snapshots(self) -> dict[str, Any]:
+        """List full-storage snapshots"""
+        r = await self.http.get("/snapshots")
+        return _check(r)
+
+    async def delete_snapshot(self, collection: str, name: str) -> dict[str, Any]:
+        """
+        Delete a collection snapshot
+
+        Raises:
+            SnapshotError: If Qdrant rejects the request
+        """
+        r = await self.http.delete(
+            f"/collections/{collection}/snapshots/{name}", params={"wait": "true"}
+        )
+        res = _check(r, (200, 202))
+        logger.info("Snapshot deleted", extra={"collection": collection, "snapshot": name})
+        return res
+
+    async def storage_summary(self) -> dict[str, Any]:
+        """
+        Snapshot count and bytes per collection plus full-storage snapshots
+
+        Returns:
+            Dictionary with totals, per-collection items and full_storage
+        """
+        names = await self.list_collections()
+        sem = asyncio.Semaphore(settings.snapshot_concurrency)
+
+        async def one(name: str) -> dict[str, Any]:
+            async with sem:
+                try:
+                    snaps = (await self.list_snapshots(name)).get("result") or []
+                except Exception as e:
+                    return {"collection": name, "error": str(e)}
+            return {"collection": name, **_summarize(snaps)}
+
+        items = await asyncio.gather(*(one(n) for n in names))
+        try:
+            full = _summarize((await self.list_full_snapshots()).get("result") or [])
+        except Exception as e:
+            full = {"error": str(e)}
+        return {
+            "total_count": sum(i.get("count", 0) for i in items) + full.get("count", 0),
+            "total_bytes": sum(i.get("bytes", 0) for i in items) + full.get("bytes", 0),
+            "collections": items,
+            "full_storage": full,
+        }
+
+    async def create_full_snapshot(self) -> dict[str, Any]:
+        """
+        Snapshot the whole storage (all collections and aliases)
+
+        Raises:
+            SnapshotError: If Qdrant rejects the request
+        """
+        r = await self.http.post("/snapshots", timeout=None)
+        res = _check(r, (200, 202))
+        logger.info("Full storage snapshot created")
+        return res
+
+    async def snapshot_batch(
+        self,
+        op_id: str,
+        collections: list[str] | None = None,
+        full_storage: bool = False,
+        concurrency: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Snapshot many collections concurrently (or the full storage)
+
+        Each finished snapshot is recorded on the op with its size and
+        duration; one failing collection doesn't stop the others.
+
+        Args:
+            op_id: OpTracker entry to report into
+            collections: Names to snapshot (None means all)
+            full_storage: Take one full-storage snapshot instead
+            concurrency: Max snapshots in flight (default snapshot_concurrency)
+
+        Returns:
+            Per-snapshot results (collection, snapshot, size, duration_seconds, error)
+        """
+        started = time.monotonic()
+        results: list[dict[str, Any]] = []
+
+        async def one(collection: str | None) -> None:
+            t0 = time.monotonic()
+            item: dict[str, Any] = {"collection": collection}
+            try:
+                res = await (self.create_full_snapshot() if collection is None else self.create_snapshot(collection))
+                snap = res.get("result") or {}
+                item.update(snapshot=snap.get("name"), size=snap.get("size"))
+            except SnapshotError as e:
+                item["error"] = f"{e.status_code}: {e.detail[:200]}"
+            except Exception as e:
+                item["error"] = str(e)
+            item["duration_seconds"] = round(time.monotonic() - t0, 3)
+            results.append(item)
+            tracker.update(
+                op_id,
+                done=len(results),
+                failed=sum(1 for r in results if "error" in r),
+                total_bytes=sum(r.get("size") or 0 for r in results),
+                snapshots=list(results),
+            )
+
+        try:
+            targets: list[str | None] = [None] if full_storage else (collections or await self.list_collections())
+        except Exception as e:
+            tracker.update(op_id, stage="failed", error=str(e))
+            return results
+        tracker.update(op_id, stage="running", total=len(targets), done=0, failed=0)
+
+        sem = asyncio.Semaphore(concurrency or settings.snapshot_concurrency)
+
+        async def bounded(collection: str | None) -> None:
+            async with sem:
+                await one(collection)
+
+        await asyncio.gather(*(bounded(c) for c in targets))
+
+        elapsed = round(time.monotonic() - started, 3)
+        failed = sum(1 for r in results if "error" in r)
+        if failed:
+            tracker.update(op_id, stage="failed", error=f"{failed} of {len(targets)} snapshots failed", elapsed_seconds=elapsed)
+        else:
+            tracker.update(op_id, stage="completed", elapsed_seconds=elapsed)
+        logger.info(
+            "Snapshot batch finished",
+            extra={"op_id": op_id, "snapshots": len(targets), "failed": failed, "elapsed_seconds": elapsed}
+        )
+        return results
+
+    async def open_download(
+        self,
+        collection: str,
+        name: str,
+        range_header: str | None = None,
+        if_range: str | None = None,
+    ) -> httpx.Response:
+        """
+        Open a streaming snapshot download
+
+        Range / If-Range are forwarded so interrupted downloads can resume.
+        The caller must close the returned response.
+
+        Raises:
+            SnapshotError: If Qdrant answers with anything but 200/206
+        """
+        headers: dict[str, str] = {}
+        if range_header:
+            headers["Range"] = range_header
+            if if_range:
+                headers["If-Range"] = if_range
+        req = self.http.build_request(
+            "GET", f"/collections/{collection}/snapshots/{name}", headers=headers, timeout=None
+        )
+        r = await self.http.send(req, stream=True)
+        if r.status_code not in (200, 206):
+            try:
+                await r.aread()
+                raise SnapshotError(r.status_code, r.text)
+            finally:
+                await r.aclose()
+        return r
+
+    async def upload_snapshot(
+        self,
+        collection: str,
+        path: Path,
+        on_progress: Callable[[int], None] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Restore a collection by uploading a local snapshot file (multipart)
+
+        The file is streamed from disk with reads off the event loop.
+
+        Args:
+            collection: Target collection
+            path: Snapshot file, sent under its own name
+            on_progress: Called with the running byte count as the file is sent
+
+        Raises:
+            SnapshotError: If Qdrant rejects the snapshot
+        """
+        res, _ = await self.upload_snapshot_stream(
+            collection, read_file_chunks(path), on_progress=on_progress, filename=path.name
+        )
+        return res
+
+    async def upload_snapshot_stream(
+        self,
+        collection: str,
+        chunks: AsyncIterator[bytes],
+        checksum: str | None = None,
+        on_progress: Callable[[int], None] | None = None,
+        filename: str | None = None,
+    ) -> tuple[dict[str, Any], str]:
+        """
+        Restore a collection by piping snapshot bytes straight to Qdrant
+
+        The SHA-256 is computed while streaming. With a checksum, Qdrant
+        verifies it too, and a mismatch aborts the upload before the closing
+        boundary is sent, so Qdrant never sees a complete file.
+
+        Args:
+            collection: Target collection
+            chunks: Snapshot bytes in order
+            checksum: Expected hex SHA-256 (optional)
+            on_progress: Called with the running byte count after each chunk
+            filename: Name sent in the multipart part (default <collection>.snapshot)
+
+        Returns:
+            Qdrant response and the computed hex SHA-256
+
+        Raises:
+            ChecksumMismatch: If the streamed bytes don't match checksum
+            SnapshotError: If Qdrant rejects the snapshot
+        """
+        content_type, head, tail = _multipart_envelope("snapshot", filename or f"{collection}.snapshot")
+        digest = hashlib.sha256()
+
+        async def body() -> AsyncIterator[bytes]:
+            sent = 0
+            yield head
+            async for chunk in chunks:
+                digest.update(chunk)
+                sent += len(chunk)
+                if on_progress is not None:
+                    on_progress(sent)
+                yield chunk
+            if checksum and digest.hexdigest() != checksum.lower():
+                raise ChecksumMismatch(checksum.lower(), digest.hexdigest())
+            yield tail
+
+        params = {"checksum": checksum.lower()} if checksum else None
+        r = await self.http.post(
+            f"/collections/{collection}/snapshots/upload",
+            headers={"Content-Type": content_type},
+            params=params,
+            content=body(),
+            timeout=None,
+        )
+        res = _check(r, (200, 202))
+        logger.info(
+            "Snapshot streamed",
+            extra={"collection": collection, "sha256": digest.hexdigest()}
+        )
+        return res, digest.hexdigest()
+
+    async def collection_status(self, collection: str) -> dict[str, Any]:
+        """Status and point count of a collection ("missing" while it doesn't exist)"""
+        r = await self.http.get(f"/collections/{collection}")
+        if r.status_code == 404:
+            return {"status": "missing"}
+        result = _check(r).get("result") or {}
+        return {
+            "status": result.get("status", "unknown"),
+            "optimizer_status": result.get("optimizer_status"),
+            "points_count": result.get("points_count"),
+        }
+
+    async def recover_from_location(
+        self,
+        collection: str,
+        location: str,
+        priority: str | None = None,
+        checksum: str | None = None,
+        on_status: Callable[[dict[str, Any]], None] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Restore a collection from a snapshot Qdrant can read itself
+
+        Qdrant loads the file directly, so nothing crosses the network.
+        While the (blocking) recover call runs, the collection status is
+        polled and handed to on_status.
+
+        Args:
+            collection: Target collection
+            location: URI Qdrant resolves (file:// or http(s)://)
+            priority: Qdrant recover priority (replica/snapshot/no_sync)
+            checksum: Expected hex SHA-256 of the snapshot
+            on_status: Called with each polled collection status
+
+        Raises:
+            SnapshotError: If Qdrant rejects the recover
+        """
+        body: dict[str, Any] = {"location": location}
+        if priority:
+            body["priority"] = priority
+        if checksum:
+            body["checksum"] = checksum.lower()
+        recover = asyncio.create_task(self.http.put(
+            f"/collections/{collection}/snapshots/recover",
+            params={"wait": "true"},
+            json=body,
+            timeout=None,
+        ))
+        try:
+            while True:
+                done, _ = await asyncio.wait({recover}, timeout=_RECOVER_POLL_INTERVAL)
+                if done:
+                    break
+                if on_status is not None:
+                    try:
+                        on_status(await self.collection_status(collection))
+                    except Exception as e:
+                        # Polling is best effort; the recover call decides the outcome
+                        logger.debug("Recover status poll failed", extra={"collection": collection, "error": str(e)})
+        finally:
+            if not recover.done():
+                recover.cancel()
+        res = _check(recover.result(), (200, 202))
+        if on_status is not None:
+            on_status(await self.collection_status(collection))
+        logger.info("Snapshot recovered", extra={"collection": collection, "location": location})
+        return res
@@ -0,0 +1,349 @@
+"""
+Chunked Snapshot Uploads
+Resumable initiate → PUT chunk → finalize protocol for large snapshot files
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from ..core.config import Settings
+from ..core.logging import get_logger
+from ..schemas.snapshots import InitiateUploadRequest
+
+logger = get_logger(__name__)
+settings = Settings()
+
+
+class UploadError(ValueError):
+    """Chunk or finalize request that doesn't fit the upload session"""
+
+
+def _preallocate(path: Path, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                # Filesystems without fallocate support (e.g. some overlays)
+                pass
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _pwrite(path: Path, data: bytes, offset: int) -> None:
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(fd, view, offset)
+            view = view[n:]
+            offset += n
+    finally:
+        os.close(fd)
+
+
+def _sha256_file(path: Path, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ChunkedUploadStore:
+    """
+    Upload sessions backed by a preallocated file plus a JSON manifest
+
+    Chunks may arrive in any order (and in parallel, on any worker); each is
+    verified against its SHA-256 and written in place with pwrite. Manifest
+    updates are read-modify-write under an flock on `<id>.lock`, and the
+    manifest is persisted after every chunk, so a client can ask which
+    chunks the server already has and resume after a dropped connection or
+    an API restart.
+
+    finalize() hands the file to a restore but keeps the session; complete()
+    removes it once the restore succeeded and release() reopens it for
+    another finalize if it failed. Sessions idle for `snapshot_upload_ttl`
+    seconds are swept.
+    """
+
+    def __init__(self, directory: Path | None = None) -> None:
+        self.directory = directory or settings.snapshot_upload_dir
+        self._sweep_task: asyncio.Task[None] | None = None
+
+    def _paths(self, upload_id: str) -> tuple[Path, Path]:
+        try:
+            # Upload ids are UUIDs; this also keeps user input out of path traversal
+            upload_id = str(uuid.UUID(upload_id))
+        except ValueError:
+            raise KeyError(upload_id)
+        return self.directory / f"{upload_id}.part", self.directory / f"{upload_id}.json"
+
+    @contextlib.contextmanager
+    def _locked(self, upload_id: str) -> Iterator[None]:
+        """Exclusive flock for one session (across threads and worker processes)"""
+        _, manifest = self._paths(upload_id)
+        fd = os.open(manifest.with_suffix(".lock"), os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _write_manifest(self, upload_id: str, data: str) -> None:
+        _, path = self._paths(upload_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _load_manifest(self, upload_id: str) -> dict[str, Any]:
+        _, path = self._paths(upload_id)
+        if not path.exists():
+            raise KeyError(upload_id)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _update_manifest(self, upload_id: str, change: Callable[[dict[str, Any]], None]) -> dict[str, Any]:
+        """Apply `change` to the manifest under the session lock and persist it"""
+        with self._locked(upload_id):
+            m = self._load_manifest(upload_id)
+            change(m)
+            self._write_manifest(upload_id, json.dumps(m))
+            return m
+
+    def _remove(self, upload_id: str) -> None:
+        part, manifest = self._paths(upload_id)
+        with self._locked(upload_id):
+            manifest.unlink(missing_ok=True)
+            part.unlink(missing_ok=True)
+        manifest.with_suffix(".lock").unlink(missing_ok=True)
+
+    @staticmethod
+    def _summary(m: dict[str, Any]) -> dict[str, Any]:
+        received = sorted(int(i) for i in m["chunks"])
+        return {
+            "upload_id": m["upload_id"],
+            "collection": m["collection"],
+            "cluster": m.get("cluster"),
+            "filename": m["filename"],
+            "total_size": m["total_size"],
+            "chunk_size": m["chunk_size"],
+            "total_chunks": m["total_chunks"],
+            "received": received,
+            "missing": m["total_chunks"] - len(received),
+            "finalizing": bool(m.get("finalizing")),
+        }
+
+    async def initiate(
+        self, collection: str, request: InitiateUploadRequest, cluster: str | None = None
+    ) -> dict[str, Any]:
+        """
+        Create an upload session and preallocate its file
+
+        The target cluster is recorded so finalize restores to the same one.
+
+        Raises:
+            UploadError: If chunk_size exceeds the configured maximum
+        """
+        if request.chunk_size > settings.snapshot_upload_max_chunk:
+            raise UploadError(f"chunk_size exceeds {settings.snapshot_upload_max_chunk} bytes")
+        upload_id = str(uuid.uuid4())
+        part, _ = self._paths(upload_id)
+        manifest = {
+            "upload_id": upload_id,
+            "collection": collection,
+            "cluster": cluster,
+            "filename": request.filename,
+            "total_size": request.total_size,
+            "chunk_size": request.chunk_size,
+            "total_chunks": math.ceil(request.total_size / request.chunk_size),
+            "sha256": request.sha256.lower() if request.sha256 else None,
+            "chunks": {},
+            "created_at": time.time(),
+        }
+
+        def create() -> None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _preallocate(part, request.total_size)
+            self._write_manifest(upload_id, json.dumps(manifest))
+
+        await asyncio.to_thread(create)
+        logger.info(
+            "Chunked upload initiated",
+            extra={"collection": collection, "upload_id": upload_id, "total_size": request.total_size}
+        )
+        return self._summary(manifest)
+
+    async def status(self, upload_id: str) -> dict[str, Any]:
+        """
+        Chunks received so far
+
+        Raises:
+            KeyError: Unknown upload
+        """
+        return self._summary(await asyncio.to_thread(self._load_manifest, upload_id))
+
+    async def put_chunk(self, upload_id: str, index: int, offset: int, data: bytes, checksum: str) -> dict[str, Any]:
+        """
+        Verify a chunk and write it at its offset
+
+        Re-sending a chunk that is already stored is a no-op, so clients can
+        retry blindly.
+
+        Raises:
+            KeyError: Unknown upload
+            UploadError: Bad index/offset/length, checksum mismatch, or the
+                upload is being restored
+        """
+        m = await asyncio.to_thread(self._load_manifest, upload_id)
+        if m.get("finalizing"):
+            raise UploadError("Upload is being restored")
+        if not 0 <= index < m["total_chunks"]:
+            raise UploadError(f"Chunk index out of range: {index}")
+        expected_offset = index * m["chunk_size"]
+        if offset != expected_offset:
+            raise UploadError(f"Chunk {index} must start at offset {expected_offset}")
+        expected_len = min(m["chunk_size"], m["total_size"] - expected_offset)
+        if len(data) != expected_len:
+            raise UploadError(f"Chunk {index} must be {expected_len} bytes, got {len(data)}")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != checksum.lower():
+            raise UploadError(f"Chunk {index} checksum mismatch")
+
+        if m["chunks"].get(str(index)) != digest:
+            part, _ = self._paths(upload_id)
+            await asyncio.to_thread(_pwrite, part, data, offset)
+
+            def record(m: dict[str, Any]) -> None:
+                if m.get("finalizing"):
+                    raise UploadError("Upload is being restored")
+                m["chunks"][str(index)] = digest
+
+            # Parallel chunks (possibly on other workers) update the same manifest
+            m = await asyncio.to_thread(self._update_manifest, upload_id, record)
+        return self._summary(m)
+
+    async def finalize(self, upload_id: str) -> tuple[dict[str, Any], Path]:
+        """
+        Check the upload is complete and hand over the assembled file
+
+        The session stays (marked finalizing) until complete() or release(),
+        so a failed restore can be retried without uploading again.
+
+        Raises:
+            KeyError: Unknown upload
+            UploadError: Missing chunks, whole-file checksum mismatch, or
+                already finalizing
+        """
+        def claim(m: dict[str, Any]) -> None:
+            if m.get("finalizing"):
+                raise UploadError("Upload is already being restored")
+            missing = self._summary(m)["missing"]
+            if missing:
+                raise UploadError(f"{missing} chunk(s) missing")
+            m["finalizing"] = True
+
+        m = await asyncio.to_thread(self._update_manifest, upload_id, claim)
+        part, _ = self._paths(upload_id)
+        if m["sha256"]:
+            actual = await asyncio.to_thread(_sha256_file, part, settings.snapshot_chunk_size)
+            if actual != m["sha256"]:
+                await self.release(upload_id)
+                raise UploadError(f"Checksum mismatch: expected {m['sha256']}, got {actual}")
+        return self._summary(m), part
+
+    async def complete(self, upload_id: str) -> None:
+        """Remove a session whose restore succeeded"""
+        await asyncio.to_thread(self._remove, upload_id)
+
+    async def release(self, upload_id: str) -> None:
+        """Reopen a finalized session (restore failed) so it can be finalized again"""
+        def reopen(m: dict[str, Any]) -> None:
+            m["finalizing"] = False
+
+        try:
+            await asyncio.to_thread(self._update_manifest, upload_id, reopen)
+        except KeyError:
+            pass
+
+    async def abort(self, upload_id: str) -> None:
+        """
+        Drop an upload session and its partial file
+
+        Raises:
+            KeyError: Unknown upload
+        """
+        _, manifest = self._paths(upload_id)
+        if not manifest.exists():
+            raise KeyError(upload_id)
+        await asyncio.to_thread(self._remove, upload_id)
+
+    # Expiry of abandoned sessions
+
+    def sweep(self, max_age: float) -> int:
+        """
+        Remove sessions (and stray part/lock/tmp files) untouched for max_age seconds
+
+        Returns:
+            Number of sessions removed
+        """
+        if not self.directory.is_dir():
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.directory.iterdir():
+            if path.suffix not in (".json", ".part", ".lock", ".tmp"):
+                continue
+            try:
+                # A session is as old as its newest file (chunks touch the part file)
+                stamps = [p.stat().st_mtime for p in (path.with_suffix(".json"), path.with_suffix(".part")) if p.exists()]
+            except FileNotFoundError:
+                continue
+            if stamps and max(stamps) >= cutoff:
+                continue
+            if path.suffix == ".json":
+                try:
+                    self._remove(path.stem)
+                except KeyError:
+                    continue
+                removed += 1
+            elif not stamps or path.suffix == ".part":
+                path.unlink(missing_ok=True)
+        if removed:
+            logger.info("Expired chunked uploads removed", extra={"removed": removed, "max_age": max_age})
+        return removed
+
+    async def _sweep_loop(self, max_age: float, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep, max_age)
+            except Exception as e:
+                logger.warning("Chunked upload sweep failed", extra={"error": str(e)})
+            await asyncio.sleep(interval)
+
+    def start_sweep(self, max_age: float) -> None:
+        """Periodically expire abandoned sessions (max_age 0 disables)"""
+        if max_age > 0 and self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop(max_age, min(max_age / 4, 3600.0)))
+
+    async def stop_sweep(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            await asyncio.gather(self._sweep_task, return_exceptions=True)
+            self._sweep_task = None
+
+
+# Global store
+upload_store = ChunkedUploadStore()
@@ -0,0 +1,187 @@
+"""
+Stats Service
+Aggregates per-collection statistics for the dashboard
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from qdrant_client import AsyncQdrantClient
+
+from ..core.cache import TTLCache
+from ..core.config import Settings
+from ..core.logging import get_logger
+from ..qdrant.clusters import ClusterRegistry
+from .metadata import CollectionMetadataCache, cluster_metadata_cache, metadata_cache
+
+logger = get_logger(__name__)
+settings = Settings()
+
+# float32 storage for original vectors
+_BYTES_PER_DIM = 4
+# Level-0 HNSW links are ~2*m point ids of 4 bytes each
+_LINK_BYTES = 4
+_DEFAULT_HNSW_M = 16
+
+# Global aggregate cache (one entry per cluster): many dashboard viewers share one Qdrant sweep
+_stats_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    ttl=settings.stats_cache_ttl, maxsize=1 + len(settings.qdrant_clusters)
+)
+
+
+def _enum_value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def _vector_params(info: Any) -> list[Any]:
+    vectors = info.config.params.vectors
+    if isinstance(vectors, dict):
+        return list(vectors.values())
+    return [vectors] if vectors is not None else []
+
+
+def estimate_usage(info: Any) -> dict[str, int]:
+    """
+    Rough RAM/disk footprint of a collection from its config and counts
+
+    Original vectors are always persisted; they live in RAM unless on_disk.
+    Scalar-quantized copies (1 byte/dim) stay in RAM when always_ram is set.
+    The HNSW graph is estimated from m and the indexed vector count.
+    """
+    points = int(getattr(info, "points_count", 0) or 0)
+    indexed = int(getattr(info, "indexed_vectors_count", 0) or 0)
+    hnsw = getattr(info.config, "hnsw_config", None)
+    m = int(getattr(hnsw, "m", None) or _DEFAULT_HNSW_M)
+    collection_quant = getattr(info.config, "quantization_config", None)
+
+    ram = 0
+    disk = 0
+    for params in _vector_params(info):
+        dims = int(getattr(params, "size", 0) or 0)
+        raw = points * dims * _BYTES_PER_DIM
+        disk += raw
+        if not getattr(params, "on_disk", False):
+            ram += raw
+        quant = getattr(params, "quantization_config", None) or collection_quant
+        scalar = getattr(quant, "scalar", None)
+        if scalar is not None:
+            quantized = points * dims
+            disk += quantized
+            if getattr(scalar, "always_ram", False):
+                ram += quantized
+
+    graph = indexed * 2 * m * _LINK_BYTES
+    disk += graph
+    if not getattr(hnsw, "on_disk", False):
+        ram += graph
+    return {"ram_bytes_estimate": ram, "disk_bytes_estimate": disk}
+
+
+def collection_stats(name: str, info: Any) -> dict[str, Any]:
+    """Flatten a Qdrant CollectionInfo into the dashboard item shape"""
+    points = int(getattr(info, "points_count", 0) or 0)
+    vectors = int(getattr(info, "vectors_count", 0) or 0)
+    indexed = int(getattr(info, "indexed_vectors_count", 0) or 0)
+    optimizer = _enum_value(getattr(info, "optimizer_status", "ok"))
+    item: dict[str, Any] = {
+        "name": name,
+        "points_count": points,
+        "vectors_count": vectors,
+        "indexed_vectors_count": indexed,
+        "segments_count": int(getattr(info, "segments_count", 0) or 0),
+        "status": str(_enum_value(getattr(info, "status", "unknown"))),
+        "optimizer_status": optimizer if isinstance(optimizer, str) else str(getattr(optimizer, "error", optimizer)),
+        "indexing": str(_enum_value(getattr(info, "status", ""))) == "yellow",
+    }
+    item.update(estimate_usage(info))
+    return item
+
+
+class StatsService:
+    """Service for cluster-wide collection statistics"""
+
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        cache: CollectionMetadataCache | None = None,
+        cluster: str | None = None,
+    ):
+        self.client = client
+        self.cache = cache or metadata_cache
+        self.cluster = cluster or settings.qdrant_cluster_name
+
+    async def get_stats(self) -> dict[str, Any]:
+        """
+        Aggregate stats across all collections (cached for stats_cache_ttl)
+
+        Returns:
+            Dictionary with totals and per-collection items
+        """
+        return await _stats_cache.get_or_load(self.cluster, self._collect)
+
+    async def _collect(self) -> dict[str, Any]:
+        names = await self.cache.list_names(self.client)
+        sem = asyncio.Semaphore(settings.stats_concurrency)
+
+        async def one(name: str) -> dict[str, Any]:
+            async with sem:
+                try:
+                    info = await self.client.get_collection(name)
+                except Exception as e:
+                    # Collection may have been dropped mid-sweep
+                    logger.warning("Stats lookup failed", extra={"collection": name, "error": str(e)})
+                    return {"name": name, "error": str(e)}
+            return collection_stats(name, info)
+
+        items = await asyncio.gather(*(one(n) for n in names))
+
+        totals = {"total_points": 0, "total_segments": 0, "ram_bytes_estimate": 0, "disk_bytes_estimate": 0}
+        for item in items:
+            totals["total_points"] += item.get("points_count", 0)
+            totals["total_segments"] += item.get("segments_count", 0)
+            totals["ram_bytes_estimate"] += item.get("ram_bytes_estimate", 0)
+            totals["disk_bytes_estimate"] += item.get("disk_bytes_estimate", 0)
+
+        logger.info("Stats aggregated", extra={"collections": len(items), **totals})
+        return {
+            "collections": len(items),
+            **totals,
+            "indexing": [i["name"] for i in items if i.get("indexing")],
+            "items": items,
+        }
+
+
+_TOTAL_KEYS = ("collections", "total_points", "total_segments", "ram_bytes_estimate", "disk_bytes_estimate")
+
+
+async def cross_cluster_stats(registry: ClusterRegistry) -> dict[str, Any]:
+    """
+    Aggregate stats of every cluster, queried concurrently
+
+    Each cluster's sweep is the (cached) StatsService one; a cluster that is
+    down is reported with its error instead of failing the whole view.
+
+    Returns:
+        Dictionary with grand totals, per-cluster stats and failed clusters
+    """
+    async def one(name: str) -> dict[str, Any]:
+        client = await registry.client(name)
+        return await StatsService(client, cluster_metadata_cache(name), name).get_stats()
+
+    names = registry.names()
+    results = await asyncio.gather(*(one(n) for n in names), return_exceptions=True)
+
+    totals = dict.fromkeys(_TOTAL_KEYS, 0)
+    items: list[dict[str, Any]] = []
+    failed: list[str] = []
+    for name, res in zip(names, results):
+        if isinstance(res, BaseException):
+            logger.warning("Cluster stats failed", extra={"cluster": name, "error": str(res)})
+            failed.append(name)
+            items.append({"cluster": name, "error": str(res) or type(res).__name__})
+            continue
+        for key in _TOTAL_KEYS:
+            totals[key] += res.get(key, 0)
+        items.append({"cluster": name, **{k: v for k, v in res.items() if k != "items"}})
+    return {"clusters": len(names), **totals, "failed": failed, "items": items}
@@ -9,16 +9,55 @@ from typing import Any
 from qdrant_client import AsyncQdrantClient, models as qm
 
 from ..core.logging import get_logger
-from ..schemas.vectors import DeleteRequest, InsertVectorsRequest, SearchRequest
+from ..schemas.vectors import DeleteRequest, InsertVectorsRequest, SearchRequest, vector_dims
+from .metadata import DEFAULT_VECTOR, CollectionMeta, CollectionMetadataCache, metadata_cache
 
 logger = get_logger(__name__)
 
 
+class VectorDimensionError(ValueError):
+    """Raised when request vectors do not match the collection's vector params"""
+
+
+def check_vectors_against_schema(meta: CollectionMeta, request: InsertVectorsRequest) -> None:
+    """
+    Validate vector names and dimensions against the collection schema
+
+    Args:
+        meta: Cached collection metadata
+        request: Insert request (already internally consistent)
+
+    Raises:
+        VectorDimensionError: On unknown vector names or wrong dimensions
+    """
+    expected = meta.vectors
+    unnamed = DEFAULT_VECTOR in expected
+    for i, point in enumerate(request.points):
+        if unnamed and isinstance(point.vector, dict):
+            raise VectorDimensionError(
+                f"Point {i}: collection '{meta.name}' has a single unnamed vector, got named vectors"
+            )
+        if not unnamed and not isinstance(point.vector, dict):
+            raise VectorDimensionError(
+                f"Point {i}: collection '{meta.name}' expects named vectors: {', '.join(sorted(expected))}"
+            )
+        for name, dim in vector_dims(point.vector).items():
+            if name not in expected:
+                raise VectorDimensionError(f"Point {i}: unknown vector name '{name}'")
+            if dim != expected[name]:
+                label = f" '{name}'" if name else ""
+                raise VectorDimensionError(
+                    f"Point {i}: vector{label} has dimension {dim}, "
+                    f"collection '{meta.name}' expects {expected[name]}"
+                )
+
+
 class VectorService:
     """Service for managing vectors in Qdrant"""
 
-    def __init__(self, client: AsyncQdrantClient):
+    def __init__(self, client: AsyncQdrantClient, cache: CollectionMetadataCache | None = None):
         self.client = client
+        self.cache = cache or metadata_cache
 
     async def insert_vectors(self, request: InsertVectorsRequest) -> dict[str, int]:
         """
@@ -31,8 +70,16 @@ class VectorService:
             Dictionary with number of inserted vectors
 
         Raises:
+            VectorDimensionError: If vectors don't match the collection schema
             Exception: If insertion fails
         """
+        # Aliases are resolved by Qdrant (atomically with swaps); caches are keyed by the requested name
+        collection = request.collection
+
+        # Reject mismatches before building points (schema is usually cached)
+        meta = await self.cache.schema(self.client, collection)
+        check_vectors_against_schema(meta, request)
+
         # Convert schema to Qdrant points
         points = [
             qm.PointStruct(
@@ -45,17 +92,18 @@ class VectorService:
 
         # Perform upsert
         await self.client.upsert(
-            collection_name=request.collection,
+            collection_name=collection,
             points=points,
             wait=True
         )
+        self.cache.invalidate_counts(collection)
 
         logger.info(
             "Vectors inserted",
             extra={
                 "collection": request.collection,
                 "count": len(points),
-                "dimension": len(request.points[0].vector) if request.points else 0
+                "dimension": meta.vector_size
             }
         )
 
@@ -71,8 +119,9 @@ class VectorService:
         Returns:
             Dictionary with search results
         """
+        collection = request.collection
         results = await self.client.search(
-            collection_name=request.collection,
+            collection_name=collection,
             query_vector=request.vector,
             limit=request.limit,
             with_payload=request.with_payload
@@ -109,10 +158,12 @@ class VectorService:
         Returns:
             Dictionary with number of deleted vectors
         """
+        collection = request.collection
         await self.client.delete(
-            collection_name=request.collection,
+            collection_name=collection,
             points_selector=qm.PointIdsList(points=request.ids)
         )
+        self.cache.invalidate_counts(collection)
 
         logger.info(
             "Vectors deleted",
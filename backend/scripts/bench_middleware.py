@@ -0,0 +1,170 @@
+"""
+Benchmark the middleware stack: current (pure ASGI) vs a baseline revision
+
+Builds the same app twice, once with app/core/middleware.py from the working
+tree and once with the file from a git revision (default: the last one with
+BaseHTTPMiddleware), and drives both in-process over httpx.ASGITransport.
+Qdrant is stubbed out, so the numbers are framework + middleware overhead.
+
+Usage:
+    python scripts/bench_middleware.py
+    python scripts/bench_middleware.py --requests 5000 --concurrency 64
+    python scripts/bench_middleware.py --baseline-rev v0.1.0
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.core import middleware as current_middleware  # noqa: E402
+from app.routes import vectors as vectors_routes  # noqa: E402
+from app.routes.deps import require_auth  # noqa: E402
+
+# Last revision whose middlewares subclass BaseHTTPMiddleware
+DEFAULT_BASELINE_REV = "240ca14"
+_CSRF = "bench-csrf-token"
+
+
+def _pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def load_baseline(rev: str) -> ModuleType:
+    """Import app/core/middleware.py as of `rev` (relative imports resolve against app.core)"""
+    source = subprocess.run(
+        ["git", "show", f"{rev}:backend/app/core/middleware.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    spec = importlib.util.spec_from_loader("app.core._middleware_baseline", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = "app.core"
+    exec(compile(source, f"{rev}:middleware.py", "exec"), module.__dict__)
+    return module
+
+
+class _StubVectorService:
+    """Canned search results in the shape VectorService returns"""
+
+    def __init__(self, hits: int) -> None:
+        self.result = {
+            "results": [
+                {"id": str(i), "score": 1.0 - i / 100, "payload": {"title": f"doc {i}", "tags": ["a", "b"]}}
+                for i in range(hits)
+            ]
+        }
+
+    async def search_vectors(self, request: Any) -> dict[str, Any]:
+        return self.result
+
+
+def build_app(mw: ModuleType, audit_path: Path, hits: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    def health() -> dict[str, str]:
+        return {"status": "ok"}
+
+    app.include_router(vectors_routes.router, prefix="/api")
+    service = _StubVectorService(hits)
+    app.dependency_overrides[vectors_routes.get_vector_service] = lambda: service
+    app.dependency_overrides[require_auth] = lambda: "bench"
+
+    # Same order as app.main
+    app.add_middleware(mw.RequestIDMiddleware)
+    app.add_middleware(mw.BodySizeLimitMiddleware, max_bytes=1_048_576, exempt_routes=("POST /api/snapshots/{collection}/restore",))
+    app.add_middleware(mw.RateLimitMiddleware, per_minute=10**9)
+    app.add_middleware(mw.CSRFMiddleware)
+    app.add_middleware(mw.AuditLogMiddleware, path=audit_path)
+    return app
+
+
+async def _request(http: httpx.AsyncClient, endpoint: str, body: dict[str, Any]) -> None:
+    if endpoint == "health":
+        r = await http.get("/health")
+    else:
+        r = await http.post("/api/vectors/search", json=body, headers={"X-CSRF-Token": _CSRF})
+    r.raise_for_status()
+
+
+async def bench(app: FastAPI, endpoint: str, args: argparse.Namespace) -> dict[str, float]:
+    body = {"collection": "bench", "vector": [0.1] * args.dim, "limit": args.hits}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        http.cookies.set("csrf_token", _CSRF)
+        for _ in range(args.warmup):
+            await _request(http, endpoint, body)
+
+        # Latency: one request at a time
+        latencies = []
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            await _request(http, endpoint, body)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        # Throughput: `concurrency` requests in flight
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one() -> None:
+            async with sem:
+                await _request(http, endpoint, body)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": _pct(latencies, 0.99),
+        "req_per_s": args.requests / elapsed,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline-rev", default=DEFAULT_BASELINE_REV)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--dim", type=int, default=768, help="Search vector dimension")
+    parser.add_argument("--hits", type=int, default=10)
+    args = parser.parse_args()
+
+    # Per-request INFO logs would dominate the measurement
+    logging.disable(logging.INFO)
+    stacks = {"baseline": load_baseline(args.baseline_rev), "current": current_middleware}
+    results: dict[tuple[str, str], dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, mw in stacks.items():
+            app = build_app(mw, Path(tmp) / f"audit-{name}.log", args.hits)
+            for endpoint in ("health", "search"):
+                results[(name, endpoint)] = await bench(app, endpoint, args)
+
+    print(f"{'stack':<10} {'endpoint':<8} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for (name, endpoint), r in results.items():
+        print(f"{name:<10} {endpoint:<8} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['req_per_s']:>9.0f}")
+    for endpoint in ("health", "search"):
+        before, after = results[("baseline", endpoint)], results[("current", endpoint)]
+        print(
+            f"{endpoint}: p50 {100 * (after['p50_ms'] / before['p50_ms'] - 1):+.1f}%, "
+            f"throughput {100 * (after['req_per_s'] / before['req_per_s'] - 1):+.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark Qdrant transports: REST vs gRPC vs gzip-compressed gRPC
+
+Inserts random vectors in batches and runs searches against a throwaway
+collection per transport, then prints throughput and latency percentiles.
+
+Usage:
+    python scripts/bench_qdrant_transports.py --dim 768 --points 20000
+    python scripts/bench_qdrant_transports.py --host qdrant --api-key "$QDRANT_API_KEY" --modes grpc grpc-gzip
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import grpc
+from qdrant_client import AsyncQdrantClient, models as qm
+
+MODES = {
+    "rest": {"prefer_grpc": False},
+    "grpc": {"prefer_grpc": True},
+    "grpc-gzip": {"prefer_grpc": True, "grpc_compression": grpc.Compression.Gzip},
+}
+
+
+def _vectors(n: int, dim: int, rng: random.Random) -> list[list[float]]:
+    return [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(n)]
+
+
+def _pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def bench_mode(mode: str, args: argparse.Namespace) -> dict[str, float]:
+    rng = random.Random(args.seed)
+    client = AsyncQdrantClient(
+        host=args.host,
+        port=args.port,
+        grpc_port=args.grpc_port,
+        api_key=args.api_key or None,
+        https=args.https,
+        timeout=60,
+        grpc_options={
+            "grpc.max_send_message_length": 256 * 1024 * 1024,
+            "grpc.max_receive_message_length": 256 * 1024 * 1024,
+        },
+        **MODES[mode],
+    )
+    name = f"qv_bench_{mode.replace('-', '_')}_{uuid.uuid4().hex[:8]}"
+    await client.create_collection(name, vectors_config=qm.VectorParams(size=args.dim, distance=qm.Distance.COSINE))
+    try:
+        # Insert
+        start = time.perf_counter()
+        for offset in range(0, args.points, args.batch):
+            n = min(args.batch, args.points - offset)
+            points = [
+                qm.PointStruct(id=offset + i, vector=v, payload={"i": offset + i, "tag": f"t{(offset + i) % 10}"})
+                for i, v in enumerate(_vectors(n, args.dim, rng))
+            ]
+            await client.upsert(name, points=points, wait=True)
+        insert_s = time.perf_counter() - start
+
+        # Search (sequential, so latencies aren't queueing behind each other)
+        queries = _vectors(args.searches, args.dim, rng)
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            await client.search(name, query_vector=q, limit=args.limit, with_payload=True)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return {
+            "insert_points_per_s": args.points / insert_s,
+            "search_p50_ms": statistics.median(latencies),
+            "search_p95_ms": _pct(latencies, 0.95),
+            "search_p99_ms": _pct(latencies, 0.99),
+        }
+    finally:
+        await client.delete_collection(name)
+        await client.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--https", action="store_true")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--dim", type=int, default=768, help="Vector dimension")
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=256, help="Points per upsert")
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10, help="Search top-k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"dim={args.dim} points={args.points} batch={args.batch} searches={args.searches}")
+    print(f"{'mode':<10} {'insert pts/s':>13} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes:
+        r = await bench_mode(mode, args)
+        print(
+            f"{mode:<10} {r['insert_points_per_s']:>13.0f} {r['search_p50_ms']:>8.2f} "
+            f"{r['search_p95_ms']:>8.2f} {r['search_p99_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Tests for the queued audit log writer
+"""
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+
+from app.core.audit import AuditWriter
+
+
+def _lines(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_writes_are_batched_and_flushed_on_close(tmp_path):
+    path = tmp_path / "logs" / "audit.log"
+    writer = AuditWriter(path, batch_size=4)
+    for i in range(10):
+        assert writer.write({"i": i})
+    writer.close()
+    assert [e["i"] for e in _lines(path)] == list(range(10))
+
+    # A write after close restarts the thread
+    writer.write({"i": 10})
+    writer.close()
+    assert _lines(path)[-1] == {"i": 10}
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    writer = AuditWriter(tmp_path / "audit.log", max_queue=2)
+    # Keep the writer thread from draining while the queue fills
+    release = threading.Event()
+    writer._thread = threading.Thread(target=release.wait, daemon=True)
+    writer._thread.start()
+    before = REGISTRY.get_sample_value("quietvector_audit_dropped_total") or 0.0
+    results = [writer.write({"i": i}) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    assert REGISTRY.get_sample_value("quietvector_audit_dropped_total") == before + 3
+    assert writer.depth() == 2
+    release.set()
+
+
+def test_rotates_by_size_and_compresses(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, batch_size=1, max_bytes=200, backups=2)
+    for i in range(30):
+        writer.write({"i": i, "pad": "x" * 40})
+        # One entry per batch so every batch gets a rotation check
+        time.sleep(0.002)
+    writer.close()
+
+    rotated = sorted(tmp_path.glob("audit.log.*"))
+    assert 1 <= len(rotated) <= 2
+    assert all(p.suffix == ".gz" for p in rotated)
+    assert path.stat().st_size <= 200
+    newest_rotated = [json.loads(line) for line in gzip.open(rotated[-1], "rt")]
+    assert newest_rotated[-1]["i"] < _lines(path)[0]["i"]
+
+
+def test_reopens_after_external_rotation(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, batch_size=1)
+    writer.write({"i": 0})
+    deadline = time.time() + 2
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    path.rename(tmp_path / "audit.log.1")
+    writer.write({"i": 1})
+    writer.close()
+    assert _lines(path) == [{"i": 1}]
+    assert _lines(tmp_path / "audit.log.1") == [{"i": 0}]
+
+
+def test_writer_survives_errors_and_restarts(tmp_path, monkeypatch):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, fsync_interval=0.01)
+    failures = []
+
+    def fail_once(force=False):
+        if not failures:
+            failures.append(force)
+            raise OSError("fsync failed")
+
+    writer.write({"i": 0})
+    deadline = time.time() + 2
+    while not (path.exists() and path.read_text()) and time.time() < deadline:
+        time.sleep(0.01)
+    # Fails on the idle path, outside _write_batch's guard
+    monkeypatch.setattr(writer, "_sync_if_due", fail_once)
+    while not failures and time.time() < deadline:
+        time.sleep(0.01)
+    writer.write({"i": 1})
+    writer.close()
+    assert failures
+    assert [e["i"] for e in _lines(path)] == [0, 1]
+
+    # A thread that died anyway is replaced by the next write
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    writer._thread = dead
+    writer.write({"i": 2})
+    writer.close()
+    assert _lines(path)[-1] == {"i": 2}
+
+
+def test_rotation_tolerates_another_worker_rotating_first(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, compress=False)
+    f = writer._ensure_open()
+    f.write("old\n")
+    # Another worker moves the file away and starts a new one
+    path.rename(tmp_path / "audit.log.other")
+    path.write_text("new\n")
+    writer._rotate()
+    assert path.read_text() == "new\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["audit.log", "audit.log.other"]
+
+    path.unlink()
+    writer._ensure_open()
+    path.unlink()
+    writer._rotate()
+    writer.write({"i": 0})
+    writer.close()
+    assert _lines(path) == [{"i": 0}]
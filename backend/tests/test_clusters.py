@@ -0,0 +1,111 @@
+"""
+Tests for multi-cluster support
+"""
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from pydantic import SecretStr
+
+from app.core.config import QdrantClusterConfig, Settings
+from app.qdrant import clusters as qclusters
+from app.qdrant.clusters import ClusterRegistry, UnknownClusterError
+from app.qdrant.http import ApiKeyAuth
+from app.qdrant.keys import ApiKeyProvider
+from app.services import stats_service
+from app.services.metadata import cluster_metadata_cache, metadata_cache
+from app.services.stats_service import StatsService, cross_cluster_stats
+
+
+def _registry() -> ClusterRegistry:
+    return ClusterRegistry(
+        {"us": QdrantClusterConfig(nodes="us-1:6333,us-2", primary="us-2"), "eu": QdrantClusterConfig(nodes="eu-1")},
+        "default",
+    )
+
+
+def test_cluster_config_from_env(monkeypatch):
+    monkeypatch.setenv("QDRANT_CLUSTERS", '{"us": {"nodes": "us-1:7000,us-2", "primary": "us-2"}}')
+    cfg = Settings().qdrant_clusters["us"]
+    assert cfg.get_nodes(6333) == [("us-1", 7000), ("us-2", 6333)]
+    assert cfg.get_primary(6333) == ("us-2", 6333)
+
+
+def test_registry_resolves_names():
+    registry = _registry()
+    assert registry.names() == ["default", "us", "eu"]
+    assert registry.resolve(None) == "default"
+    assert registry.resolve("eu") == "eu"
+    with pytest.raises(UnknownClusterError):
+        registry.resolve("ap")
+    with pytest.raises(ValueError):
+        ClusterRegistry({"default": QdrantClusterConfig(nodes="x")}, "default")
+
+
+@pytest.mark.asyncio
+async def test_clusters_get_their_own_lazy_pools(monkeypatch):
+    pools: dict[str, AsyncMock] = {}
+
+    async def connect(nodes, primary, api_key, cluster):
+        pools[cluster] = AsyncMock()
+        return pools[cluster]
+
+    default_pool = AsyncMock()
+    monkeypatch.setattr(qclusters, "connect_pool", connect)
+    monkeypatch.setattr(qclusters, "get_qdrant_client", AsyncMock(return_value=default_pool))
+    registry = _registry()
+
+    assert await registry.client() is default_pool
+    assert pools == {}
+    us = await registry.client("us")
+    assert await registry.client("us") is us
+    assert list(pools) == ["us"]
+    assert registry.get("us").primary == ("us-2", 6333)
+    await registry.close()
+    us.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cluster_http_sends_its_own_key():
+    seen: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("api-key"))
+        return httpx.Response(200, json={"result": []})
+
+    provider = ApiKeyProvider(None, SecretStr("us-key"))
+    async with httpx.AsyncClient(
+        base_url="http://us-1:6333", transport=httpx.MockTransport(handler), auth=ApiKeyAuth(provider)
+    ) as http:
+        await http.get("/collections")
+    assert seen == ["us-key"]
+
+
+def test_metadata_cache_per_cluster():
+    assert cluster_metadata_cache(None) is metadata_cache
+    assert cluster_metadata_cache("us") is cluster_metadata_cache("us")
+    assert cluster_metadata_cache("us") is not metadata_cache
+
+
+@pytest.mark.asyncio
+async def test_cross_cluster_stats_tolerates_failed_cluster(monkeypatch):
+    class _Registry:
+        def names(self):
+            return ["default", "us", "eu"]
+
+        async def client(self, name):
+            if name == "eu":
+                raise ConnectionError("eu down")
+            return AsyncMock()
+
+    async def fake_stats(self):
+        return {"collections": 2, "total_points": 10 if self.cluster == "us" else 5, "items": [{"name": "c"}]}
+
+    monkeypatch.setattr(StatsService, "get_stats", fake_stats)
+    stats_service._stats_cache.clear()
+    result = await cross_cluster_stats(_Registry())
+    assert result["collections"] == 4
+    assert result["total_points"] == 15
+    assert result["failed"] == ["eu"]
+    assert result["items"][2] == {"cluster": "eu", "error": "eu down"}
+    assert "items" not in result["items"][0]
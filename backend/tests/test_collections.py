@@ -179,6 +179,41 @@ def test_collections_require_auth(client: TestClient, mock_settings, mock_qdrant
     assert response.status_code == 401
 
 
+def test_unknown_cluster_checked_after_auth(client: TestClient, auth_headers, mock_settings):
+    """Unauthenticated callers cannot tell which cluster names exist"""
+    response = client.get("/api/collections", params={"cluster": "nope"})
+    assert response.status_code == 401
+
+    response = client.get("/api/collections", params={"cluster": "nope"}, headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_open_breaker_is_503_and_qdrant_errors_stay_client_errors(client: TestClient, auth_headers, mock_settings):
+    """Route error translation leaves CircuitOpenError to the global 503 handler"""
+    from unittest.mock import AsyncMock
+    from qdrant_client.http.exceptions import UnexpectedResponse
+    from app.main import app
+    from app.qdrant.resilience import CircuitOpenError
+    from app.routes.collections import get_collection_service
+
+    service = MagicMock()
+    app.dependency_overrides[get_collection_service] = lambda: service
+    try:
+        service.get_collection_info = AsyncMock(side_effect=CircuitOpenError("qdrant", 12))
+        response = client.get("/api/collections/docs", headers=auth_headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "12"
+
+        service.get_collection_info = AsyncMock(
+            side_effect=UnexpectedResponse(404, "Not Found", b"missing", MagicMock())
+        )
+        response = client.get("/api/collections/docs", headers=auth_headers)
+        assert response.status_code == 404
+        assert response.json()["detail"].startswith("Collection not found")
+    finally:
+        app.dependency_overrides.pop(get_collection_service, None)
+
+
 def test_collections_require_csrf(client: TestClient, auth_token: str, mock_settings, mock_qdrant_client):
     """Test that POST/DELETE require CSRF token"""
     # Auth but no CSRF
@@ -188,3 +223,143 @@ def test_collections_require_csrf(client: TestClient, auth_token: str, mock_sett
         json={"name": "test", "vectors_size": 128, "distance": "Cosine"}
     )
     assert response.status_code == 403  # CSRF forbidden
+
+
+@pytest.mark.asyncio
+async def test_create_text_payload_index_with_tokenizer():
+    """Text indexes pass tokenizer options through to Qdrant"""
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from qdrant_client import models as qm
+    from app.schemas.collections import CreatePayloadIndexRequest
+    from app.services.collection_service import CollectionService
+
+    client = MagicMock()
+    client.create_payload_index = AsyncMock(return_value=SimpleNamespace(status=qm.UpdateStatus.COMPLETED))
+    service = CollectionService(client)
+
+    res = await service.create_payload_index(
+        "docs",
+        CreatePayloadIndexRequest(field_name="body", field_type="text", tokenizer="multilingual", lowercase=True),
+    )
+    assert res == {"field_name": "body", "created": "completed"}
+    schema = client.create_payload_index.await_args.kwargs["field_schema"]
+    assert schema.tokenizer == qm.TokenizerType.MULTILINGUAL
+    assert schema.lowercase is True
+
+
+@pytest.mark.asyncio
+async def test_suggest_payload_indexes():
+    """Suggestions skip constant, rare and already indexed fields"""
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from app.services.collection_service import CollectionService
+
+    records = [
+        SimpleNamespace(payload={
+            "lang": ["tr", "en"][i % 2],
+            "year": 2000 + i,
+            "const": "x",
+            "meta": {"source": f"s{i % 3}"},
+            "authors": [{"name": f"a{i % 4}"}, {"name": "b"}],
+            **({"rare": 1} if i == 0 else {}),
+            "indexed": i,
+        })
+        for i in range(100)
+    ]
+    client = MagicMock()
+    client.get_collection = AsyncMock(return_value=SimpleNamespace(
+        payload_schema={"indexed": SimpleNamespace(data_type="integer", points=100, params=None)}
+    ))
+    client.scroll = AsyncMock(return_value=(records, None))
+    service = CollectionService(client)
+
+    suggestions = {s.field_name: s for s in await service.suggest_payload_indexes("docs", sample_size=100)}
+    assert set(suggestions) == {"lang", "year", "meta.source", "authors[].name"}
+    assert suggestions["lang"].field_type == "keyword"
+    assert suggestions["year"].field_type == "integer"
+    assert suggestions["lang"].distinct_values == 2
+
+
+@pytest.mark.asyncio
+async def test_swap_alias_waits_for_green_and_deletes_old(monkeypatch):
+    """Alias is repointed atomically once green; old collection dropped after grace"""
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from qdrant_client import models as qm
+    from app.core.ops import tracker
+    from app.schemas.collections import SwapAliasRequest
+    from app.services import collection_service
+    from app.services.collection_service import CollectionService
+    from app.services.metadata import CollectionMetadataCache
+
+    monkeypatch.setattr(collection_service, "_GREEN_POLL_INTERVAL", 0)
+    aliases = {"docs": "docs_v1"}
+
+    async def update_aliases(change_aliases_operations):
+        for op in change_aliases_operations:
+            if isinstance(op, qm.DeleteAliasOperation):
+                aliases.pop(op.delete_alias.alias_name)
+            else:
+                aliases[op.create_alias.alias_name] = op.create_alias.collection_name
+        return True
+
+    client = MagicMock()
+    client.get_collection = AsyncMock(side_effect=[
+        SimpleNamespace(status="yellow"), SimpleNamespace(status="green")
+    ])
+    client.get_aliases = AsyncMock(side_effect=lambda: SimpleNamespace(aliases=[
+        SimpleNamespace(alias_name=k, collection_name=v) for k, v in aliases.items()
+    ]))
+    client.update_collection_aliases = AsyncMock(side_effect=update_aliases)
+    client.delete_collection = AsyncMock(return_value=True)
+    service = CollectionService(client, cache=CollectionMetadataCache(ttl=60))
+
+    op = tracker.create("alias_swap")
+    await service.swap_alias(op.id, "docs", SwapAliasRequest(collection="docs_v2", delete_old_after=0))
+
+    assert tracker.get(op.id).stage == "completed"
+    assert aliases == {"docs": "docs_v2"}
+    # Delete + create went out in a single atomic call
+    assert client.update_collection_aliases.await_count == 1
+    client.delete_collection.assert_awaited_once_with("docs_v1")
+
+
+@pytest.mark.asyncio
+async def test_vector_search_leaves_alias_to_qdrant():
+    """Aliases go to Qdrant as-is so a swap elsewhere takes effect immediately"""
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from app.schemas.vectors import SearchRequest
+    from app.services.metadata import CollectionMetadataCache
+    from app.services.vector_service import VectorService
+
+    client = MagicMock()
+    client.get_aliases = AsyncMock(return_value=SimpleNamespace(aliases=[
+        SimpleNamespace(alias_name="docs", collection_name="docs_v2")
+    ]))
+    client.search = AsyncMock(return_value=[])
+    service = VectorService(client, cache=CollectionMetadataCache(ttl=60))
+
+    await service.search_vectors(SearchRequest(collection="docs", vector=[1.0, 2.0]))
+    assert client.search.await_args.kwargs["collection_name"] == "docs"
+    client.get_aliases.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_alias_change_drops_schema_cached_under_alias():
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from app.services.metadata import CollectionMetadataCache
+
+    def info(size):
+        return SimpleNamespace(status="green", config=SimpleNamespace(
+            params=SimpleNamespace(vectors=SimpleNamespace(size=size, distance="Cosine"))
+        ))
+
+    client = MagicMock()
+    client.get_collection = AsyncMock(side_effect=[info(4), info(8)])
+    cache = CollectionMetadataCache(ttl=60)
+    assert (await cache.schema(client, "docs")).vector_size == 4
+    cache.invalidate_aliases()
+    assert (await cache.schema(client, "docs")).vector_size == 8
@@ -156,3 +156,25 @@ def test_settings_body_size_limit_validation():
     # Valid
     settings = Settings(max_body_size_bytes=2_000_000)
     assert settings.max_body_size_bytes == 2_000_000
+
+
+def test_qdrant_nodes_and_primary():
+    """Test multi-node endpoint parsing"""
+    settings = Settings(qdrant_nodes="q1, q2:7333,q3", qdrant_primary="q2:7333")
+    assert settings.get_qdrant_nodes() == [("q1", 6333), ("q2", 7333), ("q3", 6333)]
+    assert settings.get_qdrant_primary() == ("q2", 7333)
+    assert Settings().get_qdrant_nodes() == [("localhost", 6333)]
+    with pytest.raises(ValueError):
+        Settings(qdrant_nodes="q1", qdrant_primary="q9").get_qdrant_primary()
+
+
+def test_grpc_options():
+    """Test gRPC channel arguments built from settings"""
+    opts = Settings(qdrant_grpc_max_send_message_bytes=128 * 1024 * 1024).get_grpc_options()
+    assert opts["grpc.max_send_message_length"] == 128 * 1024 * 1024
+    assert opts["grpc.keepalive_time_ms"] == 30000
+    assert "grpc.use_local_subchannel_pool" not in opts
+
+    opts = Settings(qdrant_grpc_keepalive_time=0, qdrant_grpc_channels=4).get_grpc_options()
+    assert "grpc.keepalive_time_ms" not in opts
+    assert opts["grpc.use_local_subchannel_pool"] == 1
@@ -0,0 +1,152 @@
+"""
+Tests for the collection metadata cache
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.schemas.collections import CreateCollectionRequest
+from app.services.collection_service import CollectionService
+from app.services.metadata import CollectionMetadataCache
+
+
+def _mock_client(size: int = 128, count: int = 10) -> MagicMock:
+    client = MagicMock()
+    client.get_collection = AsyncMock(return_value=SimpleNamespace(
+        status="green",
+        config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=size, distance="Cosine"))),
+    ))
+    client.count = AsyncMock(return_value=SimpleNamespace(count=count))
+    client.get_collections = AsyncMock(return_value=SimpleNamespace(collections=[SimpleNamespace(name="c1")]))
+    client.create_collection = AsyncMock(return_value=True)
+    client.delete_collection = AsyncMock(return_value=True)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_single_flight():
+    """Concurrent misses for one key run the loader once"""
+    cache: TTLCache[str, int] = TTLCache(ttl=60)
+    calls = 0
+
+    async def loader() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(5)])
+    assert results == [42] * 5
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_single_flight_across_handoff():
+    """A caller arriving while the lock is handed to a waiter still shares the load"""
+    cache: TTLCache[str, int] = TTLCache(ttl=60)
+    calls = 0
+    release = asyncio.Event()
+
+    async def failing_then_ok() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        if calls == 1:
+            raise RuntimeError("first load fails")
+        return 7
+
+    first = asyncio.create_task(cache.get_or_load("k", failing_then_ok))
+    waiter = asyncio.create_task(cache.get_or_load("k", failing_then_ok))
+    await asyncio.sleep(0)
+    release.set()
+    with pytest.raises(RuntimeError):
+        await first
+    # The lock was released but the waiter hasn't run yet: a newcomer must queue behind it
+    late = asyncio.create_task(cache.get_or_load("k", failing_then_ok))
+    assert await waiter == 7
+    assert await late == 7
+    assert calls == 2
+    assert not cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_invalidation_during_load_not_cached():
+    cache: TTLCache[str, int] = TTLCache(ttl=60)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def loader() -> int:
+        started.set()
+        await release.wait()
+        return 1
+
+    task = asyncio.create_task(cache.get_or_load("k", loader))
+    await started.wait()
+    cache.pop("k")
+    release.set()
+    assert await task == 1
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_zero_ttl_disables():
+    cache: TTLCache[str, int] = TTLCache(ttl=0)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_collection_info_cached():
+    """Second lookup is served without calling Qdrant"""
+    client = _mock_client()
+    service = CollectionService(client, cache=CollectionMetadataCache(ttl=60))
+
+    first = await service.get_collection_info("c1")
+    second = await service.get_collection_info("c1")
+
+    assert first == second
+    assert first.vector_size == 128
+    assert first.distance == "Cosine"
+    assert client.get_collection.await_count == 1
+    assert client.count.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_list_collections_cached_and_invalidated_on_create():
+    client = _mock_client()
+    service = CollectionService(client, cache=CollectionMetadataCache(ttl=60))
+
+    await service.list_collections()
+    await service.list_collections()
+    assert client.get_collections.await_count == 1
+
+    await service.create_collection(CreateCollectionRequest(name="c2", vectors_size=4))
+    await service.list_collections()
+    assert client.get_collections.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_delete_invalidates_schema():
+    client = _mock_client()
+    cache = CollectionMetadataCache(ttl=60)
+    service = CollectionService(client, cache=cache)
+
+    await service.get_collection_info("c1")
+    await service.delete_collection("c1")
+    await service.get_collection_info("c1")
+    assert client.get_collection.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_counts_keeps_schema():
+    client = _mock_client()
+    cache = CollectionMetadataCache(ttl=60)
+
+    await cache.info(client, "c1")
+    cache.invalidate_counts("c1")
+    await cache.info(client, "c1")
+
+    assert client.get_collection.await_count == 1
+    assert client.count.await_count == 2
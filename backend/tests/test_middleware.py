@@ -43,17 +43,132 @@ def test_rate_limiter_cleanup():
 
     limiter = RateLimitMiddleware(Starlette(), per_minute=60)
 
-    # Add some old entries
-    limiter.state["192.168.1.1"].append(time.monotonic() - 400)  # 400s ago (stale)
-    limiter.state["192.168.1.2"].append(time.monotonic() - 10)   # 10s ago (fresh)
+    # Buckets refilled 400s ago (stale) and 10s ago (fresh)
+    limiter.state["ip:192.168.1.1"] = time.monotonic() - 400
+    limiter.state["ip:192.168.1.2"] = time.monotonic() - 10
 
     # Run cleanup
     removed = limiter.cleanup_stale(max_age_seconds=300)
 
     # Old IP should be removed
     assert removed == 1
-    assert "192.168.1.1" not in limiter.state
-    assert "192.168.1.2" in limiter.state
+    assert "ip:192.168.1.1" not in limiter.state
+    assert "ip:192.168.1.2" in limiter.state
+
+
+def test_rate_limiter_gcra_burst_and_refill():
+    from starlette.applications import Starlette
+
+    from app.core.middleware import RateLimitMiddleware
+
+    limiter = RateLimitMiddleware(Starlette(), per_minute=60)
+    now = 1000.0
+    assert all(limiter.acquire("k", now=now) == 0 for _ in range(60))
+    assert limiter.acquire("k", now=now) == pytest.approx(1.0)
+    # One token back per second; state stays a single float per key
+    assert limiter.acquire("k", now=now + 1) == 0
+    assert limiter.acquire("k", cost=5, now=now + 3) == pytest.approx(3.0)
+    assert limiter.state == {"k": pytest.approx(now + 61)}
+
+
+def test_rate_limiter_route_and_size_costs():
+    from starlette.applications import Starlette
+
+    from app.core.middleware import RateLimitMiddleware
+
+    limiter = RateLimitMiddleware(
+        Starlette(),
+        per_minute=60,
+        route_costs={"POST /api/collections/*": 3, "POST /api/collections/*/migrate": 20, "* /api/stats*": 2},
+        bytes_per_token=1000,
+        cost_exempt_routes=("PUT /api/snapshots/uploads/{upload_id}/chunks/{index}",),
+    )
+    assert limiter.cost("POST", "/api/vectors/search") == 1
+    assert limiter.cost("POST", "/api/collections/c1/migrate") == 20
+    assert limiter.cost("POST", "/api/collections/c1") == 3
+    assert limiter.cost("GET", "/api/stats/clusters") == 2
+    assert limiter.body_cost("POST", "/api/vectors/insert", 5000) == 5
+    assert limiter.body_cost("PUT", "/api/snapshots/uploads/u/chunks/0", 5000) == 0
+    # JSON snapshot routes are charged like any other
+    assert limiter.body_cost("POST", "/api/snapshots/schedules", 5000) == 5
+    # Never more than a full bucket, so big requests stay possible
+    assert limiter.body_cost("POST", "/api/vectors/insert", 10**9) == 60
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_charges_bytes_read():
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    from app.core.middleware import RateLimitMiddleware
+
+    async def read(request):
+        return PlainTextResponse(str(len(await request.body())))
+
+    async def reject(request):
+        return PlainTextResponse("too big", status_code=413)
+
+    app = Starlette(routes=[Route("/read", read, methods=["POST"]), Route("/reject", reject, methods=["POST"])])
+    limiter = RateLimitMiddleware(app, per_minute=60, bytes_per_token=1000)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limiter), base_url="http://t") as http:
+        await http.post("/reject", content=b"x" * 50_000)
+        assert limiter.state["ip:127.0.0.1"] - time.monotonic() == pytest.approx(1, abs=0.1)
+        # A large bulk request is let in, then its body puts the key in debt
+        assert (await http.post("/read", content=b"x" * 50_000)).status_code == 200
+        assert limiter.state["ip:127.0.0.1"] - time.monotonic() == pytest.approx(52, abs=0.1)
+        assert (await http.post("/read", content=b"x" * 7000)).status_code == 200
+        assert (await http.post("/read", content=b"x")).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_keys_users_by_jwt_sub():
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    from app.core.middleware import RateLimitMiddleware
+    from app.core.security import create_access_token
+
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    limiter = RateLimitMiddleware(Starlette(routes=[Route("/ok", ok)]), per_minute=2)
+    alice = {"Authorization": f"Bearer {create_access_token('alice')}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limiter), base_url="http://t") as http:
+        assert [(await http.get("/ok", headers=alice)).status_code for _ in range(3)] == [200, 200, 429]
+        r = await http.get("/ok", headers=alice)
+        assert int(r.headers["Retry-After"]) >= 1
+        # Same IP, other identity: separate buckets; forged tokens fall back to the IP
+        assert (await http.get("/ok")).status_code == 200
+        assert (await http.get("/ok", headers={"Authorization": "Bearer forged"})).status_code == 200
+        assert (await http.get("/ok")).status_code == 429
+    assert set(limiter.state) == {"user:alice", "ip:127.0.0.1"}
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_background_eviction():
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    from app.core.middleware import RateLimitMiddleware
+
+    limiter = RateLimitMiddleware(AsyncMock(), per_minute=60, eviction_interval=0.01)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+    async def inner(scope, receive, send):
+        await receive()
+        limiter.state["ip:idle"] = time.monotonic() - 1
+        limiter.state["ip:busy"] = time.monotonic() + 30
+        await asyncio.sleep(0.05)
+        assert set(limiter.state) == {"ip:busy"}
+        await receive()
+
+    limiter.app = inner
+    await limiter({"type": "lifespan"}, AsyncMock(side_effect=messages), AsyncMock())
+    assert limiter._evictor is None
 
 
 def test_body_size_limit_rejects_large_body(client: TestClient, mock_settings):
@@ -142,3 +257,100 @@ def test_rate_limit_ip_extraction_fallback():
 
     ip = limiter._ip(mock_request)
     assert ip == "192.168.1.100"
+
+
+def _asgi_stack(writer):
+    """Minimal app behind the full middleware stack (own rate-limit state)"""
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse, StreamingResponse
+    from starlette.routing import Route
+
+    from app.core.middleware import (
+        AuditLogMiddleware,
+        BodySizeLimitMiddleware,
+        CSRFMiddleware,
+        RateLimitMiddleware,
+        RequestIDMiddleware,
+    )
+
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i};".encode()
+        return StreamingResponse(chunks())
+
+    app = Starlette(routes=[Route("/ok", ok, methods=["GET", "POST"]), Route("/stream", stream)])
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=16)
+    app.add_middleware(RateLimitMiddleware, per_minute=3)
+    app.add_middleware(CSRFMiddleware)
+    app.add_middleware(AuditLogMiddleware, writer=writer)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_asgi_stack_behaviour(tmp_path: Path):
+    import httpx
+
+    from app.core.audit import AuditWriter
+
+    writer = AuditWriter(tmp_path / "audit.log")
+    app = _asgi_stack(writer)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+        r = await http.get("/stream")
+        assert r.text == "chunk0;chunk1;chunk2;"
+        assert r.headers["X-Request-ID"]
+
+        http.cookies.set("csrf_token", "t")
+        r = await http.post("/ok", content=b"x" * 32, headers={"X-CSRF-Token": "t"})
+        assert r.status_code == 413
+
+        r = await http.post("/ok", content=b"x", headers={"X-CSRF-Token": "other"})
+        assert r.json() == {"error": "CSRF token invalid"}
+
+        # CSRF rejects before the rate limiter counts the request
+        assert (await http.get("/ok")).status_code == 200
+        assert (await http.get("/ok")).status_code == 429
+
+    writer.close()
+    entries = [json.loads(line) for line in (tmp_path / "audit.log").read_text().splitlines()]
+    assert [(e["path"], e["status"]) for e in entries] == [
+        ("/stream", 200), ("/ok", 413), ("/ok", 403), ("/ok", 200), ("/ok", 429)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_body_size_limit_exempts_only_streaming_routes():
+    import httpx
+    from starlette.responses import PlainTextResponse
+
+    from app.core.middleware import BodySizeLimitMiddleware
+    from app.main import STREAMING_UPLOAD_ROUTES
+
+    app = BodySizeLimitMiddleware(PlainTextResponse("ok"), max_bytes=16, exempt_routes=STREAMING_UPLOAD_ROUTES)
+    body = b"x" * 32
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+        assert (await http.post("/api/snapshots/c1/restore", content=body)).status_code == 200
+        assert (await http.post("/api/snapshots/c1/restore_async", content=body)).status_code == 200
+        assert (await http.put("/api/snapshots/uploads/u1/chunks/0", content=body)).status_code == 200
+        # JSON snapshot routes keep the limit
+        assert (await http.post("/api/snapshots/schedules", content=body)).status_code == 413
+        assert (await http.post("/api/snapshots/c1/uploads", content=body)).status_code == 413
+        assert (await http.post("/api/snapshots/c1/recover", content=body)).status_code == 413
+        assert (await http.post("/api/snapshots/c1/x/restore", content=body)).status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_asgi_middlewares_pass_through_non_http_scopes(tmp_path: Path):
+    from unittest.mock import AsyncMock
+
+    from app.core.middleware import AuditLogMiddleware, CSRFMiddleware, RequestIDMiddleware
+
+    inner = AsyncMock()
+    app = RequestIDMiddleware(CSRFMiddleware(AuditLogMiddleware(inner, tmp_path / "audit.log")))
+    await app({"type": "lifespan"}, AsyncMock(), AsyncMock())
+    inner.assert_awaited_once()
+    assert not (tmp_path / "audit.log").exists()
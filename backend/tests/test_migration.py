@@ -0,0 +1,164 @@
+"""
+Tests for the collection migration pipeline
+"""
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.ops import tracker
+from app.schemas.collections import MigrateCollectionRequest
+from app.services import migration_service
+from app.services.metadata import CollectionMetadataCache
+from app.services.migration_service import MigrationService, id_key
+
+
+class FakeQdrant:
+    """Minimal in-memory stand-in for the scroll/upsert API"""
+
+    def __init__(self, n: int, fail_upserts_after: int | None = None) -> None:
+        self.points = {"src": {i: SimpleNamespace(id=i, vector=[float(i)], payload={"i": i}) for i in range(n)}}
+        self.fail_upserts_after = fail_upserts_after
+        self.upserts = 0
+
+    async def get_collection(self, name):
+        return SimpleNamespace(config=SimpleNamespace(
+            params=SimpleNamespace(
+                vectors=SimpleNamespace(size=1, distance="Cosine", on_disk=False, hnsw_config=None, datatype=None),
+                sparse_vectors=None, shard_number=1, replication_factor=1, on_disk_payload=True,
+            ),
+            hnsw_config=SimpleNamespace(m=16, ef_construct=100),
+            quantization_config=None,
+            optimizer_config=SimpleNamespace(indexing_threshold=10000),
+        ))
+
+    async def collection_exists(self, name):
+        return name in self.points
+
+    async def create_collection(self, collection_name, **kwargs):
+        self.points[collection_name] = {}
+        return True
+
+    async def update_collection(self, collection_name, **kwargs):
+        return True
+
+    async def count(self, name, exact=True):
+        return SimpleNamespace(count=len(self.points[name]))
+
+    async def scroll(self, collection_name, limit, offset=None, **kwargs):
+        ids = sorted(self.points[collection_name], key=id_key)
+        if offset is not None:
+            ids = [i for i in ids if id_key(i) >= id_key(offset)]
+        page = ids[: limit + 1]
+        nxt = page[limit] if len(page) > limit else None
+        await asyncio.sleep(0)
+        return [self.points[collection_name][i] for i in page[:limit]], nxt
+
+    async def upsert(self, collection_name, points, wait=True):
+        self.upserts += 1
+        if self.fail_upserts_after is not None and self.upserts > self.fail_upserts_after:
+            raise RuntimeError("Qdrant unavailable")
+        for p in points:
+            self.points[collection_name][p.id] = p
+
+
+@pytest.fixture(autouse=True)
+def _state_dir(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(migration_service.settings, "migration_state_dir", tmp_path)
+    monkeypatch.setattr(migration_service, "_CHECKPOINT_INTERVAL", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_migration_copies_all_points_with_parallel_readers():
+    client = FakeQdrant(1000)
+    service = MigrationService(client, cache=CollectionMetadataCache(ttl=0))
+    req = MigrateCollectionRequest(target="dst", m=32, readers=4, workers=3, batch_size=37)
+
+    res = await service.start("src", req)
+    await service.run(res["job_id"])
+
+    assert tracker.get(res["op_id"]).stage == "completed"
+    assert set(client.points["dst"]) == set(range(1000))
+    state = service.load_state(res["job_id"])
+    assert len(state["ranges"]) == 4
+    assert all(r["done"] for r in state["ranges"])
+    assert tracker.get(res["op_id"]).meta["copied"] == 1000
+
+
+@pytest.mark.asyncio
+async def test_migration_resumes_after_failure():
+    client = FakeQdrant(500, fail_upserts_after=5)
+    service = MigrationService(client, cache=CollectionMetadataCache(ttl=0))
+    req = MigrateCollectionRequest(target="dst", readers=2, workers=2, batch_size=20)
+
+    res = await service.start("src", req)
+    await service.run(res["job_id"])
+    assert tracker.get(res["op_id"]).stage == "failed"
+    assert len(client.points["dst"]) < 500
+
+    client.fail_upserts_after = None
+    upserts_before = client.upserts
+    resumed = await service.resume(res["job_id"])
+    await service.run(res["job_id"])
+
+    assert tracker.get(resumed["op_id"]).stage == "completed"
+    assert set(client.points["dst"]) == set(range(500))
+    # Checkpointed batches were not copied again
+    assert client.upserts - upserts_before < 500 // 20
+    # Batches upserted after the last checkpoint and re-copied are counted once
+    assert service.load_state(res["job_id"])["copied"] == 500
+    assert tracker.get(resumed["op_id"]).meta["copied"] == 500
+
+
+@pytest.mark.asyncio
+async def test_migration_cannot_run_twice_concurrently():
+    client = FakeQdrant(200, fail_upserts_after=0)
+    service = MigrationService(client, cache=CollectionMetadataCache(ttl=0))
+    res = await service.start("src", MigrateCollectionRequest(target="dst", batch_size=20))
+    # Claimed from start() until its run finishes
+    with pytest.raises(migration_service.MigrationRunningError):
+        await service.resume(res["job_id"])
+    await service.run(res["job_id"])
+
+    client.fail_upserts_after = None
+    await service.resume(res["job_id"])
+    # Another worker (or a second request) trying to resume the same job
+    with pytest.raises(migration_service.MigrationRunningError):
+        await MigrationService(client, cache=CollectionMetadataCache(ttl=0)).resume(res["job_id"])
+    await service.run(res["job_id"])
+    assert (await service.status(res["job_id"]))["completed"] is True
+    assert not migration_service._claims
+
+
+@pytest.mark.asyncio
+async def test_migration_resumes_only_on_its_cluster():
+    from fastapi import HTTPException
+
+    from app.routes.collections import get_job_migration_service
+
+    client = FakeQdrant(100, fail_upserts_after=0)
+    service = MigrationService(client, cache=CollectionMetadataCache(ttl=0), cluster="eu")
+    res = await service.start("src", MigrateCollectionRequest(target="dst", batch_size=20))
+    await service.run(res["job_id"])
+    assert service.load_state(res["job_id"])["cluster"] == "eu"
+
+    # A resume request that omits (or names another) cluster must not copy against the default one
+    with pytest.raises(ValueError):
+        await MigrationService(client, cache=CollectionMetadataCache(ttl=0)).resume(res["job_id"])
+    with pytest.raises(HTTPException) as exc:
+        await get_job_migration_service(res["job_id"], "admin", cluster="default")
+    assert exc.value.status_code == 409
+    assert not migration_service._claims
+
+    client.fail_upserts_after = None
+    await service.resume(res["job_id"])
+    await service.run(res["job_id"])
+    assert service.load_state(res["job_id"])["completed"] is True
+
+
+@pytest.mark.asyncio
+async def test_migration_status_rejects_non_uuid_job_id():
+    service = MigrationService(FakeQdrant(0))
+    with pytest.raises(KeyError):
+        await service.status("../../etc/passwd")
@@ -12,3 +12,28 @@ def test_op_tracker_flow():
     t.update(op.id, stage='completed')
     assert t.to_dict(op.id)['stage'] == 'completed'
 
+
+
+def test_transfer_progress_throttles_and_estimates():
+    from app.core.ops import TransferProgress
+
+    t = OpTracker()
+    op = t.create('snapshot_restore')
+    now = [100.0]
+    progress = TransferProgress(op.id, total=1000, interval=1.0, clock=lambda: now[0], ops=t)
+
+    now[0] = 101.0
+    progress(100)
+    meta = t.to_dict(op.id)['meta']
+    assert meta['bytes_sent'] == 100
+    assert meta['throughput_bps'] == 100
+    assert meta['eta_seconds'] == 9.0
+
+    now[0] = 101.5
+    progress(200)  # within the interval: not recorded
+    assert t.to_dict(op.id)['meta']['bytes_sent'] == 100
+
+    progress(1000, force=True)
+    meta = t.to_dict(op.id)['meta']
+    assert meta['bytes_sent'] == 1000
+    assert meta['eta_seconds'] == 0.0
@@ -0,0 +1,246 @@
+"""
+Tests for Qdrant client init, warmup and health probes
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.qdrant import client as qclient
+from app.qdrant.keys import ApiKeyProvider
+from app.qdrant.pool import QdrantNode, QdrantPool, build_pool
+from app.qdrant.resilience import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture(autouse=True)
+def _fresh_client(monkeypatch):
+    monkeypatch.setattr(qclient, "_qdrant", None)
+    monkeypatch.setattr(qclient, "_init_lock", asyncio.Lock())
+    monkeypatch.setattr(qclient, "_health", dict(qclient._health))
+    monkeypatch.setattr(qclient, "_pool_key_version", 0)
+    monkeypatch.setattr(qclient, "_connect_breaker", CircuitBreaker("connect", threshold=1, reset_timeout=0))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_calls_create_one_client(monkeypatch):
+    calls = 0
+
+    async def connect(api_key):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return AsyncMock()
+
+    monkeypatch.setattr(qclient, "_connect", connect)
+    clients = await asyncio.gather(*(qclient.get_qdrant_client() for _ in range(20)))
+    assert calls == 1
+    assert all(c is clients[0] for c in clients)
+
+
+@pytest.mark.asyncio
+async def test_failed_connect_is_retried(monkeypatch):
+    connect = AsyncMock(side_effect=[ConnectionError("down"), AsyncMock()])
+    monkeypatch.setattr(qclient, "_connect", connect)
+    with pytest.raises(ConnectionError):
+        await qclient.get_qdrant_client()
+    assert await qclient.get_qdrant_client() is not None
+    assert connect.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_connect_fails_fast_while_breaker_open(monkeypatch):
+    monkeypatch.setattr(qclient, "_connect_breaker", CircuitBreaker("connect", threshold=1, reset_timeout=60))
+    connect = AsyncMock(side_effect=ConnectionError("down"))
+    monkeypatch.setattr(qclient, "_connect", connect)
+    with pytest.raises(ConnectionError):
+        await qclient.get_qdrant_client()
+    with pytest.raises(CircuitOpenError):
+        await qclient.get_qdrant_client()
+    assert connect.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_warmup_timeout_does_not_raise(monkeypatch):
+    async def hang(api_key):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(qclient, "_connect", hang)
+    assert await qclient.warmup_qdrant_client(0.01) is False
+    assert qclient.qdrant_health()["healthy"] is False
+
+
+def _pool(n: int = 3, **options) -> QdrantPool:
+    nodes = [QdrantNode(f"q{i}", 6333, AsyncMock()) for i in range(n)]
+    return QdrantPool(nodes, **options)
+
+
+@pytest.mark.asyncio
+async def test_probe_records_health(monkeypatch):
+    pool = _pool(1, eject_after=1)
+    monkeypatch.setattr(qclient, "_qdrant", pool)
+    assert await qclient.probe_qdrant() is True
+    health = qclient.qdrant_health()
+    assert health["healthy"] is True
+    assert health["latency_ms"] is not None
+    assert health["nodes"][0]["primary"] is True
+
+    pool.nodes[0].client.get_collections.side_effect = ConnectionError("refused")
+    assert await qclient.probe_qdrant() is False
+    assert qclient.qdrant_health()["error"] == "refused"
+
+
+@pytest.mark.asyncio
+async def test_pool_routes_reads_by_latency_and_writes_to_primary():
+    pool = _pool(3, primary=1)
+    pool.nodes[0].ewma_ms = 30.0
+    pool.nodes[1].ewma_ms = 20.0
+    pool.nodes[2].ewma_ms = 5.0
+
+    await pool.search("c1", query_vector=[0.1])
+    pool.nodes[2].client.search.assert_awaited_once()
+    await pool.upsert("c1", points=[])
+    pool.nodes[1].client.upsert.assert_awaited_once()
+    pool.nodes[2].client.upsert.assert_not_awaited()
+
+    # In-flight calls make a fast node look busier
+    pool.nodes[2].inflight = 9
+    assert pool.pick_read_node() is pool.nodes[1]
+
+
+@pytest.mark.asyncio
+async def test_pool_ejects_and_readmits_nodes():
+    pool = _pool(2, eject_after=2, readmit_after=2)
+    down = pool.nodes[0]
+    down.ewma_ms = 0.1
+    pool.nodes[1].ewma_ms = 50.0
+    down.client.get_collections.side_effect = ConnectionError("down")
+
+    await pool.check_health(1.0)
+    assert down.healthy
+    await pool.check_health(1.0)
+    assert not down.healthy
+    assert pool.pick_read_node() is pool.nodes[1]
+
+    down.client.get_collections.side_effect = None
+    await pool.check_health(1.0)
+    assert not down.healthy
+    await pool.check_health(1.0)
+    assert down.healthy
+
+
+@pytest.mark.asyncio
+async def test_build_pool_tolerates_unreachable_node():
+    clients = {"a": AsyncMock(), "b": AsyncMock()}
+    clients["b"].get_collections.side_effect = ConnectionError("down")
+    pool = await build_pool([("a", 6333), ("b", 6333)], ("a", 6333), lambda h, p: clients[h], 1.0)
+    assert [n.healthy for n in pool.nodes] == [True, False]
+
+    clients["a"].get_collections.side_effect = ConnectionError("down too")
+    with pytest.raises(ConnectionError):
+        await build_pool([("a", 6333), ("b", 6333)], ("a", 6333), lambda h, p: clients[h], 1.0)
+
+
+@pytest.mark.asyncio
+async def test_build_pool_rotates_channels():
+    made: list[AsyncMock] = []
+
+    def factory(host, port):
+        made.append(AsyncMock())
+        return made[-1]
+
+    pool = await build_pool([("a", 6333)], ("a", 6333), factory, 1.0, channels=3)
+    assert len(pool.nodes[0].clients) == 3
+    for _ in range(6):
+        await pool.upsert("c1", points=[])
+    assert [c.upsert.await_count for c in made] == [2, 2, 2]
+    await pool.close()
+    assert all(c.close.await_count == 1 for c in made)
+
+
+def test_make_client_uses_grpc_settings(monkeypatch):
+    import grpc as grpc_mod
+
+    monkeypatch.setattr(qclient.settings, "qdrant_grpc_port", 16334)
+    monkeypatch.setattr(qclient.settings, "qdrant_grpc_compression", "gzip")
+    remote = qclient._make_client("q1", 6333)._client
+    assert remote._grpc_port == 16334
+    assert remote._grpc_compression == grpc_mod.Compression.Gzip
+    assert remote._grpc_options["grpc.keepalive_time_ms"] == 30000
+
+
+def _staged_provider(tmp_path, monkeypatch) -> ApiKeyProvider:
+    """Key provider whose file already holds a new key that Qdrant has not accepted yet"""
+    key_file = tmp_path / "qdrant.key"
+    key_file.write_text("old-key-0123456789")
+    provider = ApiKeyProvider(key_file)
+    provider.get()
+    key_file.write_text("new-key-0123456789-x")
+    assert provider.refresh() is True
+    monkeypatch.setattr(qclient, "qdrant_key_provider", provider)
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_rotate_moves_pool_to_new_nodes_and_closes_old(tmp_path, monkeypatch):
+    provider = _staged_provider(tmp_path, monkeypatch)
+    pool, new = _pool(1), _pool(1)
+    old_client, new_client = pool.nodes[0].client, new.nodes[0].client
+    connect = AsyncMock(return_value=new)
+    monkeypatch.setattr(qclient, "_qdrant", pool)
+    monkeypatch.setattr(qclient, "_connect", connect)
+    monkeypatch.setattr(qclient.settings, "qdrant_timeout", 0)
+
+    assert await qclient.rotate_qdrant_client() is True
+    connect.assert_awaited_once_with("new-key-0123456789-x")
+    # Accepted by Qdrant, so the key is now current for REST calls too
+    assert provider.get() == "new-key-0123456789-x"
+    assert not provider.has_pending
+    assert await qclient.get_qdrant_client() is pool
+    # A job holding the pool from before the rotation reaches the new node
+    await pool.upsert("c1", points=[])
+    new_client.upsert.assert_awaited_once()
+    await asyncio.gather(*qclient._retiring)
+    old_client.close.assert_awaited_once()
+    new_client.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retired_nodes_close_after_inflight_calls(monkeypatch):
+    pool, new = _pool(1), _pool(1)
+    old_node = pool.nodes[0]
+    release = asyncio.Event()
+
+    async def slow_scroll(*args, **kwargs):
+        await release.wait()
+        return [], None
+
+    old_node.client.scroll.side_effect = slow_scroll
+    monkeypatch.setattr(qclient, "_qdrant", pool)
+    monkeypatch.setattr(qclient, "_connect", AsyncMock(return_value=new))
+    monkeypatch.setattr(qclient.settings, "qdrant_timeout", 0)
+
+    call = asyncio.create_task(pool.scroll("c1"))
+    await asyncio.sleep(0)
+    assert await qclient.rotate_qdrant_client() is True
+    await asyncio.sleep(0.3)
+    old_node.client.close.assert_not_awaited()
+
+    release.set()
+    assert await call == ([], None)
+    await asyncio.gather(*qclient._retiring)
+    old_node.client.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_rotate_keeps_old_pool_when_new_key_rejected(tmp_path, monkeypatch):
+    provider = _staged_provider(tmp_path, monkeypatch)
+    old = AsyncMock()
+    monkeypatch.setattr(qclient, "_qdrant", old)
+    monkeypatch.setattr(qclient, "_connect", AsyncMock(side_effect=PermissionError("401")))
+
+    assert await qclient.rotate_qdrant_client() is False
+    assert await qclient.get_qdrant_client() is old
+    old.close.assert_not_awaited()
+    # Qdrant has not been restarted yet: everything keeps the old key
+    assert provider.get() == "old-key-0123456789"
+    assert provider.has_pending
@@ -0,0 +1,98 @@
+"""
+Tests for the cached Qdrant API key provider
+"""
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from pydantic import SecretStr
+
+from app.qdrant.keys import ApiKeyProvider
+
+
+def _write(path: Path, key: str, mtime_ns: int) -> None:
+    path.write_text(key)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_get_reads_file_once(tmp_path):
+    key_file = tmp_path / "qdrant.key"
+    _write(key_file, "first-key-0123456789\n", 1_000_000_000)
+    provider = ApiKeyProvider(key_file)
+
+    assert provider.get() == "first-key-0123456789"
+    with patch.object(Path, "read_text", side_effect=AssertionError("file read")):
+        assert provider.get() == "first-key-0123456789"
+        # Unchanged file: refresh only stats it
+        assert provider.refresh() is False
+
+
+def test_refresh_detects_rotation(tmp_path):
+    key_file = tmp_path / "qdrant.key"
+    _write(key_file, "first-key-0123456789", 1_000_000_000)
+    provider = ApiKeyProvider(key_file)
+    provider.get()
+    version = provider.version
+
+    _write(key_file, "second-key-012345678", 2_000_000_000)
+    assert provider.refresh() is True
+    # Staged until Qdrant accepts it
+    assert provider.get() == "first-key-0123456789"
+    assert provider.pending == "second-key-012345678"
+    assert provider.version == version
+    assert provider.accept("first-key-0123456789") is False
+
+    assert provider.accept("second-key-012345678") is True
+    assert provider.get() == "second-key-012345678"
+    assert not provider.has_pending
+    assert provider.version == version + 1
+
+
+def test_reverted_key_file_drops_the_staged_key(tmp_path):
+    key_file = tmp_path / "qdrant.key"
+    _write(key_file, "first-key-0123456789", 1_000_000_000)
+    provider = ApiKeyProvider(key_file)
+    provider.get()
+    _write(key_file, "second-key-012345678", 2_000_000_000)
+    provider.refresh()
+    _write(key_file, "first-key-0123456789", 3_000_000_000)
+    assert provider.refresh() is False
+    assert not provider.has_pending
+    assert provider.get() == "first-key-0123456789"
+
+
+def test_rest_auth_falls_back_to_pending_key(tmp_path):
+    import httpx
+
+    from app.qdrant.http import ApiKeyAuth
+
+    key_file = tmp_path / "qdrant.key"
+    _write(key_file, "first-key-0123456789", 1_000_000_000)
+    provider = ApiKeyProvider(key_file)
+    provider.get()
+    _write(key_file, "second-key-012345678", 2_000_000_000)
+    provider.refresh()
+    accepted = {"first-key-0123456789"}
+    seen: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("api-key"))
+        return httpx.Response(200 if request.headers.get("api-key") in accepted else 401)
+
+    with httpx.Client(base_url="http://q:6333", transport=httpx.MockTransport(handler), auth=ApiKeyAuth(provider)) as http:
+        # Qdrant not restarted yet: the current key keeps working
+        assert http.get("/collections").status_code == 200
+        assert seen == ["first-key-0123456789"]
+
+        # Restarted with the new key: one retry, then the new key is current
+        accepted = {"second-key-012345678"}
+        assert http.get("/collections").status_code == 200
+        assert http.get("/collections").status_code == 200
+    assert seen[1:] == ["first-key-0123456789", "second-key-012345678", "second-key-012345678"]
+    assert provider.get() == "second-key-012345678"
+
+
+def test_falls_back_to_setting_when_file_missing(tmp_path):
+    provider = ApiKeyProvider(tmp_path / "missing.key", SecretStr("env-key"))
+    assert provider.get() == "env-key"
+    assert provider.refresh() is False
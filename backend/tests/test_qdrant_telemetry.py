@@ -0,0 +1,116 @@
+"""
+Tests for per-operation Qdrant metrics
+"""
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from prometheus_client import REGISTRY
+from qdrant_client.http import models as qm
+
+from app.qdrant.pool import QdrantNode, QdrantPool
+from app.qdrant import telemetry
+from app.qdrant.telemetry import collection_label, payload_bytes, vector_bytes
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture(autouse=True)
+def _known_collections(monkeypatch):
+    monkeypatch.setattr(telemetry, "_known", {"default": {"get_collections": frozenset({"docs", "tele", "tele_up"})}})
+
+
+def test_collection_label():
+    assert collection_label("default", ("docs",), {}) == "docs"
+    assert collection_label("default", (), {"collection_name": "docs"}) == "docs"
+    assert collection_label("default", (), {}) == "-"
+    # Names the cluster never listed share one label value
+    assert collection_label("default", ("docs-x1",), {}) == "other"
+    assert collection_label("eu", ("docs",), {}) == "other"
+
+
+@pytest.mark.asyncio
+async def test_pool_learns_collections_and_aliases_from_listings():
+    node = QdrantNode("m0", 6333, AsyncMock())
+    node.client.get_collections.return_value = SimpleNamespace(collections=[SimpleNamespace(name="fresh")])
+    node.client.get_aliases.return_value = SimpleNamespace(
+        aliases=[SimpleNamespace(alias_name="live", collection_name="fresh")]
+    )
+    pool = QdrantPool([node], cluster="eu")
+    assert collection_label("eu", ("fresh",), {}) == "other"
+
+    await pool.get_collections()
+    await pool.get_aliases()
+    assert collection_label("eu", ("fresh",), {}) == "fresh"
+    assert collection_label("eu", ("live",), {}) == "live"
+
+    # Health checks keep the names current
+    node.client.get_collections.return_value = SimpleNamespace(collections=[])
+    await pool.check_health(1.0)
+    assert collection_label("eu", ("fresh",), {}) == "other"
+
+
+def test_vector_and_payload_sizes():
+    assert vector_bytes([0.1] * 8) == 32
+    assert vector_bytes({"text": [0.1] * 4, "img": [0.2] * 2}) == 24
+    assert vector_bytes(qm.SparseVector(indices=[1, 5], values=[0.3, 0.4])) == 16
+    assert vector_bytes(qm.NamedVector(name="text", vector=[0.1] * 3)) == 12
+    assert vector_bytes(42) == 0
+
+    payloads = [{"a": 1}, None, {"b": "xy"}]
+    expected = sum(len(json.dumps(p, separators=(",", ":"))) for p in payloads if p)
+    assert payload_bytes(payloads) == expected
+
+
+@pytest.mark.asyncio
+async def test_pool_call_records_operation_metrics():
+    node = QdrantNode("m1", 6333, AsyncMock())
+    node.client.search.return_value = [
+        qm.ScoredPoint(id=1, version=0, score=0.9, payload={"k": "v"}, vector=[0.5] * 4),
+        qm.ScoredPoint(id=2, version=0, score=0.8, payload=None),
+    ]
+    pool = QdrantPool([node])
+    before = {
+        "count": _sample("quietvector_qdrant_operation_seconds_count", cluster="default", operation="search", collection="tele"),
+        "sent": _sample("quietvector_qdrant_vector_bytes_total", cluster="default", operation="search", collection="tele", direction="sent"),
+        "recv": _sample("quietvector_qdrant_points_total", cluster="default", operation="search", collection="tele", direction="received"),
+        "vrecv": _sample(
+            "quietvector_qdrant_vector_bytes_total", cluster="default", operation="search", collection="tele", direction="received"
+        ),
+    }
+
+    await pool.search(collection_name="tele", query_vector=[0.1] * 16, limit=2)
+
+    assert _sample("quietvector_qdrant_operation_seconds_count", cluster="default", operation="search", collection="tele") == before["count"] + 1
+    assert _sample(
+        "quietvector_qdrant_vector_bytes_total", cluster="default", operation="search", collection="tele", direction="sent"
+    ) == before["sent"] + 64
+    assert _sample(
+        "quietvector_qdrant_points_total", cluster="default", operation="search", collection="tele", direction="received"
+    ) == before["recv"] + 2
+    assert _sample(
+        "quietvector_qdrant_vector_bytes_total", cluster="default", operation="search", collection="tele", direction="received"
+    ) == before["vrecv"] + 16
+    assert _sample("quietvector_qdrant_operations_inflight", cluster="default", operation="search", collection="tele") == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_call_counts_upserted_points_and_errors():
+    node = QdrantNode("m2", 6333, AsyncMock())
+    pool = QdrantPool([node])
+    points = [qm.PointStruct(id=i, vector=[0.1] * 4, payload={"i": i}) for i in range(3)]
+    before = _sample("quietvector_qdrant_points_total", cluster="default", operation="upsert", collection="tele_up", direction="sent")
+
+    await pool.upsert(collection_name="tele_up", points=points)
+    assert _sample(
+        "quietvector_qdrant_points_total", cluster="default", operation="upsert", collection="tele_up", direction="sent"
+    ) == before + 3
+
+    node.client.upsert.side_effect = ValueError("bad request")
+    errors = _sample("quietvector_qdrant_operation_errors_total", cluster="default", operation="upsert", collection="tele_up")
+    with pytest.raises(ValueError):
+        await pool.upsert(collection_name="tele_up", points=points)
+    assert _sample("quietvector_qdrant_operation_errors_total", cluster="default", operation="upsert", collection="tele_up") == errors + 1
@@ -0,0 +1,129 @@
+"""
+Tests for the Qdrant circuit breaker and retry layer
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.qdrant.pool import QdrantNode, QdrantPool
+from app.qdrant.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient, retry_async
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _fail():
+    raise ConnectionError("refused")
+
+
+async def _ok():
+    return "ok"
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_recovers():
+    clock = _Clock()
+    breaker = CircuitBreaker("t1", threshold=2, reset_timeout=10, clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+    assert breaker.state == "open"
+
+    calls = AsyncMock(return_value="ok")
+    with pytest.raises(CircuitOpenError) as exc:
+        await breaker.call(calls)
+    calls.assert_not_awaited()
+    assert exc.value.retry_after == 10
+
+    # Half-open trial fails -> open again
+    clock.now = 11
+    with pytest.raises(ConnectionError):
+        await breaker.call(_fail)
+    assert breaker.state == "open"
+
+    clock.now = 22
+    assert await breaker.call(_ok) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_breaker_ignores_application_errors():
+    breaker = CircuitBreaker("t2", threshold=1)
+
+    async def not_found():
+        raise ValueError("Collection not found")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await breaker.call(not_found)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_retry_only_transient_errors():
+    policy = RetryPolicy(attempts=3, base_delay=0, max_delay=0)
+    flaky = AsyncMock(side_effect=[ConnectionError("x"), asyncio.TimeoutError(), "ok"])
+    retries: list[int] = []
+    assert await retry_async(flaky, policy, lambda attempt, e: retries.append(attempt)) == "ok"
+    assert retries == [0, 1]
+
+    bad = AsyncMock(side_effect=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        await retry_async(bad, policy)
+    assert bad.await_count == 1
+
+    assert is_transient(ConnectionError()) and not is_transient(KeyError("x"))
+
+
+@pytest.mark.asyncio
+async def test_rest_gateway_errors_are_transient():
+    import httpx
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    def response(status: int) -> UnexpectedResponse:
+        return UnexpectedResponse(status, "", b"", httpx.Headers())
+
+    assert all(is_transient(response(code)) for code in (502, 503, 504))
+    assert not is_transient(response(400)) and not is_transient(response(404))
+
+    # A restarting node behind the REST transport opens the breaker
+    breaker = CircuitBreaker("rest", threshold=2, reset_timeout=60)
+    down = AsyncMock(side_effect=response(503))
+    for _ in range(2):
+        with pytest.raises(UnexpectedResponse):
+            await breaker.call(down)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(down)
+
+
+def test_retry_delay_is_jittered_and_capped():
+    policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.3)
+    delays = [policy.delay(4) for _ in range(200)]
+    assert all(0 <= d <= 0.3 for d in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_pool_read_retries_on_other_node_and_writes_fail_fast():
+    a, b = AsyncMock(), AsyncMock()
+    a.search.side_effect = ConnectionError("a down")
+    a.upsert.side_effect = ConnectionError("a down")
+    b.search.return_value = ["hit"]
+    nodes = [QdrantNode("a", 6333, a), QdrantNode("b", 6333, b)]
+    nodes[0].ewma_ms, nodes[1].ewma_ms = 1.0, 50.0
+    pool = QdrantPool(nodes, breaker_threshold=1, retry=RetryPolicy(attempts=2, base_delay=0, max_delay=0))
+
+    assert await pool.search("c1", query_vector=[0.1]) == ["hit"]
+    assert nodes[0].breaker.state == "open"
+
+    # Writes go to the primary only: never retried, then rejected by the breaker
+    with pytest.raises(CircuitOpenError):
+        await pool.upsert("c1", points=[])
+    assert a.upsert.await_count == 0
@@ -0,0 +1,131 @@
+"""
+Tests for cron parsing, snapshot retention and the scheduler
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.cron import CronExpression
+from app.schemas.snapshots import SnapshotScheduleRequest
+from app.services.snapshot_scheduler import SnapshotScheduler, select_for_deletion
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_cron_next_after():
+    assert CronExpression("*/15 * * * *").next_after(_utc(2024, 1, 1, 10, 7)) == _utc(2024, 1, 1, 10, 15)
+    assert CronExpression("30 2 * * *").next_after(_utc(2024, 1, 1, 3, 0)) == _utc(2024, 1, 2, 2, 30)
+    # 2024-01-01 is a Monday; next Sunday 00:00
+    assert CronExpression("@weekly").next_after(_utc(2024, 1, 1, 0, 0)) == _utc(2024, 1, 7, 0, 0)
+    assert CronExpression("0 0 29 2 *").next_after(_utc(2024, 3, 1)) == _utc(2028, 2, 29)
+    # Restricted day-of-month and day-of-week: either matches
+    assert CronExpression("0 0 15 * 1").next_after(_utc(2024, 1, 2)) == _utc(2024, 1, 8)
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "61 * * * *", "0 0 30 2 *", "*/0 * * * *", "a b c d e"])
+def test_cron_invalid(expr):
+    with pytest.raises(ValueError):
+        CronExpression(expr).next_after(_utc(2024, 1, 1))
+
+
+def test_select_for_deletion_keep_last_and_daily():
+    snaps = [
+        {"name": "d1-a", "creation_time": "2024-01-01T01:00:00"},
+        {"name": "d1-b", "creation_time": "2024-01-01T13:00:00"},
+        {"name": "d2-a", "creation_time": "2024-01-02T01:00:00"},
+        {"name": "d3-a", "creation_time": "2024-01-03T01:00:00"},
+        {"name": "d3-b", "creation_time": "2024-01-03T13:00:00"},
+    ]
+    assert select_for_deletion(snaps, None, None) == []
+    assert sorted(select_for_deletion(snaps, 2, None)) == ["d1-a", "d1-b", "d2-a"]
+    assert sorted(select_for_deletion(snaps, None, 2)) == ["d1-a", "d1-b", "d3-a"]
+    # Union of both policies
+    assert sorted(select_for_deletion(snaps, 1, 3)) == ["d1-a", "d3-a"]
+
+
+class _FakeSnapshots:
+    def __init__(self) -> None:
+        self.snaps = [
+            {"name": f"c1-{i}.snapshot", "creation_time": f"2024-01-0{i}T00:00:00"} for i in range(1, 5)
+        ]
+        self.deleted: list[str] = []
+
+    async def create_snapshot(self, collection):
+        snap = {"name": "c1-9.snapshot", "creation_time": "2024-01-09T00:00:00"}
+        self.snaps.append(snap)
+        return {"result": snap}
+
+    async def list_snapshots(self, collection):
+        return {"result": list(self.snaps)}
+
+    async def delete_snapshot(self, collection, name):
+        self.deleted.append(name)
+        self.snaps = [s for s in self.snaps if s["name"] != name]
+        return {"result": True}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_due_schedule_and_persists(tmp_path):
+    fake = _FakeSnapshots()
+    path = tmp_path / "schedules.json"
+    sched = SnapshotScheduler(path, service_factory=lambda cluster: fake)
+    s = await sched.add(SnapshotScheduleRequest(collection="c1", cron="0 * * * *", keep_last=2))
+
+    # Not due yet
+    assert await sched.tick(now=s["next_run"] - 1) == []
+    tasks = await sched.tick(now=s["next_run"])
+    assert len(tasks) == 1
+    await tasks[0]
+
+    result = sched.get(s["id"])
+    assert result.last_snapshot == "c1-9.snapshot"
+    assert result.last_deleted == 3
+    assert sorted(fake.deleted) == ["c1-1.snapshot", "c1-2.snapshot", "c1-3.snapshot"]
+    assert result.next_run == s["next_run"] + 3600
+
+    # State survives a restart
+    reloaded = SnapshotScheduler(path, service_factory=lambda cluster: fake)
+    reloaded.load()
+    assert reloaded.get(s["id"]).last_snapshot == "c1-9.snapshot"
+    assert reloaded.get(s["id"]).keep_last == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_records_failure(tmp_path):
+    class _Broken(_FakeSnapshots):
+        async def create_snapshot(self, collection):
+            raise RuntimeError("qdrant down")
+
+    sched = SnapshotScheduler(tmp_path / "s.json", service_factory=lambda cluster: _Broken())
+    s = await sched.add(SnapshotScheduleRequest(collection="c1", cron="@daily", keep_last=1))
+    result = await sched.run_schedule(s["id"])
+    assert result["last_error"] == "qdrant down"
+    assert result["last_deleted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_schedulers_on_several_workers_share_the_file(tmp_path):
+    fake = _FakeSnapshots()
+    path = tmp_path / "schedules.json"
+    # The scheduler worker (loaded at start) and an API-only worker that never loaded
+    owner = SnapshotScheduler(path, service_factory=lambda cluster: fake)
+    first = await owner.add(SnapshotScheduleRequest(collection="c1", cron="0 * * * *"))
+    owner.load()
+    other = SnapshotScheduler(path, service_factory=lambda cluster: fake)
+
+    assert [s["id"] for s in other.list_schedules()] == [first["id"]]
+    second = await other.add(SnapshotScheduleRequest(collection="c2", cron="@daily"))
+    # Neither write dropped the other's schedules
+    assert {s["id"] for s in owner.list_schedules()} == {first["id"], second["id"]}
+    await owner.remove(second["id"])
+    with pytest.raises(KeyError):
+        other.get(second["id"])
+
+    # Two enabled schedulers: a due run is claimed by exactly one
+    started = [*await owner.tick(now=first["next_run"]), *await other.tick(now=first["next_run"])]
+    assert len(started) == 1
+    await asyncio.gather(*started)
+    assert other.get(first["id"]).last_snapshot == "c1-9.snapshot"
@@ -0,0 +1,481 @@
+"""
+Tests for snapshot service and routes
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.snapshot_service import SnapshotError, SnapshotService
+
+
+def _service(handler) -> SnapshotService:
+    return SnapshotService(httpx.AsyncClient(base_url="http://qdrant:6333", transport=httpx.MockTransport(handler)))
+
+
+@pytest.mark.asyncio
+async def test_list_snapshots_uses_shared_client():
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"result": [{"name": "s1"}]})
+
+    service = _service(handler)
+    assert (await service.list_snapshots("c1"))["result"][0]["name"] == "s1"
+    assert (await service.list_snapshots("c1"))["result"][0]["name"] == "s1"
+    assert seen == ["/collections/c1/snapshots"] * 2
+
+
+@pytest.mark.asyncio
+async def test_create_snapshot_error_status_passthrough():
+    service = _service(lambda request: httpx.Response(404, text="Collection not found"))
+    with pytest.raises(SnapshotError) as exc:
+        await service.create_snapshot("missing")
+    assert exc.value.status_code == 404
+    assert "not found" in exc.value.detail
+
+
+def test_restore_status_route_not_shadowed_by_download():
+    """/restore_status/{op_id} must not be captured by /{collection}/{name}"""
+    from app.routes.snapshots import router
+
+    paths = [r.path for r in router.routes if "GET" in r.methods]
+    assert paths.index("/snapshots/restore_status/{op_id}") < paths.index("/snapshots/{collection}/{name}")
+
+
+@pytest.mark.asyncio
+async def test_open_download_forwards_range_headers():
+    seen: dict[str, str] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.update(request.headers)
+        return httpx.Response(
+            206,
+            stream=httpx.ByteStream(b"456789"),
+            headers={"Content-Range": "bytes 4-9/10", "Content-Length": "6", "ETag": '"abc"'},
+        )
+
+    service = _service(handler)
+    r = await service.open_download("c1", "s1.snapshot", range_header="bytes=4-", if_range='"abc"')
+    body = b"".join([chunk async for chunk in r.aiter_raw()])
+    await r.aclose()
+
+    assert seen["range"] == "bytes=4-"
+    assert seen["if-range"] == '"abc"'
+    assert r.status_code == 206
+    assert body == b"456789"
+    assert r.headers["content-range"] == "bytes 4-9/10"
+
+
+@pytest.mark.asyncio
+async def test_open_download_range_not_satisfiable():
+    service = _service(lambda request: httpx.Response(416, text="Range Not Satisfiable"))
+    with pytest.raises(SnapshotError) as exc:
+        await service.open_download("c1", "s1.snapshot", range_header="bytes=100-")
+    assert exc.value.status_code == 416
+
+
+def test_multipart_file_stream_split_chunks():
+    from app.services.snapshot_service import MultipartFileStream, _multipart_envelope
+
+    content_type, head, tail = _multipart_envelope("file", "c1.snapshot")
+    payload = bytes(range(256)) * 64
+    body = head + payload + tail
+
+    parser = MultipartFileStream(content_type)
+    out = b""
+    for i in range(0, len(body), 37):
+        out += b"".join(parser.feed(body[i:i + 37]))
+
+    assert parser.filename == "c1.snapshot"
+    assert parser.done
+    assert out == payload
+
+
+def test_multipart_file_stream_rejects_non_multipart():
+    from app.services.snapshot_service import MultipartFileStream
+
+    with pytest.raises(ValueError):
+        MultipartFileStream("application/octet-stream")
+
+
+async def _chunks(data: bytes, size: int = 100):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_upload_snapshot_stream_checksum():
+    import hashlib
+
+    data = b"snapshot-bytes" * 50
+    expected = hashlib.sha256(data).hexdigest()
+    seen: dict = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen["params"] = dict(request.url.params)
+        seen["body"] = b"".join([c async for c in request.stream])
+        return httpx.Response(200, json={"result": True})
+
+    service = _service(handler)
+    progress: list[int] = []
+    res, digest = await service.upload_snapshot_stream("c1", _chunks(data), checksum=expected, on_progress=progress.append)
+
+    assert res["result"] is True
+    assert digest == expected
+    assert seen["params"]["checksum"] == expected
+    assert data in seen["body"]
+    assert progress[-1] == len(data)
+
+
+@pytest.mark.asyncio
+async def test_upload_snapshot_stream_checksum_mismatch():
+    from app.services.snapshot_service import ChecksumMismatch
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        b"".join([c async for c in request.stream])
+        return httpx.Response(200, json={"result": True})
+
+    service = _service(handler)
+    with pytest.raises(ChecksumMismatch) as exc:
+        await service.upload_snapshot_stream("c1", _chunks(b"abc" * 10), checksum="0" * 64)
+    assert exc.value.status_code == 422
+
+
+def _sha(data: bytes) -> str:
+    import hashlib
+
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_chunked_upload_out_of_order_and_resume(tmp_path):
+    from app.schemas.snapshots import InitiateUploadRequest
+    from app.services.snapshot_uploads import ChunkedUploadStore, UploadError
+
+    data = bytes(range(256)) * 1000  # 256000 bytes -> 4 chunks of 65536
+    chunk = 65536
+    store = ChunkedUploadStore(tmp_path)
+    up = await store.initiate("c1", InitiateUploadRequest(total_size=len(data), chunk_size=chunk, sha256=_sha(data)))
+    assert up["total_chunks"] == 4
+    uid = up["upload_id"]
+
+    for i in (3, 1):
+        piece = data[i * chunk:(i + 1) * chunk]
+        await store.put_chunk(uid, i, i * chunk, piece, _sha(piece))
+
+    # A fresh store (API restart) sees the same progress
+    status = await ChunkedUploadStore(tmp_path).status(uid)
+    assert status["received"] == [1, 3]
+    assert status["missing"] == 2
+
+    for i in (0, 2):
+        piece = data[i * chunk:(i + 1) * chunk]
+        await store.put_chunk(uid, i, i * chunk, piece, _sha(piece))
+
+    summary, path = await store.finalize(uid)
+    assert summary["missing"] == 0
+    assert path.read_bytes() == data
+    # Kept until the restore succeeded; a failed one can be finalized again
+    with pytest.raises(UploadError, match="being restored"):
+        await store.finalize(uid)
+    await store.release(uid)
+    summary, path = await store.finalize(uid)
+    await store.complete(uid)
+    with pytest.raises(KeyError):
+        await store.status(uid)
+    assert not path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_chunked_upload_rejects_bad_chunks(tmp_path):
+    from app.schemas.snapshots import InitiateUploadRequest
+    from app.services.snapshot_uploads import ChunkedUploadStore, UploadError
+
+    store = ChunkedUploadStore(tmp_path)
+    up = await store.initiate("c1", InitiateUploadRequest(total_size=100_000, chunk_size=65536))
+    uid = up["upload_id"]
+    piece = b"x" * 65536
+
+    with pytest.raises(UploadError, match="checksum"):
+        await store.put_chunk(uid, 0, 0, piece, "0" * 64)
+    with pytest.raises(UploadError, match="offset"):
+        await store.put_chunk(uid, 0, 10, piece, _sha(piece))
+    with pytest.raises(UploadError, match="bytes"):
+        await store.put_chunk(uid, 1, 65536, piece, _sha(piece))
+    with pytest.raises(UploadError, match="missing"):
+        await store.finalize(uid)
+    with pytest.raises(KeyError):
+        await store.status("../../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_chunked_upload_parallel_chunks_across_stores(tmp_path):
+    """Stores in different workers share the manifest without losing chunks"""
+    from app.schemas.snapshots import InitiateUploadRequest
+    from app.services.snapshot_uploads import ChunkedUploadStore
+
+    chunk = 65536
+    data = bytes(range(256)) * 256 * 16
+    stores = [ChunkedUploadStore(tmp_path) for _ in range(4)]
+    uid = (await stores[0].initiate("c1", InitiateUploadRequest(total_size=len(data), chunk_size=chunk)))["upload_id"]
+
+    pieces = [data[i * chunk:(i + 1) * chunk] for i in range(16)]
+    await asyncio.gather(*(
+        stores[i % 4].put_chunk(uid, i, i * chunk, piece, _sha(piece)) for i, piece in enumerate(pieces)
+    ))
+    assert (await stores[1].status(uid))["received"] == list(range(16))
+
+
+def test_chunked_upload_size_limit_and_expiry(tmp_path):
+    import os
+    import time
+
+    from pydantic import ValidationError
+
+    from app.schemas.snapshots import InitiateUploadRequest, settings as schema_settings
+    from app.services.snapshot_uploads import ChunkedUploadStore
+
+    with pytest.raises(ValidationError):
+        InitiateUploadRequest(total_size=schema_settings.snapshot_upload_max_size + 1, chunk_size=65536)
+
+    store = ChunkedUploadStore(tmp_path)
+    uid = asyncio.run(store.initiate("c1", InitiateUploadRequest(total_size=100, chunk_size=65536)))["upload_id"]
+    fresh = asyncio.run(store.initiate("c1", InitiateUploadRequest(total_size=100, chunk_size=65536)))["upload_id"]
+    orphan = tmp_path / "0b6ad1a4-7f6b-4f3e-9d59-0c7e3c8c2b1f.part"
+    orphan.write_bytes(b"x")
+    old = time.time() - 7200
+    for p in (tmp_path / f"{uid}.json", tmp_path / f"{uid}.part", orphan):
+        os.utime(p, (old, old))
+
+    assert store.sweep(max_age=3600) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([f"{fresh}.json", f"{fresh}.part"])
+
+
+def test_shared_snapshot_location_allow_list(tmp_path, monkeypatch):
+    from app.services import snapshot_service
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    (shared / "c1.snapshot").write_bytes(b"x")
+    (tmp_path / "secret.snapshot").write_bytes(b"x")
+    (shared / "link.snapshot").symlink_to(tmp_path / "secret.snapshot")
+
+    monkeypatch.setattr(snapshot_service.settings, "snapshot_shared_dir", None)
+    with pytest.raises(SnapshotError) as exc:
+        snapshot_service.shared_snapshot_location("c1.snapshot")
+    assert exc.value.status_code == 403
+
+    monkeypatch.setattr(snapshot_service.settings, "snapshot_shared_dir", shared)
+    monkeypatch.setattr(snapshot_service.settings, "snapshot_shared_qdrant_dir", None)
+    assert snapshot_service.shared_snapshot_location("c1.snapshot") == (shared / "c1.snapshot").resolve().as_uri()
+    for bad in ("../secret.snapshot", str(tmp_path / "secret.snapshot"), "link.snapshot"):
+        with pytest.raises(SnapshotError) as exc:
+            snapshot_service.shared_snapshot_location(bad)
+        assert exc.value.status_code == 403
+    with pytest.raises(SnapshotError) as exc:
+        snapshot_service.shared_snapshot_location("missing.snapshot")
+    assert exc.value.status_code == 404
+
+    from pathlib import Path
+
+    monkeypatch.setattr(snapshot_service.settings, "snapshot_shared_qdrant_dir", Path("/qdrant/snapshots"))
+    assert snapshot_service.shared_snapshot_location("c1.snapshot") == "file:///qdrant/snapshots/c1.snapshot"
+
+
+@pytest.mark.asyncio
+async def test_recover_from_location_polls_status(monkeypatch):
+    import asyncio
+    import json
+
+    from app.services import snapshot_service
+
+    monkeypatch.setattr(snapshot_service, "_RECOVER_POLL_INTERVAL", 0.01)
+    seen: dict = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            seen["body"] = json.loads(request.content)
+            seen["params"] = dict(request.url.params)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"result": True})
+        return httpx.Response(200, json={"result": {"status": "yellow", "points_count": 7}})
+
+    service = _service(handler)
+    statuses: list[dict] = []
+    res = await service.recover_from_location(
+        "c1", "file:///qdrant/snapshots/c1.snapshot", priority="snapshot", on_status=statuses.append
+    )
+
+    assert res["result"] is True
+    assert seen["body"] == {"location": "file:///qdrant/snapshots/c1.snapshot", "priority": "snapshot"}
+    assert seen["params"]["wait"] == "true"
+    assert len(statuses) >= 2
+    assert statuses[-1] == {"status": "yellow", "optimizer_status": None, "points_count": 7}
+
+
+@pytest.mark.asyncio
+async def test_upload_snapshot_reports_progress(tmp_path):
+    path = tmp_path / "c1.snapshot"
+    data = b"z" * 300_000
+    path.write_bytes(data)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = b"".join([c async for c in request.stream])
+        assert data in body
+        assert b'filename="c1.snapshot"' in body
+        return httpx.Response(200, json={"result": True})
+
+    service = _service(handler)
+    seen: list[int] = []
+    await service.upload_snapshot("c1", path, on_progress=seen.append)
+    assert seen[-1] == len(data)
+    assert seen == sorted(seen)
+
+
+@pytest.mark.asyncio
+async def test_read_file_chunks_reads_in_worker_threads():
+    import io
+    import threading
+
+    from app.services.snapshot_service import read_file_chunks
+
+    threads: list[int] = []
+
+    class _File(io.BytesIO):
+        def read(self, size=-1):
+            threads.append(threading.get_ident())
+            return super().read(size)
+
+    class _Path:
+        def open(self, mode):
+            threads.append(threading.get_ident())
+            return _File(b"a" * 10)
+
+    chunks = [c async for c in read_file_chunks(_Path(), chunk_size=4)]
+    assert chunks == [b"aaaa", b"aaaa", b"aa"]
+    assert len(threads) == 5
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_op_events_stream_until_completed(monkeypatch):
+    import json
+
+    from app.core.ops import tracker
+    from app.routes import snapshots
+
+    monkeypatch.setattr(snapshots, "_SSE_POLL_INTERVAL", 0)
+    op = tracker.create("snapshot_restore", meta={"collection": "c1"})
+
+    class _Req:
+        async def is_disconnected(self) -> bool:
+            return False
+
+    frames = []
+    async for frame in snapshots.op_events(op.id, _Req()):
+        frames.append(frame)
+        if len(frames) == 1:
+            tracker.update(op.id, stage="uploading", bytes_sent=10)
+        elif len(frames) == 2:
+            tracker.update(op.id, stage="completed")
+
+    stages = [json.loads(f[len("data: "):])["stage"] for f in frames]
+    assert stages == ["created", "uploading", "completed"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_batch_concurrency_and_report():
+    import asyncio
+
+    from app.core.ops import tracker
+
+    active = {"now": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET" and path == "/collections":
+            names = [{"name": n} for n in ("a", "b", "c", "bad")]
+            return httpx.Response(200, json={"result": {"collections": names}})
+        name = path.split("/")[2]
+        if name == "bad":
+            return httpx.Response(500, text="disk full")
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200, json={"result": {"name": f"{name}.snapshot", "size": 10}})
+
+    service = _service(handler)
+    op = tracker.create("snapshot_batch")
+    results = await service.snapshot_batch(op.id, concurrency=2)
+
+    assert active["peak"] == 2
+    assert {r["collection"] for r in results} == {"a", "b", "c", "bad"}
+    d = tracker.to_dict(op.id)
+    assert d["stage"] == "failed"
+    assert d["meta"]["done"] == 4
+    assert d["meta"]["failed"] == 1
+    assert d["meta"]["total_bytes"] == 30
+    assert d["meta"]["elapsed_seconds"] >= 0.02
+    assert all("duration_seconds" in r for r in d["meta"]["snapshots"])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_batch_full_storage():
+    from app.core.ops import tracker
+
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"result": {"name": "full.snapshot", "size": 99}})
+
+    service = _service(handler)
+    op = tracker.create("snapshot_batch")
+    results = await service.snapshot_batch(op.id, full_storage=True)
+
+    assert seen == ["/snapshots"]
+    assert results[0]["collection"] is None and results[0]["size"] == 99
+    assert tracker.to_dict(op.id)["stage"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_storage_summary():
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/collections":
+            return httpx.Response(200, json={"result": {"collections": [{"name": "a"}, {"name": "b"}]}})
+        if path == "/snapshots":
+            return httpx.Response(200, json={"result": [{"name": "full", "size": 1000}]})
+        if path == "/collections/a/snapshots":
+            return httpx.Response(200, json={"result": [
+                {"name": "a1", "size": 10, "creation_time": "2024-01-01T00:00:00"},
+                {"name": "a2", "size": 20, "creation_time": "2024-01-02T00:00:00"},
+            ]})
+        return httpx.Response(200, json={"result": []})
+
+    summary = await _service(handler).storage_summary()
+    assert summary["total_count"] == 3
+    assert summary["total_bytes"] == 1030
+    a = next(i for i in summary["collections"] if i["collection"] == "a")
+    assert a["oldest"] == "2024-01-01T00:00:00" and a["newest"] == "2024-01-02T00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_restore_drops_cached_collection_metadata(tmp_path):
+    from app.core.ops import tracker
+    from app.routes import snapshots
+    from app.services.metadata import metadata_cache
+
+    path = tmp_path / "c1.snapshot"
+    path.write_bytes(b"z" * 1000)
+    service = _service(lambda request: httpx.Response(200, json={"result": True}))
+    op = tracker.create("snapshot_restore", meta={"collection": "c1"})
+    metadata_cache._counts.set("c1", 5)
+
+    assert await snapshots._do_upload(service, op.id, "c1", path) is True
+    assert metadata_cache._counts.get("c1") is None
+    assert tracker.get(op.id).stage == "completed"
@@ -0,0 +1,129 @@
+"""
+Tests for the shared state backends (rate limits and op tracking across workers)
+"""
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.core.middleware import RateLimitMiddleware
+from app.core.ops import OpTracker, TransferProgress
+from app.core.state import MemoryStateBackend, SqliteStateBackend
+
+
+def _take(path, n, results):
+    backend = SqliteStateBackend(path)
+    results.put(sum(backend.gcra("ip:1.2.3.4", 1, 1.0, 60.0, backend.clock()) == 0 for _ in range(n)))
+    backend.close()
+
+
+def test_sqlite_buckets_are_shared_between_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_take, args=(tmp_path / "state.db", 40, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(30)
+    # 160 attempts against one 60-token bucket: exactly one bucket's worth gets through
+    assert sum(results.get(timeout=5) for _ in workers) == 60
+
+
+@pytest.mark.parametrize("make", [lambda p: MemoryStateBackend(), lambda p: SqliteStateBackend(p / "state.db")])
+def test_backends_agree_on_gcra_and_eviction(tmp_path, make):
+    backend = make(tmp_path)
+    assert backend.gcra("a", 2, 1.0, 3.0, now=100.0) == 0
+    assert backend.gcra("a", 2, 1.0, 3.0, now=100.0) == pytest.approx(1.0)
+    assert backend.gcra("a", 2, 1.0, 3.0, now=100.0, force=True) == 0
+    assert backend.gcra("b", 1, 1.0, 3.0, now=100.0) == 0
+    assert backend.evict_rate_limits(cutoff=102.0) == (1, 1)
+    backend.close()
+
+
+def test_sqlite_rate_limits_use_wall_clock(tmp_path):
+    limiter = RateLimitMiddleware(None, per_minute=60, backend=SqliteStateBackend(tmp_path / "state.db"))
+    assert limiter.acquire("ip:a") == 0
+    limiter.backend.close()
+
+    # After a restart (monotonic time starts over) the stored bucket still expires on time
+    backend = SqliteStateBackend(tmp_path / "state.db")
+    tat = backend._conn().execute("SELECT tat FROM rate_limits WHERE key = 'ip:a'").fetchone()[0]
+    assert tat == pytest.approx(time.time() + 1.0, abs=1.0)
+    limiter = RateLimitMiddleware(None, per_minute=60, backend=backend)
+    assert limiter.cleanup_stale(-2.0) == 1
+    backend.close()
+
+
+def test_locked_state_database_fails_open(tmp_path):
+    backend = SqliteStateBackend(tmp_path / "state.db", busy_timeout=0.01)
+    limiter = RateLimitMiddleware(None, per_minute=1, backend=backend)
+    assert limiter.acquire("ip:a") == 0
+    assert limiter.acquire("ip:a") > 0
+
+    # Another worker holds the write lock
+    other = sqlite3.connect(tmp_path / "state.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    started = time.perf_counter()
+    assert limiter.acquire("ip:a") == 0
+    limiter.charge("ip:a", 5)
+    assert limiter.cleanup_stale(0) == 0
+    assert time.perf_counter() - started < 1.0
+    other.execute("ROLLBACK")
+    other.close()
+
+    assert limiter.acquire("ip:a") > 0
+    backend.close()
+
+
+def test_op_writes_outwait_brief_locks_and_progress_is_best_effort(tmp_path):
+    backend = SqliteStateBackend(tmp_path / "state.db", busy_timeout=0.01, ops_busy_timeout=1.0)
+    tracker = OpTracker(backend)
+    op = tracker.create("snapshot_restore")
+
+    other = sqlite3.connect(tmp_path / "state.db", isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.1, other.execute, ("ROLLBACK",))
+    release.start()
+    # Longer than the rate limiter's timeout, well within the ops one
+    assert tracker.update(op.id, stage="uploading").stage == "uploading"
+    release.join()
+
+    backend.ops_busy_timeout = 0.01
+    backend.close()
+    other.execute("BEGIN IMMEDIATE")
+    progress = TransferProgress(op.id, total=100, ops=tracker)
+    progress(10, force=True)
+    other.execute("ROLLBACK")
+    other.close()
+    progress(20, force=True)
+    assert tracker.to_dict(op.id)["meta"]["bytes_sent"] == 20
+    backend.close()
+
+
+def test_sqlite_op_tracker_visible_to_other_workers(tmp_path):
+    writer = OpTracker(SqliteStateBackend(tmp_path / "state.db"))
+    reader = OpTracker(SqliteStateBackend(tmp_path / "state.db"))
+
+    op = writer.create("snapshot_restore", {"collection": "c1"})
+    writer.update(op.id, stage="uploading", bytes_sent=10)
+    assert reader.to_dict(op.id)["stage"] == "uploading"
+    assert reader.to_dict(op.id)["meta"] == {"collection": "c1", "bytes_sent": 10}
+    assert reader.get("missing") is None
+
+    reader.update(op.id, stage="completed")
+    assert writer.get(op.id).stage == "completed"
+
+
+def test_op_tracker_entries_are_copies_and_pruned():
+    backend = MemoryStateBackend()
+    t = OpTracker(backend, retention=60)
+    op = t.create("alias_swap")
+    op.meta["local"] = True
+    assert t.get(op.id).meta == {}
+
+    backend.ops[op.id]["updated_at"] = time.time() - 120
+    t._last_prune -= 3601
+    t.create("alias_swap")
+    assert t.get(op.id) is None
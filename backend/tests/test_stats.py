@@ -0,0 +1,90 @@
+"""
+Tests for the async stats aggregation
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import stats_service
+from app.services.metadata import CollectionMetadataCache
+from app.services.stats_service import StatsService, estimate_usage
+
+
+def _info(points: int, size: int = 4, on_disk: bool = False, status: str = "green") -> SimpleNamespace:
+    return SimpleNamespace(
+        status=status,
+        optimizer_status="ok",
+        points_count=points,
+        vectors_count=points,
+        indexed_vectors_count=points,
+        segments_count=2,
+        config=SimpleNamespace(
+            params=SimpleNamespace(vectors=SimpleNamespace(size=size, on_disk=on_disk, quantization_config=None)),
+            hnsw_config=SimpleNamespace(m=16, on_disk=False),
+            quantization_config=None,
+        ),
+    )
+
+
+def _client(names: list[str]) -> MagicMock:
+    client = MagicMock()
+    client.get_collections = AsyncMock(return_value=SimpleNamespace(
+        collections=[SimpleNamespace(name=n) for n in names]
+    ))
+    in_flight = 0
+    client.max_in_flight = 0
+
+    async def get_collection(name: str):
+        nonlocal in_flight
+        in_flight += 1
+        client.max_in_flight = max(client.max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if name == "gone":
+            raise RuntimeError("Not found")
+        return _info(10, status="yellow" if name == "busy" else "green")
+
+    client.get_collection = AsyncMock(side_effect=get_collection)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def _clear_stats_cache():
+    stats_service._stats_cache.clear()
+    yield
+    stats_service._stats_cache.clear()
+
+
+def test_estimate_usage_on_disk_vectors():
+    """On-disk vectors don't count towards RAM"""
+    in_ram = estimate_usage(_info(1000, size=8))
+    on_disk = estimate_usage(_info(1000, size=8, on_disk=True))
+    assert in_ram["disk_bytes_estimate"] == on_disk["disk_bytes_estimate"]
+    assert in_ram["ram_bytes_estimate"] - on_disk["ram_bytes_estimate"] == 1000 * 8 * 4
+
+
+@pytest.mark.asyncio
+async def test_stats_fan_out_bounded(monkeypatch):
+    monkeypatch.setattr(stats_service.settings, "stats_concurrency", 3)
+    names = [f"c{i}" for i in range(10)] + ["busy", "gone"]
+    client = _client(names)
+
+    data = await StatsService(client, cache=CollectionMetadataCache(ttl=0)).get_stats()
+
+    assert data["collections"] == 12
+    assert data["total_points"] == 110
+    assert data["indexing"] == ["busy"]
+    assert any(i.get("error") for i in data["items"])
+    assert client.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_stats_cached_across_viewers():
+    client = _client(["a", "b"])
+    service = StatsService(client, cache=CollectionMetadataCache(ttl=0))
+
+    await asyncio.gather(*[service.get_stats() for _ in range(5)])
+    assert client.get_collections.await_count == 1
+    assert client.get_collection.await_count == 2
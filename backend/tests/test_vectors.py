@@ -219,3 +219,64 @@ def test_delete_vectors_route(client: TestClient, auth_headers: dict, mock_setti
     assert response.status_code == 200
     data = response.json()
     assert data["deleted"] == 3
+
+
+def _schema_client(vectors):
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock, MagicMock
+
+    client = MagicMock()
+    client.get_collection = AsyncMock(return_value=SimpleNamespace(
+        status="green",
+        config=SimpleNamespace(params=SimpleNamespace(vectors=vectors)),
+    ))
+    client.get_aliases = AsyncMock(return_value=SimpleNamespace(aliases=[]))
+    client.upsert = AsyncMock(return_value=None)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_insert_rejects_wrong_dimension_before_upsert():
+    """Dimension mismatches against the collection schema never reach Qdrant"""
+    from types import SimpleNamespace
+    from app.schemas.vectors import InsertVectorsRequest
+    from app.services.metadata import CollectionMetadataCache
+    from app.services.vector_service import VectorDimensionError, VectorService
+
+    client = _schema_client(SimpleNamespace(size=4, distance="Cosine"))
+    service = VectorService(client, cache=CollectionMetadataCache(ttl=60))
+    request = InsertVectorsRequest(collection="test", points=[{"id": 1, "vector": [1.0, 2.0, 3.0]}])
+
+    with pytest.raises(VectorDimensionError, match="expects 4"):
+        await service.insert_vectors(request)
+    client.upsert.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_insert_named_vectors_validated():
+    """Named vector keys and sizes are checked against the collection schema"""
+    from types import SimpleNamespace
+    from app.schemas.vectors import InsertVectorsRequest
+    from app.services.metadata import CollectionMetadataCache
+    from app.services.vector_service import VectorDimensionError, VectorService
+
+    client = _schema_client({
+        "text": SimpleNamespace(size=3, distance="Cosine"),
+        "image": SimpleNamespace(size=2, distance="Dot"),
+    })
+    service = VectorService(client, cache=CollectionMetadataCache(ttl=60))
+
+    ok = InsertVectorsRequest(collection="test", points=[{"id": 1, "vector": {"text": [1.0, 2.0, 3.0]}}])
+    assert (await service.insert_vectors(ok))["inserted"] == 1
+
+    unknown = InsertVectorsRequest(collection="test", points=[{"id": 2, "vector": {"audio": [1.0]}}])
+    with pytest.raises(VectorDimensionError, match="unknown vector name"):
+        await service.insert_vectors(unknown)
+
+    unnamed = InsertVectorsRequest(collection="test", points=[{"id": 3, "vector": [1.0, 2.0, 3.0]}])
+    with pytest.raises(VectorDimensionError, match="expects named vectors"):
+        await service.insert_vectors(unnamed)
+
+    # Schema was fetched once and reused
+    assert client.get_collection.await_count == 1
+    assert client.upsert.await_count == 1
@@ -85,17 +85,18 @@ export async function createSnapshot(collection: string) {
   return r.json();
 }
 
-export async function restoreSnapshot(collection: string, file: File) {
+export async function restoreSnapshot(collection: string, file: File, checksum?: string) {
   const form = new FormData();
   form.append('file', file);
-  const r = await fetch(`${API_BASE}/snapshots/${encodeURIComponent(collection)}/restore`, {
+  const qs = checksum ? `?checksum=${encodeURIComponent(checksum)}` : '';
+  const r = await fetch(`${API_BASE}/snapshots/${encodeURIComponent(collection)}/restore${qs}`, {
     method: 'POST',
     headers: mutationHeaders(),
     body: form,
     credentials: 'include'
   });
   if (!r.ok) throw new Error(await r.text());
-  return r.json();
+  return r.json() as Promise<{ op_id: string; sha256: string }>;
 }
 
 export async function restoreSnapshotAsync(collection: string, file: File) {
@@ -117,6 +118,29 @@ export async function getRestoreStatus(op_id: string) {
   return r.json();
 }
 
+// EventSource can't send the Authorization header, so the SSE stream is read via fetch
+export async function streamRestoreStatus(op_id: string, onStatus: (s: any) => void, signal?: AbortSignal) {
+  const r = await fetch(`${API_BASE}/snapshots/restore_status/${encodeURIComponent(op_id)}/events`, {
+    headers: authHeaders(),
+    signal
+  });
+  if (!r.ok || !r.body) throw new Error(await r.text());
+  const reader = r.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += value;
+    let idx;
+    while ((idx = buf.indexOf('\n\n')) >= 0) {
+      const frame = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      const data = frame.split('\n').filter(l => l.startsWith('data:')).map(l => l.slice(5).trimStart()).join('\n');
+      if (data) onStatus(JSON.parse(data));
+    }
+  }
+}
+
 export async function opsApply(dryRun: boolean, adminPassword: string) {
   const r = await fetch(`${API_BASE}/security/ops_apply`, {
     method: 'POST',
@@ -1,7 +1,12 @@
 import { useState } from 'react'
-import { createSnapshot, listSnapshots, restoreSnapshot, restoreSnapshotAsync, getRestoreStatus } from '../lib/api'
+import { createSnapshot, listSnapshots, restoreSnapshot, restoreSnapshotAsync, streamRestoreStatus } from '../lib/api'
 
 type SnapItem = { name: string; creation_time?: string; size?: number }
+type Progress = { bytes_sent?: number; bytes_total?: number; throughput_bps?: number; eta_seconds?: number | null }
+
+function formatMB(n?: number) {
+  return n == null ? '-' : `${(n / (1024 * 1024)).toFixed(1)} MB`
+}
 
 export default function Snapshots() {
   const [collection, setCollection] = useState('')
@@ -10,9 +15,11 @@ export default function Snapshots() {
   const [msg, setMsg] = useState('')
   const [err, setErr] = useState('')
   const [loading, setLoading] = useState(false)
-  const [asyncMode, setAsyncMode] = useState(true)
+  const [asyncMode, setAsyncMode] = useState(false)
+  const [checksum, setChecksum] = useState('')
   const [opId, setOpId] = useState('')
   const [stage, setStage] = useState('')
+  const [progress, setProgress] = useState<Progress>({})
 
   async function load() {
     setMsg(''); setErr('')
@@ -46,24 +53,19 @@ export default function Snapshots() {
         const res = await restoreSnapshotAsync(collection, file)
         setOpId(res.op_id)
         setStage(res.stage)
+        setProgress({})
         setMsg('Yükleme başlatıldı')
-        // Poll status
-        const timer = setInterval(async () => {
-          try {
-            const s = await getRestoreStatus(res.op_id)
-            setStage(s.stage)
-            if (s.stage === 'completed' || s.stage === 'failed') {
-              clearInterval(timer)
-              if (s.stage === 'failed') setErr(s.error || 'Geri yükleme başarısız')
-            }
-          } catch (e:any) {
-            clearInterval(timer)
-            setErr(e?.message || 'Durum sorgu hatası')
-          }
-        }, 1000)
+        // Follow progress over SSE until the op completes or fails
+        streamRestoreStatus(res.op_id, (s) => {
+          setStage(s.stage)
+          setProgress(s.meta || {})
+          if (s.stage === 'failed') setErr(s.error || 'Geri yükleme başarısız')
+        }).catch((e:any) => setErr(e?.message || 'Durum sorgu hatası'))
       } else {
-        await restoreSnapshot(collection, file)
-        setMsg('Geri yükleme tamamlandı')
+        const res = await restoreSnapshot(collection, file, checksum.trim() || undefined)
+        setOpId(res.op_id)
+        setStage('completed')
+        setMsg(`Geri yükleme tamamlandı (sha256: ${res.sha256})`)
       }
     } catch (e:any) {
       setErr(e?.message || 'Geri yükleme hatası')
@@ -108,8 +110,11 @@ export default function Snapshots() {
         <h3 className="font-medium mb-2">Restore</h3>
         <div className="text-sm text-gray-600 mb-2">Qdrant'a snapshot yükleyerek koleksiyonu geri yükleyin.</div>
         <label className="flex items-center gap-2 text-sm mb-2">
-          <input type="checkbox" checked={asyncMode} onChange={e=>setAsyncMode(e.target.checked)} /> Asenkron yükle (önerilen)
+          <input type="checkbox" checked={asyncMode} onChange={e=>setAsyncMode(e.target.checked)} /> Geçici dosya ile arka planda yükle (yedek yöntem)
         </label>
+        {!asyncMode && (
+          <input className="border rounded px-3 py-2 w-full mb-2 text-sm" placeholder="SHA-256 (opsiyonel)" value={checksum} onChange={e=>setChecksum(e.target.value)} />
+        )}
         <input type="file" onChange={e=>setFile(e.target.files?.[0])} />
         <div className="mt-2">
           <button disabled={!collection || !file || loading} className="bg-black text-white rounded px-3 py-2 disabled:opacity-50">Yükle</button>
@@ -117,6 +122,13 @@ export default function Snapshots() {
         {opId && (
           <div className="mt-2 text-sm text-gray-700">İşlem: {opId} — Durum: <b>{stage}</b></div>
         )}
+        {progress.bytes_sent != null && (
+          <div className="mt-1 text-sm text-gray-700">
+            {formatMB(progress.bytes_sent)} / {formatMB(progress.bytes_total)}
+            {' — '}{formatMB(progress.throughput_bps)}/s
+            {progress.eta_seconds != null && <> — Kalan: {Math.ceil(progress.eta_seconds)} sn</>}
+          </div>
+        )}
       </form>
     </div>
   )